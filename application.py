@@ -1,40 +1,226 @@
-import joblib
+import json
+import threading
 import numpy as np
-from config.paths_config import MODEL_FILE_PATH
-from flask import Flask, request, render_template
+from config.paths_config import MODEL_FILE_PATH, COMPILED_MODEL_FILE_PATH, MODEL_REGISTRY_DIR, PREPROCESSOR_FILE_PATH, CONFIG_PATH
+from flask import Flask, request, render_template, Response, jsonify, stream_with_context
+from src.batch_prediction import parse_records, build_feature_matrix, model_feature_columns, predict_in_chunks
+from src.custom_exception import CustomException
+from src.drift_monitor import DriftMonitor
+from src.instrumentation import METRICS, timed, render_prometheus
+from src.logger import get_logger, set_log_level
+from src.micro_batcher import MicroBatcher
+from src.model_loader import ModelLoader
+from src.model_registry import ModelRegistry
+from src.prediction_cache import PredictionCache
+from src.preprocessing_transformer import TARGET_COLUMN
+from utils.common_functions import read_yaml
 
 app = Flask(__name__)
 
-# Laoding the model
-model = joblib.load(MODEL_FILE_PATH)
+logger = get_logger(__name__)
+
+serving_config = read_yaml(CONFIG_PATH)['serving']
+
+# Below INFO, a log call on the prediction path returns after a single level check
+set_log_level(serving_config['log_level'])
+
+registry_config = serving_config['registry']
+
+# Serve the latest version of the model registry; until one is registered, the fixed model path is served
+registry = ModelRegistry(MODEL_REGISTRY_DIR) if registry_config['enabled'] else None
+
+# Laoding the model. The compiled model only needs NumPy, so sklearn and lightgbm are never imported.
+# With load_in_background the server comes up immediately and /readyz reports when the model is usable.
+model_loader = ModelLoader(
+    model_format=serving_config['model_format'],
+    model_path=COMPILED_MODEL_FILE_PATH if serving_config['model_format'] == 'compiled' else MODEL_FILE_PATH,
+    warmup_rows=serving_config['warmup_rows'],
+    registry=registry,
+    max_resident_versions=registry_config['max_resident_versions'],
+    transformer_path=PREPROCESSOR_FILE_PATH,
+).start(background=serving_config['load_in_background'])
+model_loader.watch(registry_config['poll_interval_s'])
+
+def get_model(version=None):
+    # Returns (version, model, transformer) of the serving model, or of a pinned version
+    return model_loader.get_versioned(timeout=serving_config['model_wait_timeout_s'], version=version)
+
+def requested_version():
+    # Requests can pin a model version with the X-Model-Version header or ?model_version=
+    return request.headers.get('X-Model-Version') or request.args.get('model_version')
+
+def unknown_version():
+    # A pinned version that is neither loaded nor registered is a client error, not an outage
+    version = requested_version()
+    return version is not None and not model_loader.knows_version(version)
+
+# Agreement between the serving model and the shadow version on batch requests
+shadow_stats = {"rows": 0, "agreements": 0}
+shadow_lock = threading.Lock()
+
+def record_shadow(agreements, rows):
+    with shadow_lock:
+        shadow_stats["rows"] += rows
+        shadow_stats["agreements"] += agreements
+
+# Optional micro-batcher that scores concurrent single-row requests together
+micro_batcher = None
+if serving_config['micro_batching']['enabled']:
+    micro_batcher = MicroBatcher(
+        lambda model, features: model.predict(features),
+        max_batch_size=serving_config['micro_batching']['max_batch_size'],
+        max_wait_ms=serving_config['micro_batching']['max_wait_ms'],
+    )
+
+# Optional monitor of the request features against the training reference statistics
+drift_monitor = None
+if serving_config['drift_monitor']['enabled']:
+    drift_monitor = DriftMonitor(**{key: value for key, value in serving_config['drift_monitor'].items()
+                                    if key != 'enabled'})
+
+# Optional cache of single-row predictions, invalidated whenever the serving model version changes
+prediction_cache = None
+if serving_config['prediction_cache']['enabled']:
+    prediction_cache = PredictionCache(
+        capacity=serving_config['prediction_cache']['capacity'],
+        ttl_s=serving_config['prediction_cache']['ttl_s'],
+    )
 
 @app.route('/', methods=['GET', 'POST'])
+@timed("serving.index")
 def index():
     if request.method == 'POST':
 
-        # Get the input data from the form
-        lead_time = float(request.form['lead_time'])
-        no_of_special_requests = int(request.form['no_of_special_requests'])
-        avg_price_per_room = float(request.form['avg_price_per_room'])
-        arrival_month = int(request.form['arrival_month'])
-        arrival_date = int(request.form['arrival_date'])
-        market_segment_type = int(request.form['market_segment_type'])
-        no_of_week_nights = int(request.form['no_of_week_nights'])
-        no_of_weekend_nights = int(request.form['no_of_weekend_nights'])
-        type_of_meal_plan = int(request.form['type_of_meal_plan'])
-        room_type_reserved = int(request.form['room_type_reserved'])
-
-        features = np.array([[lead_time, no_of_special_requests, avg_price_per_room,
-                            arrival_month, arrival_date,
-                             market_segment_type, no_of_week_nights, no_of_weekend_nights,
-                             type_of_meal_plan, room_type_reserved]])
+        if unknown_version():
+            return render_template('index.html', prediction=None,
+                                   error=f"Unknown model version {requested_version()}"), 404
+        try:
+            model_version, model, transformer = get_model(requested_version())
+        except CustomException as ce:
+            return render_template('index.html', prediction=None, error=str(ce)), 503
+
+        # Raw form values go through the preprocessing fitted at training time; models saved without
+        # it get the form's encoded values in the column order they were trained on
+        features, _, errors = build_feature_matrix([request.form.to_dict()], transformer,
+                                                   feature_columns=model_feature_columns(model))
+        if errors:
+            return render_template('index.html', prediction=None, error=errors[0]['error']), 400
+        if drift_monitor is not None:
+            drift_monitor.observe(features, transformer)
+
+        # Cache hits skip inference entirely
+        if prediction_cache is not None:
+            cache_key = prediction_cache.make_key(features[0])
+            prediction = prediction_cache.get(model_version, cache_key)
+            if prediction is not None:
+                return render_template('index.html', prediction=prediction)
         
         # Make prediction
-        prediction = model.predict(features)
+        try:
+            if micro_batcher is not None:
+                prediction = micro_batcher.predict(features, model)
+            else:
+                prediction = model.predict(features)[0]
+        except CustomException as ce:
+            return render_template('index.html', prediction=None, error=str(ce)), 503
 
-        return render_template('index.html', prediction=prediction[0])
+        if prediction_cache is not None:
+            prediction_cache.put(model_version, cache_key, prediction)
+
+        return render_template('index.html', prediction=prediction)
     
     return render_template('index.html', prediction=None)
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    # Accepts a JSON array, {"instances": [...]}, CSV or NDJSON body and streams NDJSON results back
+    try:
+        records = parse_records(request.get_data(), request.content_type)
+    except CustomException as ce:
+        return jsonify(error=str(ce)), 400
+
+    if len(records) > serving_config['max_request_rows']:
+        return jsonify(error=f"Batch of {len(records)} rows exceeds the limit of {serving_config['max_request_rows']}"), 413
+
+    if unknown_version():
+        return jsonify(error=f"Unknown model version {requested_version()}"), 404
+    try:
+        _, model, transformer = get_model(requested_version())
+    except CustomException as ce:
+        return jsonify(error=str(ce)), 503
+
+    # The shadow model is best effort: if it cannot be loaded the batch is served without it
+    shadow_model = None
+    if registry_config['shadow_version'] and not requested_version():
+        try:
+            _, shadow_model, shadow_transformer = get_model(registry_config['shadow_version'])
+        except CustomException as ce:
+            logger.error("Shadow model version %s is not available: %s", registry_config['shadow_version'], ce)
+        else:
+            # A shadow model can only score the same matrix if it was trained on the same features
+            if getattr(shadow_transformer, 'feature_columns', None) != getattr(transformer, 'feature_columns', None):
+                shadow_model = None
+
+    with timed("serving.batch_features", rows=len(records)):
+        features, row_ids, errors = build_feature_matrix(records, transformer, feature_columns=model_feature_columns(model))
+    if drift_monitor is not None:
+        drift_monitor.observe(features, transformer)
+    labels = transformer.classes.get(TARGET_COLUMN) if transformer is not None else None
+
+    def generate():
+        for result in predict_in_chunks(model, features, row_ids, serving_config['max_batch_size'],
+                                        shadow_model=shadow_model, on_shadow=record_shadow, labels=labels):
+            yield json.dumps(result) + '\n'
+        # Invalid rows are reported at the end instead of failing the whole batch
+        for error in errors:
+            yield json.dumps(error) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/metrics/batcher', methods=['GET'])
+def batcher_metrics():
+    if micro_batcher is None:
+        return jsonify(enabled=False)
+    return jsonify(enabled=True, **micro_batcher.metrics())
+
+@app.route('/metrics/cache', methods=['GET'])
+def cache_metrics():
+    if prediction_cache is None:
+        return jsonify(enabled=False)
+    return jsonify(enabled=True, **prediction_cache.metrics())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Per-stage durations, row counts and memory high-water mark of this process, for Prometheus
+    return Response(render_prometheus(METRICS.snapshot()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/drift', methods=['GET'])
+def drift_metrics():
+    if drift_monitor is None:
+        return jsonify(enabled=False)
+    return jsonify(enabled=True, model_version=model_loader.current_version, **drift_monitor.metrics())
+
+@app.route('/models', methods=['GET'])
+def models():
+    with shadow_lock:
+        shadow = dict(shadow_stats, version=registry_config['shadow_version'])
+    return jsonify(
+        serving_version=model_loader.current_version,
+        resident_versions=model_loader.status()['resident_versions'],
+        registered_versions=registry.list_versions() if registry is not None else {},
+        shadow=shadow,
+    )
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: the process is up and serving, whether or not the model is loaded
+    return jsonify(status="ok", **model_loader.status())
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: only route traffic here once the model is loaded and warmed up
+    status = model_loader.status()
+    return jsonify(**status), 200 if status['ready'] else 503
+
 if __name__ == '__main__':
     app.run(debug='True', host='0.0.0.0', port=8080)
\ No newline at end of file
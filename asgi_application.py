@@ -0,0 +1,233 @@
+import asyncio
+import contextlib
+import json
+import time
+from collections import namedtuple
+from urllib.parse import parse_qs
+from jinja2 import Environment, FileSystemLoader
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+from config.paths_config import MODEL_FILE_PATH, COMPILED_MODEL_FILE_PATH, MODEL_REGISTRY_DIR, PREPROCESSOR_FILE_PATH, CONFIG_PATH
+from src.batch_prediction import parse_records, build_feature_matrix
+from src.custom_exception import CustomException
+from src.drift_monitor import DriftMonitor
+from src.inference_pool import InferencePool
+from src.instrumentation import METRICS, timed, render_prometheus
+from src.logger import get_logger, set_log_level
+from src.model_loader import load_transformer, load_feature_columns
+from src.model_registry import ModelRegistry
+from src.preprocessing_transformer import TARGET_COLUMN
+from utils.common_functions import read_yaml
+
+# Async alternative to application.py: same routes, but inference runs on a process pool
+# so the event loop keeps accepting requests while LightGBM is busy.
+# Run with: uvicorn asgi_application:app --host 0.0.0.0 --port 8080
+
+logger = get_logger(__name__)
+
+serving_config = read_yaml(CONFIG_PATH)['serving']
+registry_config = serving_config['registry']
+asgi_config = serving_config['asgi']
+
+# Below INFO, a log call on the prediction path returns after a single level check
+set_log_level(serving_config['log_level'])
+
+# Same template as the Flask app; url_for only has to resolve static files
+templates = Environment(loader=FileSystemLoader('templates'), autoescape=True)
+templates.globals['url_for'] = lambda endpoint, filename: f"/{endpoint}/{filename}"
+index_template = templates.get_template('index.html')
+
+# Everything a request needs about the serving version. It is replaced as a whole when the registry
+# moves on, so a request that read it once never pairs one version's transformer with another's model.
+ServingModel = namedtuple("ServingModel", ["version", "model_path", "transformer", "feature_columns"])
+
+state = {"pool": None, "registry": None, "serving": None, "started_at": time.perf_counter()}
+
+# Runs in the event-loop process; observe() only appends to a deque, so it never delays the loop
+drift_monitor = None
+if serving_config['drift_monitor']['enabled']:
+    drift_monitor = DriftMonitor(**{key: value for key, value in serving_config['drift_monitor'].items()
+                                    if key != 'enabled'})
+
+
+def resolve_model():
+    # Latest registry version when there is one, otherwise the fixed model path
+    model_format = serving_config['model_format']
+    registry = state["registry"]
+    if registry is not None and registry.latest_version() is not None:
+        version = registry.latest_version()
+        transformer_path = None
+        if 'transformer' in registry.list_versions()[version]['files']:
+            transformer_path = registry.path_for(version, 'transformer')
+        return version, registry.path_for(version, model_format), transformer_path
+    return None, COMPILED_MODEL_FILE_PATH if model_format == 'compiled' else MODEL_FILE_PATH, PREPROCESSOR_FILE_PATH
+
+
+def load_serving_model(version, model_path, transformer_path):
+    return ServingModel(version, model_path, load_transformer(transformer_path),
+                        load_feature_columns(serving_config['model_format'], model_path))
+
+
+async def watch_registry():
+    # Switch to a newly registered version; pool workers load its file on their next task
+    while True:
+        await asyncio.sleep(registry_config['poll_interval_s'])
+        try:
+            version, path, transformer_path = resolve_model()
+            if version != state["serving"].version:
+                logger.info("Switching inference pool from version %s to %s", state['serving'].version, version)
+                state["serving"] = load_serving_model(version, path, transformer_path)
+        except Exception as e:
+            logger.error("Error while checking model registry: %s", e)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    if registry_config['enabled']:
+        state["registry"] = ModelRegistry(MODEL_REGISTRY_DIR)
+    state["serving"] = load_serving_model(*resolve_model())
+    state["pool"] = InferencePool(
+        model_format=serving_config['model_format'],
+        model_path=state["serving"].model_path,
+        workers=asgi_config['workers'],
+        max_pending=asgi_config['max_pending'],
+    )
+    watcher = asyncio.create_task(watch_registry())
+    yield
+    watcher.cancel()
+    state["pool"].shutdown()
+
+
+def overloaded():
+    return JSONResponse({"error": "Server is at capacity, retry later"}, status_code=503,
+                        headers={"Retry-After": "1"})
+
+
+async def predict_form(request):
+    # Get the input data from the form
+    form = {key: values[0] for key, values in parse_qs((await request.body()).decode()).items()}
+    serving = state["serving"]
+    transformer = serving.transformer
+    # Raw form values go through the preprocessing fitted at training time; models saved without
+    # it get the form's encoded values in the column order they were trained on
+    features, _, errors = build_feature_matrix([form], transformer, feature_columns=serving.feature_columns)
+    if errors:
+        return HTMLResponse(index_template.render(prediction=None, error=errors[0]['error']), status_code=400)
+    if drift_monitor is not None:
+        drift_monitor.observe(features, transformer)
+
+    pool = state["pool"]
+    if pool.saturated:
+        return overloaded()
+    try:
+        predictions, _ = await pool.predict(features, serving.model_path)
+    except CustomException as ce:
+        return HTMLResponse(index_template.render(prediction=None, error=str(ce)), status_code=500)
+
+    return HTMLResponse(index_template.render(prediction=predictions[0]))
+
+
+async def index(request):
+    if request.method == 'POST':
+        with timed("serving.index", rows=1):
+            return await predict_form(request)
+    return HTMLResponse(index_template.render(prediction=None))
+
+
+async def predict_batch(request):
+    # Same contract as the Flask /predict/batch route: NDJSON results, per-row errors
+    try:
+        records = parse_records(await request.body(), request.headers.get('content-type'))
+    except CustomException as ce:
+        return JSONResponse({"error": str(ce)}, status_code=400)
+
+    if len(records) > serving_config['max_request_rows']:
+        return JSONResponse(
+            {"error": f"Batch of {len(records)} rows exceeds the limit of {serving_config['max_request_rows']}"},
+            status_code=413)
+
+    serving = state["serving"]
+    transformer = serving.transformer
+    with timed("serving.batch_features", rows=len(records)):
+        features, row_ids, errors = build_feature_matrix(records, transformer, feature_columns=serving.feature_columns)
+    if drift_monitor is not None:
+        drift_monitor.observe(features, transformer)
+    labels = transformer.classes.get(TARGET_COLUMN) if transformer is not None else None
+    chunk_size = serving_config['max_batch_size']
+
+    # Chunks are scored one after another, so one pool slot taken before the 200 headers go out
+    # covers the whole request
+    pool = state["pool"]
+    try:
+        pool.reserve()
+    except CustomException:
+        return overloaded()
+
+    async def generate():
+        try:
+            for start in range(0, len(row_ids), chunk_size):
+                chunk_rows = row_ids[start:start + chunk_size]
+                try:
+                    predictions, probabilities = await pool.predict(features[start:start + chunk_size],
+                                                                    serving.model_path, reserved=True)
+                except CustomException as ce:
+                    # The body is already streaming; report the chunk's rows instead of cutting it off
+                    for row in chunk_rows:
+                        yield json.dumps({"row": row, "error": str(ce)}) + '\n'
+                    continue
+                for offset, row in enumerate(chunk_rows):
+                    result = {"row": row, "prediction": int(predictions[offset])}
+                    if labels is not None:
+                        result["label"] = labels[int(predictions[offset])]
+                    result["probability"] = float(probabilities[offset].max())
+                    yield json.dumps(result) + '\n'
+        finally:
+            pool.release()
+        # Invalid rows are reported at the end instead of failing the whole batch
+        for error in errors:
+            yield json.dumps(error) + '\n'
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+
+async def healthz(request):
+    return JSONResponse({"status": "ok", "uptime_s": time.perf_counter() - state["started_at"]})
+
+
+async def readyz(request):
+    pool = state["pool"]
+    ready = pool is not None and not pool.saturated
+    return JSONResponse({"ready": ready, "model_version": state["serving"].version if state["serving"] else None,
+                         **(pool.metrics() if pool else {})}, status_code=200 if ready else 503)
+
+
+async def pool_metrics(request):
+    return JSONResponse({"model_version": state["serving"].version, **state["pool"].metrics()})
+
+
+async def drift_metrics(request):
+    if drift_monitor is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, "model_version": state["serving"].version, **drift_monitor.metrics()})
+
+
+async def metrics(request):
+    # Stage timings of the event-loop process; inference inside the pool workers is not included
+    return PlainTextResponse(render_prometheus(METRICS.snapshot()), media_type='text/plain; version=0.0.4')
+
+
+app = Starlette(
+    routes=[
+        Route('/', index, methods=['GET', 'POST']),
+        Route('/predict/batch', predict_batch, methods=['POST']),
+        Route('/healthz', healthz, methods=['GET']),
+        Route('/readyz', readyz, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/metrics/pool', pool_metrics, methods=['GET']),
+        Route('/metrics/drift', drift_metrics, methods=['GET']),
+        Mount('/static', StaticFiles(directory='static'), name='static'),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import tempfile
+
+# Time, traced peak memory and output size of each balancing strategy on the preprocessed
+# train split, plus the hold-out quality of a default LightGBM model trained on the result
+# (scored on the unbalanced test split). --scale repeats the train rows to probe larger exports.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def preprocessed_splits(train_file, test_file, config_path):
+    from src.data_preprocessing import DataPreprocessor
+    from utils.common_functions import load_data
+    with tempfile.TemporaryDirectory() as processed_dir:
+        processor = DataPreprocessor(train_file, test_file, processed_dir, config_path)
+        train_df = processor.prepreprocess_data(load_data(train_file))
+        test_df = processor.prepreprocess_data(load_data(test_file), fit=False)
+    return train_df, test_df, processor.config['data_processing']['balancing']
+
+
+def holdout_scores(train_df, test_df, strategy):
+    import lightgbm as lgb
+    from sklearn.metrics import accuracy_score, f1_score
+    from src.balancing import class_weight_for
+    model = lgb.LGBMClassifier(random_state=42, class_weight=class_weight_for(strategy), verbose=-1)
+    model.fit(train_df.drop(columns=['booking_status']), train_df['booking_status'])
+    y_pred = model.predict(test_df.drop(columns=['booking_status']))
+    return {"accuracy": accuracy_score(test_df['booking_status'], y_pred),
+            "f1_macro": f1_score(test_df['booking_status'], y_pred, average='macro')}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the class balancing strategies")
+    parser.add_argument('--train-file', default=os.path.join(REPO_ROOT, 'artifacts', 'raw', 'train.csv'))
+    parser.add_argument('--test-file', default=os.path.join(REPO_ROOT, 'artifacts', 'raw', 'test.csv'))
+    parser.add_argument('--config', default=os.path.join(REPO_ROOT, 'config', 'config.yaml'))
+    parser.add_argument('--strategies', nargs='+', default=['smote', 'approximate_smote', 'class_weight'])
+    parser.add_argument('--scale', type=int, default=1, help="repeat the train rows this many times")
+    parser.add_argument('--output', help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from src.balancing import balance
+
+    train_df, test_df, balancing_config = preprocessed_splits(args.train_file, args.test_file, args.config)
+    train_df = pd.concat([train_df] * args.scale, ignore_index=True)
+
+    report = {}
+    for strategy in args.strategies:
+        balanced_df, stats = balance(train_df, strategy=strategy, k_neighbors=balancing_config['k_neighbors'],
+                                     chunk_size=balancing_config['chunk_size'], trace_memory=True)
+        stats["holdout"] = holdout_scores(balanced_df, test_df, strategy)
+        report[strategy] = stats
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
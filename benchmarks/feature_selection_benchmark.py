@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# Runtime and top-k agreement of the feature importance backends against the original
+# ranking (full-data RandomForestRegressor on one core). The data goes through the same
+# preprocessing and SMOTE balancing as DataPreprocessor.process before being ranked.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def balanced_train_frame(train_file, config_path):
+    from src.data_preprocessing import DataPreprocessor
+    from utils.common_functions import load_data
+    with tempfile.TemporaryDirectory() as processed_dir:
+        processor = DataPreprocessor(train_file, train_file, processed_dir, config_path)
+        df = processor.balanced_data(processor.prepreprocess_data(load_data(train_file)))
+    return df, processor.config['data_processing']['no_of_features']
+
+
+def timed_ranking(X, y, backend, sample_rows, n_jobs):
+    from src.feature_importance import rank_features
+    start = time.perf_counter()
+    ranking = rank_features(X, y, backend=backend, sample_rows=sample_rows, n_jobs=n_jobs)
+    return ranking, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the feature importance backends used for feature selection")
+    parser.add_argument('--train-file', default=os.path.join(REPO_ROOT, 'artifacts', 'raw', 'train.csv'))
+    parser.add_argument('--config', default=os.path.join(REPO_ROOT, 'config', 'config.yaml'))
+    parser.add_argument('--backends', nargs='+', default=['random_forest', 'lightgbm_gain', 'mutual_info'])
+    parser.add_argument('--sample-rows', nargs='+', type=int, default=[0, 20000, 5000],
+                        help="row sample sizes to try (0 = every row)")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--output', help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    df, k = balanced_train_frame(args.train_file, args.config)
+    X, y = df.drop(columns=['booking_status']), df['booking_status']
+
+    reference, reference_time = timed_ranking(X, y, 'random_forest', None, 1)
+    reference_top = reference.index[:k].tolist()
+
+    results = []
+    for backend in args.backends:
+        for sample_rows in args.sample_rows:
+            ranking, elapsed = timed_ranking(X, y, backend, sample_rows or None, args.n_jobs)
+            top = ranking.index[:k].tolist()
+            results.append({
+                "backend": backend,
+                "sample_rows": sample_rows or len(X),
+                "n_jobs": args.n_jobs,
+                "wall_time_s": elapsed,
+                "speedup": reference_time / elapsed,
+                "top_k_agreement": len(set(top) & set(reference_top)) / k,
+                "same_top_k_order": top == reference_top,
+                "top_k": top,
+            })
+
+    report = {
+        "rows": len(X),
+        "k": k,
+        "reference": {"backend": "random_forest", "n_jobs": 1, "wall_time_s": reference_time, "top_k": reference_top},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Wall time and peak memory of the data stages (split -> preprocess -> load for training)
+# for each artifact format. Every format runs in a fresh interpreter inside a scratch copy of
+# the working tree layout, so the tracked artifacts are never touched.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = """
+import json
+import resource
+import time
+import yaml
+from config.paths_config import *
+from utils.common_functions import read_yaml, artifact_path
+
+artifact_format = "{artifact_format}"
+config = read_yaml(CONFIG_PATH)
+config['artifacts']['format'] = artifact_format
+with open(CONFIG_PATH, 'w') as f:
+    yaml.safe_dump(config, f)
+
+from src.data_ingestion import DataIngestion
+from src.data_preprocessing import DataPreprocessor
+from src.model_training import ModelTrainer
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+timings = {{}}
+
+start = time.perf_counter()
+DataIngestion(config).split_data()
+timings['split_data'] = {{"wall_time_s": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()}}
+
+start = time.perf_counter()
+DataPreprocessor(
+    train_path=artifact_path(TRAIN_FILE_PATH, artifact_format),
+    test_path=artifact_path(TEST_FILE_PATH, artifact_format),
+    processed_dir=PROCESSED_DIR,
+    config_path=CONFIG_PATH,
+).process()
+timings['preprocess'] = {{"wall_time_s": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()}}
+
+start = time.perf_counter()
+ModelTrainer(
+    train_path=artifact_path(PROCESSED_TRAIN_DATA_PATH, artifact_format),
+    test_path=artifact_path(PROCESSED_TEST_DATA_PATH, artifact_format),
+    model_output_path=MODEL_FILE_PATH,
+).load_and_split_data()
+timings['load_for_training'] = {{"wall_time_s": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()}}
+
+sizes = {{name: os.path.getsize(path) for name, path in [
+    ('train', artifact_path(TRAIN_FILE_PATH, artifact_format)),
+    ('processed_train', artifact_path(PROCESSED_TRAIN_DATA_PATH, artifact_format)),
+]}}
+print(json.dumps({{"stages": timings, "file_size_bytes": sizes}}))
+"""
+
+
+def run_format(artifact_format, raw_file):
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copytree(os.path.join(REPO_ROOT, 'config'), os.path.join(workdir, 'config'))
+        os.makedirs(os.path.join(workdir, 'artifacts', 'raw'))
+        shutil.copy(raw_file, os.path.join(workdir, 'artifacts', 'raw', 'raw.csv'))
+
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+        output = subprocess.run([sys.executable, '-c', 'import os\n' + STAGES.format(artifact_format=artifact_format)],
+                                cwd=workdir, env=env, capture_output=True, text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline data stages for each artifact format")
+    parser.add_argument('--raw-file', default=os.path.join(REPO_ROOT, 'artifacts', 'raw', 'raw.csv'))
+    parser.add_argument('--formats', nargs='+', default=['csv', 'parquet', 'arrow'])
+    parser.add_argument('--output', help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = {artifact_format: run_format(artifact_format, args.raw_file) for artifact_format in args.formats}
+    for result in report.values():
+        result["total_wall_time_s"] = sum(stage["wall_time_s"] for stage in result["stages"].values())
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import numpy as np
+
+# Load test for the Flask (application.py) and ASGI (asgi_application.py) servers.
+# Either point it at running servers with --flask-url / --asgi-url, or let it start them with --spawn.
+
+FLASK_PORT = 8080
+ASGI_PORT = 8081
+
+
+def random_reservation(rng):
+    return {
+        'lead_time': rng.randint(0, 400),
+        'no_of_special_requests': rng.randint(0, 5),
+        'avg_price_per_room': round(rng.uniform(30, 300), 2),
+        'arrival_month': rng.randint(1, 12),
+        'arrival_date': rng.randint(1, 31),
+        'market_segment_type': rng.randint(0, 4),
+        'no_of_week_nights': rng.randint(0, 10),
+        'no_of_weekend_nights': rng.randint(0, 4),
+        'type_of_meal_plan': rng.randint(0, 3),
+        'room_type_reserved': rng.randint(0, 6),
+        'no_of_adults': rng.randint(1, 4),
+    }
+
+
+def make_request(base_url, call, batch_size, rng):
+    if call == 'single':
+        body = urllib.parse.urlencode(random_reservation(rng)).encode()
+        return urllib.request.Request(base_url + '/', data=body,
+                                      headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    body = json.dumps([random_reservation(rng) for _ in range(batch_size)]).encode()
+    return urllib.request.Request(base_url + '/predict/batch', data=body,
+                                  headers={'Content-Type': 'application/json'})
+
+
+def run_load(base_url, call, total_requests, concurrency, batch_size=100, seed=42):
+    latencies = []
+    failures = 0
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def worker(worker_id):
+        nonlocal failures
+        rng = random.Random(seed + worker_id)
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            request = make_request(base_url, call, batch_size, rng)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    response.read()
+                ok = True
+            except (urllib.error.URLError, OSError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    failures += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000.0
+    rows_per_request = 1 if call == 'single' else batch_size
+    return {
+        "call": call,
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "failures": failures,
+        "wall_time_s": wall_time,
+        "requests_per_s": len(latencies) / wall_time,
+        "rows_per_s": len(latencies) * rows_per_request / wall_time,
+        "p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies) else None,
+        "p95_ms": float(np.percentile(latencies_ms, 95)) if len(latencies) else None,
+        "p99_ms": float(np.percentile(latencies_ms, 99)) if len(latencies) else None,
+    }
+
+
+def wait_until_ready(base_url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/readyz', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{base_url} did not become ready within {timeout}s")
+
+
+def spawn_servers():
+    env = dict(os.environ, PYTHONUNBUFFERED='1')
+    flask = subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'application', 'run',
+                              '--port', str(FLASK_PORT), '--with-threads'],
+                             env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    asgi = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'asgi_application:app',
+                             '--port', str(ASGI_PORT), '--log-level', 'warning'],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return [flask, asgi]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Flask and ASGI prediction servers")
+    parser.add_argument('--flask-url', default=f'http://127.0.0.1:{FLASK_PORT}')
+    parser.add_argument('--asgi-url', default=f'http://127.0.0.1:{ASGI_PORT}')
+    parser.add_argument('--spawn', action='store_true', help="start both servers locally for the test")
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--output', help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    processes = spawn_servers() if args.spawn else []
+    try:
+        report = {}
+        for mode, url in (('flask', args.flask_url), ('asgi', args.asgi_url)):
+            wait_until_ready(url)
+            report[mode] = [run_load(url, call, args.requests, args.concurrency, args.batch_size)
+                            for call in ('single', 'batch')]
+    finally:
+        for process in processes:
+            process.terminate()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+# End-to-end benchmark of the training pipeline stages and the Flask prediction route.
+#
+# For every size, synthetic reservations (benchmarks/synthetic_data.py) go through the same
+# steps as pipeline/training_pipeline.py, one after the other: DataIngestion.split_data, each
+# DataPreprocessor node, then ModelTrainer.train_lgbm and evaluate_model. Each size runs in its
+# own process and working directory (a copy of config/), so sizes do not share memory or
+# artifacts and the repo's artifacts/ are never touched. Every step reports its wall time, CPU
+# time, the rows it produced and the peak RSS / PSS of the process tree while it ran, sampled
+# from /proc (Linux only), so worker processes of the search and evaluation are included.
+#
+# The serving part starts application.py on the repo's current model and load-tests single-row
+# and batch calls with benchmarks/load_test.py.
+#
+# The report is JSON keyed by commit; --compare prints the change of every step against an
+# earlier report. Run from the repo root:
+#   python -m benchmarks.pipeline_benchmark --sizes 10000 100000 --compare benchmarks/results/<commit>.json
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.load_test import run_load, wait_until_ready
+from benchmarks.synthetic_data import write_synthetic_csv
+from benchmarks.training_memory_benchmark import _memory_kb, _tree_pids
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+FLASK_PORT = 8090
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    return {"commit": git('rev-parse', 'HEAD') or None, "dirty": bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+class MemorySampler:
+
+    # Peak RSS and PSS (MB) summed over this process and its children while the block runs
+    def __init__(self, interval_s=0.05):
+        self.interval_s = interval_s
+        self.peak_rss_mb = self.peak_pss_mb = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        usage = [_memory_kb(pid) for pid in _tree_pids(os.getpid())]
+        self.peak_rss_mb = max(self.peak_rss_mb, sum(rss for rss, _ in usage) / 1024)
+        self.peak_pss_mb = max(self.peak_pss_mb, sum(pss for _, pss in usage) / 1024)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self.start_rss_mb = self.peak_rss_mb
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def profile(fn, *args, rows=None):
+    # Runs fn(*args); returns (its result, timing and memory of the call)
+    cpu_start = time.process_time()
+    with MemorySampler() as memory:
+        start = time.perf_counter()
+        result = fn(*args)
+        wall_time = time.perf_counter() - start
+    stats = {"wall_time_s": wall_time, "cpu_time_s": time.process_time() - cpu_start,
+             "peak_rss_mb": memory.peak_rss_mb, "peak_pss_mb": memory.peak_pss_mb,
+             "rss_increase_mb": memory.peak_rss_mb - memory.start_rss_mb}
+    if rows is not None:
+        stats["rows"] = rows
+        stats["rows_per_s"] = rows / wall_time if wall_time else None
+    return result, stats
+
+
+def run_stages(rows, args):
+    # Worker side: runs in the size's working directory, so every relative artifact path lands there
+    from config.model_params import RANDOM_SEARCH_PARAMS
+    from config.paths_config import CONFIG_PATH, RAW_FILE_PATH
+    from pipeline.training_pipeline import build_nodes
+    from src.data_ingestion import DataIngestion
+    from utils.common_functions import load_data, read_yaml
+
+    def row_count(path):
+        return len(load_data(path)) if path.endswith(('.parquet', '.arrow')) else sum(1 for _ in open(path)) - 1
+
+    config = read_yaml(CONFIG_PATH)
+    stages = {}
+    _, stages["generate"] = profile(write_synthetic_csv, RAW_FILE_PATH, rows, args.seed, rows=rows)
+    _, stages["ingestion.split_data"] = profile(DataIngestion(config).split_data, rows=rows)
+
+    nodes = {node.name: node for node in build_nodes(config, remote_version=None)}
+    for name, node in nodes.items():
+        if node.stage == 'preprocessing':
+            _, stages[f"preprocessing.{name}"] = profile(node.fn, *node.args)
+            stages[f"preprocessing.{name}"]["rows"] = row_count(node.outputs[0])
+
+    trainer = nodes['training'].fn.__self__
+    trainer.random_search_params = dict(RANDOM_SEARCH_PARAMS, verbose=0,
+                                        **{key: value for key, value in (("n_iter", args.n_iter), ("cv", args.cv))
+                                           if value is not None})
+    X_train, y_train, X_test, y_test = trainer.load_and_split_data()
+    model, stages["training.train_lgbm"] = profile(trainer.train_lgbm, X_train, y_train, rows=len(X_train))
+    _, stages["training.evaluate_model"] = profile(trainer.evaluate_model, model, X_test, y_test, rows=len(X_test))
+    return stages
+
+
+def prepare_workdir(workdir, args):
+    # config/ copied into an empty directory, with the benchmark's overrides applied
+    import yaml
+    shutil.copytree(os.path.join(REPO_ROOT, 'config'), os.path.join(workdir, 'config'),
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    config_path = os.path.join(workdir, 'config', 'config.yaml')
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    config['data_processing']['feature_selection']['cache'] = False
+    if args.balancing is not None:
+        config['data_processing']['balancing']['strategy'] = args.balancing
+    if args.bootstrap_samples is not None:
+        config['training']['evaluation']['bootstrap_samples'] = args.bootstrap_samples
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+
+
+def run_size_once(rows, args):
+    workdir = tempfile.mkdtemp(prefix=f'pipeline_benchmark_{rows}_', dir=args.work_dir)
+    try:
+        prepare_workdir(workdir, args)
+        command = [sys.executable, '-m', 'benchmarks.pipeline_benchmark', '--worker', str(rows), '--seed', str(args.seed)]
+        for flag, value in (('--n-iter', args.n_iter), ('--cv', args.cv)):
+            if value is not None:
+                command += [flag, str(value)]
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT, LOG_LEVEL='WARNING')
+        process = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        if process.returncode != 0:
+            return {"error": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed"}
+        return json.loads(process.stdout.strip().splitlines()[-1])
+    finally:
+        if not args.keep_artifacts:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_size(rows, args):
+    # Median of every statistic over args.repeat runs, which keeps one noisy run from looking like a regression
+    runs = [run_size_once(rows, args) for _ in range(args.repeat)]
+    failed = [run for run in runs if "error" in run]
+    if failed:
+        return failed[0]
+    return {stage: {key: type(value)(np.median([run[stage][key] for run in runs])) for key, value in stats.items()}
+            for stage, stats in runs[0].items()}
+
+
+def run_serving(args):
+    env = dict(os.environ, PYTHONUNBUFFERED='1')
+    server = subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'application', 'run',
+                               '--port', str(FLASK_PORT), '--with-threads'],
+                              cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{FLASK_PORT}'
+    try:
+        wait_until_ready(url)
+        return {call: run_load(url, call, args.requests, args.concurrency, args.batch_size, args.seed)
+                for call in ('single', 'batch')}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(report, baseline, threshold):
+    # Relative change of wall time and peak PSS per step; flagged when slower / larger than threshold
+    lines = [f"Compared with {baseline['revision']['commit']} ({baseline['created_at']})"]
+    for size, stages in report["pipeline"].items():
+        for stage, stats in stages.items():
+            before = baseline.get("pipeline", {}).get(size, {}).get(stage)
+            if not isinstance(stats, dict) or not isinstance(before, dict):
+                continue
+            for key in ("wall_time_s", "peak_pss_mb"):
+                if before.get(key):
+                    change = stats[key] / before[key] - 1
+                    flag = "  REGRESSION" if change > threshold else ""
+                    lines.append(f"{size:>10} {stage:<40} {key:<12} {before[key]:>10.2f} -> {stats[key]:>10.2f} "
+                                 f"({change:+.1%}){flag}")
+    for call, stats in report.get("serving", {}).items():
+        before = baseline.get("serving", {}).get(call)
+        if before and before.get("p95_ms") and stats.get("p95_ms"):
+            change = stats["p95_ms"] / before["p95_ms"] - 1
+            flag = "  REGRESSION" if change > threshold else ""
+            lines.append(f"{'serving':>10} {call:<40} {'p95_ms':<12} {before['p95_ms']:>10.2f} -> "
+                         f"{stats['p95_ms']:>10.2f} ({change:+.1%}){flag}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data and the Flask prediction route")
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES, help="rows of synthetic raw data")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=1, help="runs per size; the report keeps the median")
+    parser.add_argument('--n-iter', type=int, help="search candidates (default: RANDOM_SEARCH_PARAMS)")
+    parser.add_argument('--cv', type=int, help="search folds (default: RANDOM_SEARCH_PARAMS)")
+    parser.add_argument('--balancing', help="balancing strategy (default: config.yaml)")
+    parser.add_argument('--bootstrap-samples', type=int, help="evaluation resamples (default: config.yaml)")
+    parser.add_argument('--skip-serving', action='store_true', help="do not load-test application.py")
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--work-dir', help="where the per-size working directories are created (default: the temp dir)")
+    parser.add_argument('--keep-artifacts', action='store_true', help="keep the per-size working directories")
+    parser.add_argument('--output', help="report path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="earlier report to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative slowdown reported as a regression")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_stages(args.worker, args)))
+        sys.exit(0)
+
+    import pandas, sklearn, lightgbm
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "revision": git_revision(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count(), "numpy": np.__version__, "pandas": pandas.__version__,
+                        "sklearn": sklearn.__version__, "lightgbm": lightgbm.__version__},
+        "settings": {key: value for key, value in vars(args).items() if key not in ('worker', 'output', 'compare')},
+        "pipeline": {},
+    }
+    for rows in args.sizes:
+        print(f"Benchmarking {rows} rows...", file=sys.stderr)
+        report["pipeline"][str(rows)] = run_size(rows, args)
+    if not args.skip_serving:
+        report["serving"] = run_serving(args)
+
+    output = args.output or os.path.join(REPO_ROOT, 'benchmarks', 'results',
+                                         f"{(report['revision']['commit'] or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Report written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(report, json.load(f), args.threshold))
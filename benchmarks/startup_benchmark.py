@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+
+# Each scenario runs in a fresh interpreter so import caches do not leak between runs.
+
+# The original application.py: import everything and unpickle the model before serving
+EAGER_STARTUP = """
+import json
+import time
+start = time.perf_counter()
+import joblib
+import numpy as np
+from flask import Flask
+from config.paths_config import MODEL_FILE_PATH
+model = joblib.load(MODEL_FILE_PATH)
+ready = time.perf_counter() - start
+model.predict(np.zeros((1, model.n_features_in_)))
+first_prediction = time.perf_counter() - start - ready
+print(json.dumps({"serving_s": ready, "ready_s": ready, "first_prediction_s": first_prediction}))
+"""
+
+# The lazy bootstrap: the app serves /healthz as soon as it is imported, the model loads in the background
+LAZY_STARTUP = """
+import json
+import time
+start = time.perf_counter()
+from application import app, model_loader
+serving = time.perf_counter() - start
+model = model_loader.get_model(timeout=120)
+ready = time.perf_counter() - start
+import numpy as np
+model.predict(np.zeros((1, model.n_features_in_)))
+first_prediction = time.perf_counter() - start - ready
+print(json.dumps({"serving_s": serving, "ready_s": ready, "first_prediction_s": first_prediction}))
+"""
+
+
+def run_scenario(code, repeats):
+    results = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    # Median of each timing across repeats
+    return {key: sorted(r[key] for r in results)[len(results) // 2] for key in results[0]}
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    report = {
+        "eager": run_scenario(EAGER_STARTUP, repeats),
+        "lazy": run_scenario(LAZY_STARTUP, repeats),
+    }
+    report["serving_speedup"] = report["eager"]["serving_s"] / report["lazy"]["serving_s"]
+    print(json.dumps(report, indent=2))
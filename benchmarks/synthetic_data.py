@@ -0,0 +1,78 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# Synthetic hotel reservations with the raw schema (Booking_ID plus the config.yaml
+# data_processing columns). Marginals follow Hotel_Reservations.csv; booking_status is drawn
+# from a logistic model of lead time, price, special requests, segment and repeat stays, so a
+# classifier trained on it has something to learn. Rows are generated and written in chunks,
+# so even 10M rows never need to fit in memory at once.
+
+# column: (values, probabilities)
+CATEGORICAL = {
+    'no_of_adults': ([0, 1, 2, 3, 4], [0.004, 0.212, 0.72, 0.064, 0.0004]),
+    'no_of_children': ([0, 1, 2, 3], [0.9256, 0.0446, 0.0292, 0.0006]),
+    'type_of_meal_plan': (['Meal Plan 1', 'Not Selected', 'Meal Plan 2', 'Meal Plan 3'],
+                          [0.7673, 0.1414, 0.0911, 0.0002]),
+    'required_car_parking_space': ([0, 1], [0.969, 0.031]),
+    'room_type_reserved': (['Room_Type 1', 'Room_Type 4', 'Room_Type 6', 'Room_Type 2', 'Room_Type 5',
+                            'Room_Type 7', 'Room_Type 3'], [0.7755, 0.167, 0.0266, 0.0191, 0.0073, 0.0044, 0.0002]),
+    'arrival_year': ([2017, 2018], [0.1796, 0.8204]),
+    'market_segment_type': (['Online', 'Offline', 'Corporate', 'Complementary', 'Aviation'],
+                            [0.6399, 0.2902, 0.0556, 0.0108, 0.0035]),
+    'repeated_guest': ([0, 1], [0.9744, 0.0256]),
+    'no_of_special_requests': ([0, 1, 2, 3, 4, 5], [0.5452, 0.3135, 0.1203, 0.0186, 0.0022, 0.0002]),
+}
+
+COLUMNS = ['Booking_ID', 'no_of_adults', 'no_of_children', 'no_of_weekend_nights', 'no_of_week_nights',
+           'type_of_meal_plan', 'required_car_parking_space', 'room_type_reserved', 'lead_time', 'arrival_year',
+           'arrival_month', 'arrival_date', 'market_segment_type', 'repeated_guest', 'no_of_previous_cancellations',
+           'no_of_previous_bookings_not_canceled', 'avg_price_per_room', 'no_of_special_requests', 'booking_status']
+
+
+def _choice(rng, column, n_rows):
+    values, probabilities = CATEGORICAL[column]
+    probabilities = np.asarray(probabilities) / np.sum(probabilities)
+    return np.asarray(values)[rng.choice(len(values), size=n_rows, p=probabilities)]
+
+
+def synthetic_reservations(n_rows, seed=42, first_id=0):
+    rng = np.random.default_rng(seed)
+    data = {column: _choice(rng, column, n_rows) for column in CATEGORICAL}
+    data['Booking_ID'] = 'INN' + pd.Series(np.arange(first_id + 1, first_id + n_rows + 1)).astype(str).str.zfill(8)
+    data['no_of_weekend_nights'] = np.minimum(rng.poisson(0.81, n_rows), 7)
+    data['no_of_week_nights'] = np.minimum(rng.poisson(2.2, n_rows), 17)
+    data['lead_time'] = np.minimum(rng.exponential(85, n_rows), 443).astype(np.int64)
+    data['arrival_month'] = rng.integers(1, 13, n_rows)
+    data['arrival_date'] = rng.integers(1, 32, n_rows)
+    data['avg_price_per_room'] = np.clip(rng.normal(103.4, 35.1, n_rows), 0, 540).round(2)
+
+    repeated = data['repeated_guest'] == 1
+    data['no_of_previous_cancellations'] = np.where(repeated, rng.poisson(0.4, n_rows), 0)
+    data['no_of_previous_bookings_not_canceled'] = np.where(repeated, rng.poisson(5.0, n_rows), 0)
+
+    logit = (-0.9 + 0.012 * (data['lead_time'] - 85) + 0.01 * (data['avg_price_per_room'] - 103)
+             - 0.9 * data['no_of_special_requests'] + 0.6 * (data['market_segment_type'] == 'Online')
+             - 2.0 * repeated + rng.logistic(0, 1, n_rows))
+    data['booking_status'] = np.where(logit > 0, 'Canceled', 'Not_Canceled')
+    return pd.DataFrame(data)[COLUMNS]
+
+
+def write_synthetic_csv(path, n_rows, seed=42, chunk_rows=1_000_000):
+    # Chunk i is drawn with seed + i, so a file is reproducible for a given seed and chunk_rows
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    for index, start in enumerate(range(0, n_rows, chunk_rows)):
+        chunk = synthetic_reservations(min(chunk_rows, n_rows - start), seed=seed + index, first_id=start)
+        chunk.to_csv(path, mode='w' if index == 0 else 'a', header=index == 0, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic hotel reservations in the raw CSV schema")
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    write_synthetic_csv(args.output, args.rows, args.seed)
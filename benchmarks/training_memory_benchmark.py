@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Total time and peak memory of hyperparameter search, before and after sharing the training data:
+#   baseline  the original RandomizedSearchCV on the DataFrame (every worker gets its own copy)
+#   random    ModelTrainer.train_lgbm with the memory-mapped matrix
+#   halving   ModelTrainer.train_lgbm with the halving backend and the shared binary Dataset
+# Memory is sampled from /proc (Linux only) over the whole process tree. RSS counts shared
+# pages once per process, PSS splits them between the processes sharing them, so the PSS sum
+# is the memory the search really occupies.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIO = """
+import json, time
+import pandas as pd
+from config.model_params import RANDOM_SEARCH_PARAMS, LIGHTGBM_PARAMS
+from src.model_training import ModelTrainer
+
+train_df = pd.concat([pd.read_csv({train_file!r})] * {scale}, ignore_index=True)
+X, y = train_df.drop(columns=['booking_status']), train_df['booking_status']
+trainer = ModelTrainer({train_file!r}, {train_file!r}, 'unused.pkl', shared_data_dir={shared_dir!r},
+                       search_config={search_config!r})
+trainer.random_search_params = dict(RANDOM_SEARCH_PARAMS, n_jobs={n_jobs}, verbose=0)
+
+start = time.perf_counter()
+if {baseline!r}:
+    import lightgbm as lgb
+    from sklearn.model_selection import RandomizedSearchCV
+    params = trainer.random_search_params
+    RandomizedSearchCV(lgb.LGBMClassifier(random_state=params['random_state'], force_col_wise=True),
+                       param_distributions=LIGHTGBM_PARAMS, n_iter=params['n_iter'], cv=params['cv'],
+                       n_jobs=params['n_jobs'], random_state=params['random_state'],
+                       scoring=params['scoring']).fit(X, y)
+else:
+    trainer.train_lgbm(X, y)
+print(json.dumps({{"wall_time_s": time.perf_counter() - start}}))
+"""
+
+
+def _tree_pids(root_pid):
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                children.setdefault(ppid, []).append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def _memory_kb(pid):
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if line[:3] in ('Rss', 'Pss'))
+        return int(fields['Rss'].split()[0]), int(fields['Pss'].split()[0])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+def run_scenario(name, args):
+    search_config = {"backend": "random"}
+    if name == 'halving':
+        search_config = {"backend": "halving", "n_candidates": args.n_candidates, "resource": "rounds",
+                         "min_resource": 10, "max_resource": None, "eta": 3, "early_stopping_rounds": 10}
+    code = SCENARIO.format(train_file=args.train_file, scale=args.scale, shared_dir=args.shared_dir,
+                           search_config=search_config, n_jobs=args.n_jobs, baseline=name == 'baseline')
+
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=REPO_ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    peak_rss = peak_pss = 0
+    while process.poll() is None:
+        usage = [_memory_kb(pid) for pid in _tree_pids(process.pid)]
+        peak_rss = max(peak_rss, sum(rss for rss, _ in usage))
+        peak_pss = max(peak_pss, sum(pss for _, pss in usage))
+        time.sleep(0.05)
+
+    result = json.loads(process.stdout.read().strip().splitlines()[-1])
+    result.update(peak_rss_mb=peak_rss / 1024, peak_pss_mb=peak_pss / 1024)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark search time and memory with and without shared training data")
+    parser.add_argument('--train-file', default=os.path.join(REPO_ROOT, 'artifacts', 'processed', 'processed_train.csv'))
+    parser.add_argument('--scenarios', nargs='+', default=['baseline', 'random', 'halving'])
+    parser.add_argument('--scale', type=int, default=1, help="repeat the train rows this many times")
+    parser.add_argument('--n-jobs', type=int, default=4, help="search workers (RANDOM_SEARCH_PARAMS n_jobs)")
+    parser.add_argument('--n-candidates', type=int, default=27, help="first-rung candidates of the halving scenario")
+    parser.add_argument('--shared-dir', default=os.path.join('/tmp', 'training_memory_benchmark'))
+    parser.add_argument('--output', help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = {name: run_scenario(name, args) for name in args.scenarios}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -9,14 +9,31 @@ TEST_FILE_PATH = os.path.join(RAW_DIR, "test.csv")  # Path for test data file
 
 CONFIG_PATH = "config/config.yaml"  # Path for configuration file
 
+STAGE_CACHE_DIR = "artifacts/stage_cache"  # Fingerprints of the last successful run of each pipeline stage
+PIPELINE_REPORT_PATH = "artifacts/pipeline_report.json"  # Per-node status, wall time and peak RSS of the last pipeline run
+PIPELINE_METRICS_PATH = "artifacts/pipeline_metrics.prom"  # Per-stage durations, rows and memory of the last run, Prometheus text format
+
 ########## DATA PROCESSING ##########
 
 PROCESSED_DIR = "artifacts/processed"  # Directory for processed data
 PROCESSED_TRAIN_DATA_PATH = os.path.join(PROCESSED_DIR, "processed_train.csv")  # Path for processed training data file
 PROCESSED_TEST_DATA_PATH = os.path.join(PROCESSED_DIR, "processed_test.csv")  # Path for processed test data file   
+PREPROCESSOR_FILE_PATH = os.path.join(PROCESSED_DIR, "preprocessor.json")  # Fitted encoders, log1p columns and selected features
+FEATURE_IMPORTANCE_CACHE_DIR = "artifacts/importance_cache"  # Feature rankings keyed on the data and selection settings
 
 
 ########## MODEL TRAINING ##########
 
 MODEL_DIR = "artifacts/model/lgbm_model.pkl"  # Directory for model artifacts
-MODEL_FILE_PATH = os.path.join(MODEL_DIR, "model.pkl")  # Path for model file
\ No newline at end of file
+MODEL_FILE_PATH = os.path.join(MODEL_DIR, "model.pkl")  # Path for model file
+COMPILED_MODEL_FILE_PATH = os.path.join(MODEL_DIR, "model_compiled.npz")  # Path for the NumPy-only tree model used in serving
+EVALUATION_REPORT_PATH = os.path.join(MODEL_DIR, "evaluation.json")  # Overall and per-segment test metrics with bootstrap intervals
+TRAIN_ROWS_FILE_PATH = os.path.join(MODEL_DIR, "train_rows.npy")  # Hashes of the rows the model was trained on, for incremental retraining
+MLFLOW_DATASET_INDEX_PATH = "artifacts/model/mlflow_datasets.json"  # Dataset hashes already uploaded to each MLflow tracking URI
+TRAINING_DATA_DIR = "artifacts/model/training_data"  # Memory-mapped train matrix and binned LightGBM dataset shared by search workers
+MODEL_REGISTRY_DIR = "artifacts/model/registry"  # Content-addressed model versions watched by the serving app
+
+
+########## BATCH SCORING ##########
+
+BATCH_PREDICTIONS_DIR = "artifacts/predictions"  # Parquet parts written by pipeline/batch_scoring.py
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.model_loader import load_model, load_transformer
+from src.model_registry import file_hash
+from src.preprocessing_transformer import TARGET_COLUMN
+from utils.common_functions import read_yaml, iter_data_chunks
+from config.paths_config import *
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = "_scoring.json"
+REPORT_FILE = "_report.json"
+
+# Per-process state of a scoring worker: the model and fitted preprocessing, loaded once
+_worker_model = None
+_worker_transformer = None
+
+
+def _init_worker(model_format, model_path, transformer_path, threads):
+    global _worker_model, _worker_transformer
+    _worker_model = load_model(model_format, model_path)
+    _worker_transformer = load_transformer(transformer_path)
+    if _worker_transformer is None:
+        raise FileNotFoundError(f"Preprocessing transformer not found at {transformer_path}")
+    # LightGBM would otherwise start one OpenMP thread per core in every worker
+    if hasattr(_worker_model, 'set_params'):
+        _worker_model.set_params(n_jobs=threads)
+    logger.info("Scoring worker %s loaded model from %s", os.getpid(), model_path)
+
+
+def part_path(output_dir, index):
+    return os.path.join(output_dir, f"part-{index:05d}.parquet")
+
+
+def score_chunk(index, first_row, chunk, output_dir, id_column):
+    # Preprocesses and scores one chunk and writes it as its own Parquet part. The part is
+    # renamed into place only once complete, so after a crash every existing part is whole.
+    transformer = _worker_transformer
+    columns = {col: chunk[col].to_numpy() for col in transformer.feature_columns}
+    features, errors = transformer.transform_columns(columns)
+    valid = np.array([error is None for error in errors], dtype=bool)
+
+    predictions = np.full(len(chunk), -1, dtype=np.int64)
+    probabilities = np.full(len(chunk), np.nan)
+    if valid.any():
+        proba = _worker_model.predict_proba(np.ascontiguousarray(features[valid]))
+        predictions[valid] = _worker_model.classes_[proba.argmax(axis=1)]
+        probabilities[valid] = proba.max(axis=1)
+
+    result = pd.DataFrame({"row": np.arange(first_row, first_row + len(chunk), dtype=np.int64)})
+    if id_column in chunk.columns:
+        result[id_column] = chunk[id_column].to_numpy()
+    result["prediction"] = predictions
+    labels = transformer.classes.get(TARGET_COLUMN)
+    if labels is not None:
+        result["label"] = pd.array(np.where(valid, np.asarray(labels, dtype=object)[np.maximum(predictions, 0)], None),
+                                   dtype="string")
+    result["probability"] = probabilities
+    # Explicit string dtypes keep one schema across parts, even for a part without any errors
+    result["error"] = pd.array(errors, dtype="string")
+
+    path = part_path(output_dir, index)
+    result.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return index, len(chunk), int((~valid).sum())
+
+
+class BatchScorer:
+
+    # Scores a reservation CSV / Parquet / Arrow file of any size. The file is streamed in
+    # chunk_size row chunks that are spread over worker processes; each worker loads the model
+    # and the fitted preprocessing once and writes its chunks as parts of a Parquet dataset in
+    # output_dir (readable with pandas.read_parquet(output_dir)). At most two chunks per worker
+    # are in flight, so memory stays bounded by the chunk size, not the file size.
+    # A re-run with the same input, model and chunk size resumes: chunks whose part already
+    # exists are skipped.
+    def __init__(self, input_path, output_dir, model_path=MODEL_FILE_PATH, model_format="joblib",
+                 transformer_path=PREPROCESSOR_FILE_PATH, chunk_size=50000, workers=None, id_column="Booking_ID"):
+        self.input_path = input_path
+        self.output_dir = output_dir
+        self.model_path = model_path
+        self.model_format = model_format
+        self.transformer_path = transformer_path
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count()
+        self.id_column = id_column
+
+    def _manifest(self):
+        stat = os.stat(self.input_path)
+        return {
+            "input_path": os.path.abspath(self.input_path),
+            "input_size": stat.st_size,
+            "input_mtime_ns": stat.st_mtime_ns,
+            "model": file_hash([self.model_path, self.transformer_path]),
+            "model_format": self.model_format,
+            "chunk_size": self.chunk_size,
+        }
+
+    def _completed_parts(self, overwrite):
+        # Indexes of the chunks already scored by an interrupted run of the same job
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest_path = os.path.join(self.output_dir, MANIFEST_FILE)
+        manifest = self._manifest()
+        previous = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                previous = json.load(f)
+
+        names = os.listdir(self.output_dir)
+        for name in names:
+            # Parts a crashed worker was still writing
+            if name.startswith("part-") and name.endswith(".tmp"):
+                os.remove(os.path.join(self.output_dir, name))
+        parts = sorted(name for name in names if name.startswith("part-") and name.endswith(".parquet"))
+
+        if parts and previous == manifest and not overwrite:
+            return {int(name[5:10]) for name in parts}
+        if parts and not overwrite:
+            raise ValueError(f"{self.output_dir} holds predictions of a different input, model or chunk size; "
+                             f"use another output directory or --overwrite")
+
+        for name in parts:
+            os.remove(os.path.join(self.output_dir, name))
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return set()
+
+    def run(self, overwrite=False):
+        try:
+            done = self._completed_parts(overwrite)
+            if done:
+                logger.info("Resuming: %s chunks already scored in %s", len(done), self.output_dir)
+
+            start = time.perf_counter()
+            initargs = (self.model_format, self.model_path, self.transformer_path,
+                        max(1, os.cpu_count() // self.workers))
+            report = {"rows_scored": 0, "invalid_rows": 0, "chunks_scored": 0, "chunks_skipped": 0}
+
+            def collect(result):
+                _, rows, invalid = result
+                report["rows_scored"] += rows
+                report["invalid_rows"] += invalid
+                report["chunks_scored"] += 1
+
+            chunks = enumerate(iter_data_chunks(self.input_path, self.chunk_size))
+            first_row = 0
+            if self.workers == 1:
+                _init_worker(*initargs)
+                for index, chunk in chunks:
+                    if index in done:
+                        report["chunks_skipped"] += 1
+                    else:
+                        collect(score_chunk(index, first_row, chunk, self.output_dir, self.id_column))
+                    first_row += len(chunk)
+            else:
+                # forkserver: workers never inherit a process whose OpenMP runtime LightGBM has started
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=initargs,
+                                         mp_context=multiprocessing.get_context('forkserver')) as executor:
+                    pending = set()
+                    for index, chunk in chunks:
+                        if index in done:
+                            report["chunks_skipped"] += 1
+                        else:
+                            if len(pending) >= 2 * self.workers:
+                                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                                for future in finished:
+                                    collect(future.result())
+                            pending.add(executor.submit(score_chunk, index, first_row, chunk,
+                                                        self.output_dir, self.id_column))
+                        first_row += len(chunk)
+                    for future in pending:
+                        collect(future.result())
+
+            elapsed = time.perf_counter() - start
+            report.update(
+                input_rows=first_row,
+                workers=self.workers,
+                wall_time_s=elapsed,
+                rows_per_second=report["rows_scored"] / elapsed if elapsed > 0 else None,
+                output_dir=self.output_dir,
+            )
+            with open(os.path.join(self.output_dir, REPORT_FILE), 'w') as f:
+                json.dump(report, f, indent=2)
+            logger.info("Scored %s rows in %.1fs (%.0f rows/s), %s invalid, %s chunks resumed",
+                        report['rows_scored'], elapsed, report['rows_per_second'] or 0, report['invalid_rows'],
+                        report['chunks_skipped'])
+            return report
+
+        except Exception as e:
+            logger.error("Error during batch scoring of %s: %s", self.input_path, e)
+            raise CustomException("Batch scoring failed", e)
+
+
+if __name__ == "__main__":
+
+    config = read_yaml(CONFIG_PATH)
+    scoring_config = config['batch_scoring']
+
+    parser = argparse.ArgumentParser(description="Score a reservation CSV or Parquet file into a Parquet dataset")
+    parser.add_argument('input', help="CSV, Parquet or Arrow file with raw reservation columns")
+    parser.add_argument('--output-dir', default=BATCH_PREDICTIONS_DIR)
+    parser.add_argument('--model-path', default=MODEL_FILE_PATH)
+    parser.add_argument('--model-format', choices=['joblib', 'compiled'], default=scoring_config['model_format'])
+    parser.add_argument('--transformer-path', default=PREPROCESSOR_FILE_PATH)
+    parser.add_argument('--chunk-size', type=int, default=scoring_config['chunk_size'])
+    parser.add_argument('--workers', type=int, default=scoring_config['workers'])
+    parser.add_argument('--overwrite', action='store_true', help="discard existing parts instead of resuming")
+    args = parser.parse_args()
+
+    model_path = args.model_path
+    if args.model_format == 'compiled' and model_path == MODEL_FILE_PATH:
+        model_path = COMPILED_MODEL_FILE_PATH
+
+    scorer = BatchScorer(
+        input_path=args.input,
+        output_dir=args.output_dir,
+        model_path=model_path,
+        model_format=args.model_format,
+        transformer_path=args.transformer_path,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        id_column=scoring_config['id_column'],
+    )
+    print(json.dumps(scorer.run(overwrite=args.overwrite), indent=2))
@@ -0,0 +1,136 @@
+import json
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.instrumentation import METRICS
+
+logger = get_logger(__name__)
+
+
+class Node:
+
+    # One unit of pipeline work. fn(*args) runs in a worker process, so fn must be picklable
+    # (a module-level function or a bound method of a picklable object) and may only talk to
+    # other nodes through the files listed in inputs / outputs. Dependencies are derived from
+    # those paths: a node runs once every node producing one of its inputs has finished.
+    # stage groups nodes for --force; config / code / extra feed the StageCache fingerprint.
+    def __init__(self, name, fn, args=(), inputs=(), outputs=(), stage=None, config=None, code=(), extra=None):
+        self.name = name
+        self.fn = fn
+        self.args = tuple(args)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.stage = stage or name
+        self.config = config
+        self.code = list(code)
+        self.extra = extra
+
+
+def _run_node(fn, args):
+    # Executed in the worker; each worker process serves a single node, so ru_maxrss is that node's peak
+    # and METRICS holds only the stages timed inside the node
+    METRICS.reset()
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, METRICS.snapshot()
+
+
+def dependencies(nodes):
+    # Maps node name -> names of the nodes it waits for; rejects duplicate outputs and cycles
+    producers = {}
+    for node in nodes:
+        for path in node.outputs:
+            if path in producers:
+                raise ValueError(f"'{path}' is an output of both '{producers[path]}' and '{node.name}'")
+            producers[path] = node.name
+    deps = {node.name: {producers[path] for path in node.inputs if path in producers} for node in nodes}
+
+    remaining = {name: set(waits_for) for name, waits_for in deps.items()}
+    while remaining:
+        ready = [name for name, waits_for in remaining.items() if not waits_for]
+        if not ready:
+            raise ValueError(f"Dependency cycle between nodes {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for waits_for in remaining.values():
+            waits_for.difference_update(ready)
+    return deps
+
+
+class DagRunner:
+
+    # Runs nodes on a process pool as soon as their inputs are ready. With a StageCache, a node
+    # whose fingerprint matches its last successful run is skipped without starting a worker.
+    def __init__(self, max_workers=None, cache=None, forced_stages=()):
+        self.max_workers = max_workers or os.cpu_count()
+        self.cache = cache
+        self.forced_stages = set(forced_stages)
+
+    def _fingerprint(self, node):
+        return self.cache.fingerprint(inputs=node.inputs, config=node.config, code=node.code, extra=node.extra)
+
+    def run(self, nodes):
+        # Returns {node name: {"status", "wall_time_s", "peak_rss_mb", "stages"}} in completion order,
+        # stages being the node's timed stages (src/instrumentation.py)
+        try:
+            deps = dependencies(nodes)
+            by_name = {node.name: node for node in nodes}
+            pending = list(by_name)
+            done = set()
+            running = {}
+            report = {}
+            start = time.perf_counter()
+
+            # One task per worker so peak RSS is per node. Workers are forked from a server that has
+            # already imported the nodes' modules, so a node does not pay for pandas / sklearn imports.
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(sorted({node.fn.__module__ for node in nodes}))
+            with ProcessPoolExecutor(max_workers=self.max_workers, max_tasks_per_child=1,
+                                     mp_context=context) as executor:
+                while pending or running:
+                    for name in [name for name in pending if deps[name] <= done]:
+                        pending.remove(name)
+                        node = by_name[name]
+                        fingerprint = self._fingerprint(node) if self.cache is not None else None
+                        forced = node.stage in self.forced_stages
+                        if fingerprint is not None and not forced and self.cache.is_fresh(node.name, fingerprint):
+                            logger.info("Node '%s' is up to date (fingerprint %s), reusing cached artifacts",
+                                        name, fingerprint[:12])
+                            report[name] = {"status": "cached", "wall_time_s": 0.0, "peak_rss_mb": None, "stages": {}}
+                            done.add(name)
+                            continue
+                        logger.info("Starting node '%s'%s", name, " (forced)" if forced else "")
+                        running[executor.submit(_run_node, node.fn, node.args)] = (name, fingerprint)
+
+                    if not running:
+                        # Everything submitted this round came from the cache; look for newly ready nodes
+                        continue
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name, fingerprint = running.pop(future)
+                        try:
+                            wall_time, peak_rss, stages = future.result()
+                        except Exception:
+                            for other in running:
+                                other.cancel()
+                            raise
+                        if fingerprint is not None:
+                            self.cache.record(name, fingerprint, by_name[name].outputs)
+                        report[name] = {"status": "ran", "wall_time_s": round(wall_time, 3),
+                                        "peak_rss_mb": round(peak_rss, 1), "stages": stages}
+                        logger.info("Node '%s' finished in %.2fs, peak RSS %.0f MB", name, wall_time, peak_rss)
+                        done.add(name)
+
+            logger.info("Pipeline finished in %.2fs: %s",
+                        time.perf_counter() - start,
+                        json.dumps({name: entry['status'] for name, entry in report.items()}))
+            return report
+
+        except Exception as e:
+            logger.error("Error while running pipeline DAG: %s", e)
+            raise CustomException("Pipeline DAG failed", e)
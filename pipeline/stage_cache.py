@@ -0,0 +1,114 @@
+import hashlib
+import inspect
+import json
+import os
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+HASH_INDEX_FILE = "file_hashes.json"
+
+
+def stable_value(value):
+    # JSON-friendly, address-free form of config / params values (scipy frozen distributions included)
+    if isinstance(value, dict):
+        return {str(k): stable_value(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [stable_value(v) for v in value]
+    if hasattr(value, 'dist') and hasattr(value, 'args'):
+        return {"dist": value.dist.name, "args": stable_value(value.args), "kwds": stable_value(value.kwds)}
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def source_files(*objects):
+    # Source files of the modules / classes / functions whose code a stage depends on
+    return sorted({inspect.getsourcefile(obj) for obj in objects})
+
+
+class StageCache:
+
+    # Content-addressed cache of pipeline stages. A stage's fingerprint covers its input file
+    # hashes, config values, params and code; if it matches the last successful run and every
+    # output still has the recorded hash, the stage is skipped and its artifacts are reused.
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._hash_index_path = os.path.join(cache_dir, HASH_INDEX_FILE)
+        self._hash_index = self._read_json(self._hash_index_path) or {}
+
+    @staticmethod
+    def _read_json(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _write_json(self, path, data):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def file_digest(self, path, chunk_size=1 << 20):
+        # Re-hash only when size or mtime changed since the last time this file was hashed
+        stat = os.stat(path)
+        cached = self._hash_index.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        self._hash_index[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        self._write_json(self._hash_index_path, self._hash_index)
+        return digest.hexdigest()
+
+    def fingerprint(self, inputs=(), config=None, code=(), extra=None):
+        state = {
+            "inputs": {path: self.file_digest(path) for path in inputs},
+            "config": stable_value(config),
+            "code": {path: self.file_digest(path) for path in code},
+            "extra": stable_value(extra),
+        }
+        return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+    def _record_path(self, stage):
+        return os.path.join(self.cache_dir, f"{stage}.json")
+
+    def is_fresh(self, stage, fingerprint):
+        record = self._read_json(self._record_path(stage))
+        if record is None or record["fingerprint"] != fingerprint:
+            return False
+        # Outputs must still be there and unmodified to be reused
+        for path, digest in record["outputs"].items():
+            if not os.path.exists(path) or self.file_digest(path) != digest:
+                return False
+        return True
+
+    def record(self, stage, fingerprint, outputs):
+        # Marks a successful run of the stage together with the hashes of what it produced
+        self._write_json(self._record_path(stage), {
+            "fingerprint": fingerprint,
+            "outputs": {path: self.file_digest(path) for path in outputs},
+        })
+
+    def run(self, stage, fn, fingerprint, outputs, force=False):
+        # Runs fn unless the stage is fresh; returns True if it ran
+        try:
+            if not force and self.is_fresh(stage, fingerprint):
+                logger.info("Stage '%s' is up to date (fingerprint %s), reusing cached artifacts",
+                            stage, fingerprint[:12])
+                return False
+
+            logger.info("Running stage '%s'%s", stage, " (forced)" if force else "")
+            fn()
+            self.record(stage, fingerprint, outputs)
+            return True
+
+        except Exception as e:
+            logger.error("Error in stage '%s': %s", stage, e)
+            raise CustomException(f"Stage '{stage}' failed", e)
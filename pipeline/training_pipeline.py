@@ -1,30 +1,133 @@
 import os
+import json
+import argparse
 from src.data_ingestion import DataIngestion
-from src.data_preprocessing import DataPreprocessor 
+from src.data_preprocessing import DataPreprocessor
 from src.model_training import ModelTrainer
-from utils.common_functions import read_yaml
+from src.balancing import class_weight_for
+from src.custom_exception import CustomException
+from src.logger import get_logger
+from src.instrumentation import merge_snapshots, write_metrics
+from utils.common_functions import read_yaml, artifact_path
 from config.paths_config import *
+from config.model_params import LIGHTGBM_PARAMS, RANDOM_SEARCH_PARAMS
+from pipeline.dag import Node, DagRunner
+from pipeline.stage_cache import StageCache, source_files
+import src.balancing, src.data_ingestion, src.data_preprocessing, src.drift_monitor, src.evaluation, \
+    src.experiment_tracker, src.feature_importance, src.hyperparameter_search, src.model_training, \
+    src.preprocessing_transformer, src.streaming_stats, src.tree_predictor, utils.common_functions
 
+logger = get_logger(__name__)
 
-if __name__ == "__main__":
+STAGES = ['ingestion', 'preprocessing', 'training']
+
+
+def build_nodes(config, remote_version):
+    # Stages split into file-to-file nodes; nodes without a path between them run concurrently:
+    # test preprocessing and column alignment alongside train balancing and feature selection.
+    artifact_format = config['artifacts']['format']
 
-    # Data Ingestion pipeline
-    data_ingestion = DataIngestion(read_yaml(CONFIG_PATH))
-    data_ingestion.run()
+    def intermediate(name):
+        return artifact_path(os.path.join(PROCESSED_DIR, f'{name}.csv'), artifact_format)
+
+    train_path = artifact_path(TRAIN_FILE_PATH, artifact_format)
+    test_path = artifact_path(TEST_FILE_PATH, artifact_format)
+    processed_train_path = artifact_path(PROCESSED_TRAIN_DATA_PATH, artifact_format)
+    processed_test_path = artifact_path(PROCESSED_TEST_DATA_PATH, artifact_format)
+    fitted_transformer_path = os.path.join(PROCESSED_DIR, 'preprocessor_fit.json')
 
-    # Data Preprocessing pipeline
     processor = DataPreprocessor(
-        train_path=TRAIN_FILE_PATH,
-        test_path=TEST_FILE_PATH,
+        train_path=train_path,
+        test_path=test_path,
         processed_dir=PROCESSED_DIR,
         config_path=CONFIG_PATH
     )
-    processor.process()
-
-    # Model Training pipeline
+    class_weight = class_weight_for(config['data_processing']['balancing']['strategy'])
     trainer = ModelTrainer(
-            train_path=PROCESSED_TRAIN_DATA_PATH,
-            test_path=PROCESSED_TEST_DATA_PATH,
-            model_output_path=MODEL_FILE_PATH
+            train_path=processed_train_path,
+            test_path=processed_test_path,
+            model_output_path=MODEL_FILE_PATH,
+            class_weight=class_weight,
+            search_config=config['training']['search'],
+            incremental_config=config['training']['incremental'],
+            evaluation_config=config['training']['evaluation'],
+            tracking_config=config['tracking']
         )
-    trainer.run()
\ No newline at end of file
+
+    preprocessing_config = {"data_processing": config['data_processing'], "artifacts": config['artifacts']}
+    preprocessing_code = source_files(src.data_preprocessing, src.balancing, src.drift_monitor, src.feature_importance,
+                                      src.preprocessing_transformer, src.streaming_stats, utils.common_functions)
+
+    def preprocessing_node(name, fn, args, inputs, outputs):
+        return Node(name, fn, args, inputs, outputs, stage='preprocessing',
+                    config=preprocessing_config, code=preprocessing_code)
+
+    return [
+        # Data Ingestion pipeline
+        Node('ingestion', DataIngestion(config).run, outputs=[RAW_FILE_PATH, train_path, test_path],
+             config={"data_ingestion": config['data_ingestion'], "artifacts": config['artifacts']},
+             code=source_files(src.data_ingestion, utils.common_functions),
+             extra={"remote_version": remote_version}),
+
+        # Data Preprocessing pipeline
+        preprocessing_node('preprocess_train', processor.preprocess_split,
+                           (train_path, intermediate('preprocessed_train'), fitted_transformer_path, True),
+                           inputs=[train_path], outputs=[intermediate('preprocessed_train'), fitted_transformer_path]),
+        preprocessing_node('preprocess_test', processor.preprocess_split,
+                           (test_path, intermediate('preprocessed_test'), fitted_transformer_path, False),
+                           inputs=[test_path, fitted_transformer_path], outputs=[intermediate('preprocessed_test')]),
+        preprocessing_node('balance_train', processor.balance_split,
+                           (intermediate('preprocessed_train'), intermediate('balanced_train')),
+                           inputs=[intermediate('preprocessed_train')], outputs=[intermediate('balanced_train')]),
+        preprocessing_node('select_features', processor.select_features_split,
+                           (intermediate('balanced_train'), processed_train_path, fitted_transformer_path,
+                            PREPROCESSOR_FILE_PATH),
+                           inputs=[intermediate('balanced_train'), fitted_transformer_path],
+                           outputs=[processed_train_path, PREPROCESSOR_FILE_PATH]),
+        # The test split is never balanced, so its metrics reflect the real class ratio
+        preprocessing_node('align_test', processor.align_split,
+                           (intermediate('preprocessed_test'), processed_train_path, processed_test_path),
+                           inputs=[intermediate('preprocessed_test'), processed_train_path], outputs=[processed_test_path]),
+
+        # Model Training pipeline
+        Node('training', trainer.run,
+             inputs=[processed_train_path, processed_test_path, PREPROCESSOR_FILE_PATH],
+             outputs=[MODEL_FILE_PATH, COMPILED_MODEL_FILE_PATH],
+             code=source_files(src.model_training, src.hyperparameter_search, src.evaluation, src.experiment_tracker,
+                               src.tree_predictor, utils.common_functions),
+             extra={"lightgbm_params": LIGHTGBM_PARAMS, "random_search_params": RANDOM_SEARCH_PARAMS,
+                    "class_weight": class_weight, "training": config['training']}),
+    ]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Run the training pipeline, skipping stages whose inputs did not change")
+    parser.add_argument('--force', nargs='+', default=[], choices=STAGES + ['all'],
+                        help="re-run these stages even if their cached artifacts are up to date")
+    parser.add_argument('--max-workers', type=int, help="processes running independent nodes (overrides the config)")
+    args = parser.parse_args()
+    forced = set(STAGES) if 'all' in args.force else set(args.force)
+
+    config = read_yaml(CONFIG_PATH)
+
+    try:
+        remote_version = DataIngestion(config).remote_version()
+    except CustomException as ce:
+        # Without the bucket metadata we cannot tell whether the source changed, so always re-run
+        logger.error("Cannot fingerprint the source data, ingestion will run: %s", ce)
+        remote_version = None
+        forced.add('ingestion')
+
+    runner = DagRunner(
+        max_workers=args.max_workers or config['pipeline']['max_workers'],
+        cache=StageCache(STAGE_CACHE_DIR),
+        forced_stages=forced,
+    )
+    report = runner.run(build_nodes(config, remote_version))
+
+    with open(PIPELINE_REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    # Stages shared by several nodes (e.g. preprocessing of train and test) are summed
+    write_metrics(merge_snapshots(entry['stages'] for entry in report.values()), PIPELINE_METRICS_PATH)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,114 @@
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from imblearn.over_sampling import SMOTE
+from sklearn.neighbors import NearestNeighbors
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+# Class balancing strategies for the training split:
+#   smote              exact imblearn SMOTE (k-NN over every minority row)
+#   approximate_smote  SMOTE with neighbours searched inside random chunks of the minority class,
+#                      so the cost grows linearly with the number of rows instead of quadratically
+#   class_weight       no resampling; the trainer passes class_weight='balanced' to LightGBM
+BALANCING_STRATEGIES = ("smote", "approximate_smote", "class_weight")
+
+
+def class_weight_for(strategy):
+    # LightGBM class_weight matching the balancing strategy
+    return "balanced" if strategy == "class_weight" else None
+
+
+def _exact_smote(X, y, k_neighbors, random_state):
+    return SMOTE(random_state=random_state, k_neighbors=k_neighbors).fit_resample(X, y)
+
+
+def _approximate_smote(X, y, k_neighbors, chunk_size, random_state):
+    # Every class is oversampled up to the majority count, like SMOTE's default 'auto' strategy.
+    # Rows of a class are shuffled into chunks of at most chunk_size and each synthetic row
+    # interpolates between a row and one of its k nearest neighbours within the same chunk.
+    rng = np.random.default_rng(random_state)
+    values = X.to_numpy(dtype=np.float64)
+    labels = y.to_numpy()
+    classes, counts = np.unique(labels, return_counts=True)
+
+    synthetic_X, synthetic_y = [], []
+    for cls, count in zip(classes, counts):
+        n_new = counts.max() - count
+        if n_new == 0:
+            continue
+        members = values[labels == cls]
+        chunks = np.array_split(rng.permutation(len(members)), max(1, -(-len(members) // chunk_size)))
+        samples_per_chunk = rng.multinomial(n_new, [len(chunk) / len(members) for chunk in chunks])
+
+        for chunk, n_samples in zip(chunks, samples_per_chunk):
+            rows = members[chunk]
+            base = rng.integers(0, len(rows), n_samples)
+            k = min(k_neighbors, len(rows) - 1)
+            if k < 1:
+                synthetic_X.append(rows[base])
+            else:
+                neighbours = NearestNeighbors(n_neighbors=k + 1).fit(rows).kneighbors(rows, return_distance=False)[:, 1:]
+                partner = neighbours[base, rng.integers(0, k, n_samples)]
+                gap = rng.random(n_samples)[:, None]
+                synthetic_X.append(rows[base] + gap * (rows[partner] - rows[base]))
+            synthetic_y.append(np.full(n_samples, cls, dtype=labels.dtype))
+
+    if not synthetic_X:
+        return X, y
+    # Same output layout as imblearn: originals first, synthetic rows appended, original dtypes restored
+    X_resampled = pd.concat([X, pd.DataFrame(np.vstack(synthetic_X), columns=X.columns)], ignore_index=True)
+    y_resampled = pd.Series(np.concatenate([labels] + synthetic_y), name=y.name)
+    return X_resampled.astype(X.dtypes.to_dict()), y_resampled
+
+
+def balance(df, strategy="smote", target="booking_status", k_neighbors=5, chunk_size=10000, random_state=42,
+            trace_memory=False):
+    # Returns the balanced frame and a report of wall time, peak traced memory and output size.
+    # tracemalloc slows every allocation down, so the peak is only traced with trace_memory=True
+    # (the balancing benchmark); otherwise peak_memory_mb is None.
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    try:
+        if strategy not in BALANCING_STRATEGIES:
+            raise ValueError(f"Unknown balancing strategy '{strategy}', expected one of {list(BALANCING_STRATEGIES)}")
+
+        if tracing:
+            tracemalloc.start()
+        if trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+
+        if strategy == "class_weight":
+            balanced_df = df
+        else:
+            X = df.drop(columns=[target])
+            y = df[target]
+            if strategy == "smote":
+                X_resampled, y_resampled = _exact_smote(X, y, k_neighbors, random_state)
+            else:
+                X_resampled, y_resampled = _approximate_smote(X, y, k_neighbors, chunk_size, random_state)
+            balanced_df = pd.DataFrame(X_resampled, columns=X.columns)
+            balanced_df[target] = np.asarray(y_resampled)
+
+        report = {
+            "strategy": strategy,
+            "wall_time_s": time.perf_counter() - start,
+            "peak_memory_mb": (tracemalloc.get_traced_memory()[1] - baseline) / 2 ** 20 if trace_memory else None,
+            "rows_in": len(df),
+            "rows_out": len(balanced_df),
+            "output_mb": balanced_df.memory_usage(index=False).sum() / 2 ** 20,
+            "class_counts": {str(k): int(v) for k, v in balanced_df[target].value_counts().sort_index().items()},
+        }
+        return balanced_df, report
+
+    except Exception as e:
+        logger.error("Error balancing data with %s: %s", strategy, e)
+        raise CustomException("Data balancing failed", e)
+
+    finally:
+        if tracing:
+            tracemalloc.stop()
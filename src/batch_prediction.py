@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+import numpy as np
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+# Features that may have a fractional part, everything else must be an integer
+FLOAT_FEATURES = {'lead_time', 'avg_price_per_room'}
+
+
+def model_feature_columns(model):
+    # Columns in the order the model was trained on: feature_name_ of an LGBMClassifier,
+    # feature_names_in_ of a CompiledTreeModel
+    names = getattr(model, 'feature_name_', None)
+    if names is None:
+        names = getattr(model, 'feature_names_in_', None)
+    if names is None and hasattr(model, 'booster_'):
+        names = model.booster_.feature_name()
+    if names is None:
+        raise CustomException(f"{type(model).__name__} does not record the feature names it was trained on")
+    return [str(name) for name in names]
+
+
+def parse_records(body, content_type):
+    # Turn a request body into a list of dicts, one per reservation
+    try:
+        content_type = (content_type or '').split(';')[0].strip().lower()
+        text = body.decode('utf-8') if isinstance(body, bytes) else body
+
+        if content_type == 'text/csv':
+            return list(csv.DictReader(io.StringIO(text)))
+
+        if content_type in ('application/x-ndjson', 'application/jsonlines'):
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+        payload = json.loads(text)
+        # Accept both a bare JSON array and {"instances": [...]}
+        if isinstance(payload, dict):
+            payload = payload.get('instances')
+        if not isinstance(payload, list):
+            raise ValueError("JSON body must be an array of records or {'instances': [...]}")
+        return payload
+
+    except Exception as e:
+        logger.error("Error parsing batch request body: %s", e)
+        raise CustomException("Failed to parse batch request body", e)
+
+
+def _parse_value(column, value):
+    if value is None or value == '':
+        raise ValueError(f"missing value for '{column}'")
+    number = float(value)
+    if not np.isfinite(number):
+        raise ValueError(f"'{column}' must be a finite number")
+    if column not in FLOAT_FEATURES and not number.is_integer():
+        raise ValueError(f"'{column}' must be an integer")
+    return number
+
+
+def build_feature_matrix(records, transformer=None, feature_columns=None):
+    # Validate every record into one contiguous float matrix.
+    # Invalid rows are skipped and reported instead of failing the whole batch.
+    # Without a transformer, records hold encoded values and feature_columns (model_feature_columns
+    # of the serving model) gives the column order.
+    if transformer is not None:
+        return _build_transformed_matrix(records, transformer)
+    if feature_columns is None:
+        raise ValueError("feature_columns is required when there is no transformer")
+
+    features = np.empty((len(records), len(feature_columns)), dtype=np.float64)
+    row_ids = []
+    errors = []
+
+    for i, record in enumerate(records):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError("record must be an object")
+            missing = [col for col in feature_columns if col not in record]
+            if missing:
+                raise ValueError(f"missing fields: {missing}")
+            features[len(row_ids)] = [_parse_value(col, record[col]) for col in feature_columns]
+            row_ids.append(i)
+        except (TypeError, ValueError) as e:
+            errors.append({"row": i, "error": str(e)})
+
+    # Slicing a C-contiguous array on the first axis keeps it contiguous
+    features = features[:len(row_ids)]
+    logger.debug("Built feature matrix with %d valid rows and %d invalid rows", len(row_ids), len(errors))
+    return features, row_ids, errors
+
+
+def _build_transformed_matrix(records, transformer):
+    # Raw values (categorical strings or codes) go through the fitted training preprocessing,
+    # one vectorized lookup per column instead of per-row mapping
+    columns = {col: [None] * len(records) for col in transformer.feature_columns}
+    errors = {}
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[i] = "record must be an object"
+            continue
+        missing = [col for col in transformer.feature_columns if col not in record]
+        if missing:
+            errors[i] = f"missing fields: {missing}"
+            continue
+        for col in transformer.feature_columns:
+            columns[col][i] = record[col]
+
+    features, row_errors = transformer.transform_columns(columns)
+    for i, error in enumerate(row_errors):
+        if error is not None and i not in errors:
+            errors[i] = error
+
+    valid = np.ones(len(records), dtype=bool)
+    valid[list(errors)] = False
+    row_ids = np.flatnonzero(valid).tolist()
+    features = np.ascontiguousarray(features[valid])
+    logger.debug("Built feature matrix with %d valid rows and %d invalid rows", len(row_ids), len(errors))
+    return features, row_ids, [{"row": i, "error": errors[i]} for i in sorted(errors)]
+
+
+def _score(model, chunk):
+    if hasattr(model, 'predict_proba'):
+        probabilities = model.predict_proba(chunk)
+        classes = model.classes_ if hasattr(model, 'classes_') else np.arange(probabilities.shape[1])
+        return classes[probabilities.argmax(axis=1)], probabilities
+    return model.predict(chunk), None
+
+
+def predict_in_chunks(model, features, row_ids, chunk_size, shadow_model=None, on_shadow=None, labels=None):
+    # One predict / predict_proba call per chunk instead of one per row.
+    # A shadow model scores the same chunk; only its agreement with the primary model is reported.
+    # labels maps encoded predictions back to the original booking_status values.
+    for start in range(0, len(row_ids), chunk_size):
+        chunk = features[start:start + chunk_size]
+        predictions, probabilities = _score(model, chunk)
+
+        if shadow_model is not None and on_shadow is not None:
+            try:
+                shadow_predictions, _ = _score(shadow_model, chunk)
+                on_shadow(int((shadow_predictions == predictions).sum()), len(chunk))
+            except Exception as e:
+                logger.error("Shadow scoring failed: %s", e)
+
+        for offset, row in enumerate(row_ids[start:start + chunk_size]):
+            result = {"row": row, "prediction": int(predictions[offset])}
+            if labels is not None:
+                result["label"] = labels[int(predictions[offset])]
+            if probabilities is not None:
+                result["probability"] = float(probabilities[offset].max())
+            yield result
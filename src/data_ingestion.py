@@ -1,11 +1,12 @@
 import os
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from google.cloud import storage
 from src.logger import get_logger
 from src.custom_exception import CustomException
 from config.paths_config import *
-from utils.common_functions import read_yaml
+from utils.common_functions import read_yaml, artifact_path, save_data
+from src.storage import ChunkedDownloader, storage_from_config
+from src.instrumentation import timed
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -19,39 +20,61 @@ class DataIngestion:
         self.bucket_name = self.config["bucket_name"]
         self.file_name = self.config["bucket_file_name"]
         self.train_test_ratio = self.config["train_ratio"]
+        self.artifact_format = config["artifacts"]["format"]
+        self.train_file_path = artifact_path(TRAIN_FILE_PATH, self.artifact_format)
+        self.test_file_path = artifact_path(TEST_FILE_PATH, self.artifact_format)
+        self.storage_config = self.config["storage"]
+        self.download_report = None
 
         # Storing all raw files in the artifacts/raw directory
         os.makedirs(RAW_DIR, exist_ok=True)
-        logger.info(f"Data ingestion is started with {self.bucket_name} bucket and {self.file_name} file.")
+        logger.info("Data ingestion is started with %s bucket and %s file.", self.bucket_name, self.file_name)
 
+    @timed("ingestion.download")
     def download_csv_from_gcp(self):
+        # Parallel ranged download, skipped when the local copy already matches the object
+        # (see src/storage.py); the "local" backend reads from a directory instead of the bucket
         try:
-            client = storage.Client()
-            bucket = client.bucket(self.bucket_name)
-            blob = bucket.blob(self.file_name) # File naeme in the bucket
-            blob.download_to_filename(RAW_FILE_PATH)  # Download the file to the local path
-            
-            logger.info(f"File {self.file_name} downloaded from bucket {self.bucket_name} to {RAW_FILE_PATH}.")
+            downloader = ChunkedDownloader(
+                storage_from_config(self.config),
+                chunk_size=self.storage_config["chunk_size_mb"] * 2 ** 20,
+                workers=self.storage_config["workers"],
+            )
+            self.download_report = downloader.download(self.file_name, RAW_FILE_PATH)
+            logger.info("File %s from bucket %s is at %s (%s).",
+                        self.file_name, self.bucket_name, RAW_FILE_PATH, self.download_report['status'])
 
         except Exception as e:
-            logger.error(f"Error downloading file from GCP: {e}")
+            logger.error("Error downloading file from GCP: %s", e)
             raise CustomException("Failed to download file from GCP", e)
         
+    def remote_version(self):
+        # Identity of the object in the bucket (generation + MD5), used to tell whether it changed
+        try:
+            info = storage_from_config(self.config).stat(self.file_name)
+            return f"{info.generation}:{info.md5}"
+
+        except Exception as e:
+            logger.error("Error reading object metadata from GCP: %s", e)
+            raise CustomException("Failed to read object metadata from GCP", e)
+
+    @timed("ingestion.split")
     def split_data(self):
         try:
             logger.info("Starting data split into train and test sets.")
             # Read the raw data
             data = pd.read_csv(RAW_FILE_PATH)
-            logger.info(f"Raw data read successfully with shape: {data.shape}")
+            logger.info("Raw data read successfully with shape: %s", data.shape)
             
             # Split the data into train and test sets
             train_data, test_data = train_test_split(data, test_size = 1-self.train_test_ratio, random_state=42)
-            train_data.to_csv(TRAIN_FILE_PATH, index=False)
-            test_data.to_csv(TEST_FILE_PATH, index=False)
-            logger.info(f"Data split completed. Train data shape: {train_data.shape}, Test data shape: {test_data.shape}")
+            save_data(train_data, self.train_file_path)
+            save_data(test_data, self.test_file_path)
+            logger.info("Data split completed. Train data shape: %s, Test data shape: %s",
+                        train_data.shape, test_data.shape)
         
         except Exception as e:
-            logger.error(f"Error while splitting data: {e}")
+            logger.error("Error while splitting data: %s", e)
             raise CustomException("Failed to split data", e)
         
     def run(self):
@@ -66,9 +89,11 @@ class DataIngestion:
             self.split_data()
             logger.info("Data ingestion process completed successfully.")
         
-        except CustomException as ce:  
-            logger.error(f"CustomeException  {str(ce)}")
-            
+        except CustomException as ce:
+            # Re-raised: splitting after a failed download would silently reuse the stale raw file
+            logger.error("CustomeException  %s", str(ce))
+            raise
+
         finally:
             logger.info("Data ingestion process finished.")
     
@@ -1,13 +1,18 @@
 import os
+import time
+import logging
 import pandas as pd
 import numpy as np
 from src.logger import get_logger
 from src.custom_exception import CustomException
 from config.paths_config import *
-from utils.common_functions import read_yaml, load_data
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import LabelEncoder
-from imblearn.over_sampling import SMOTE
+from utils.common_functions import read_yaml, load_data, save_data, artifact_path, iter_data_chunks, ChunkedDataWriter
+from src.streaming_stats import MomentAccumulator, HashSet
+from src.feature_importance import rank_features, ImportanceCache
+from src.balancing import balance
+from src.preprocessing_transformer import PreprocessingTransformer, TARGET_COLUMN
+from src.drift_monitor import ReferenceBuilder
+from src.instrumentation import timed
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -20,139 +25,288 @@ class DataPreprocessor:
         self.processed_dir = processed_dir
 
         self.config= read_yaml(config_path)
+        self.artifact_format = self.config['artifacts']['format']
+        self.transformer = PreprocessingTransformer()
 
         if not os.path.exists(self.processed_dir):
             os.makedirs(self.processed_dir)
-            logger.info(f"Created directory: {self.processed_dir}")
+            logger.info("Created directory: %s", self.processed_dir)
         else:
-            logger.info(f"Directory already exists: {self.processed_dir}")
+            logger.info("Directory already exists: %s", self.processed_dir)
 
-    def prepreprocess_data(self, df):
+    @timed("preprocessing.preprocess")
+    def prepreprocess_data(self, df, fit=True):
+        # fit=True learns the encoders and skewed columns from df (train);
+        # fit=False reuses them (test), so both splits share one encoding
         try:
             logger.info("Starting data preprocessing...")
 
             logger.info("Dropping teh columns")
             df.drop(columns=['Booking_ID'], inplace=True, errors='ignore')
+            # Serving sees repeated bookings too, so the reference statistics keep the duplicates
+            reference_rows = df.drop(columns=[TARGET_COLUMN], errors='ignore') if fit else None
             df.drop_duplicates(inplace=True)
-            logger.info(f"Dropped duplicates")
+            logger.info("Dropped duplicates")
 
             cat_cols = self.config['data_processing']['categorical_columns']
             num_cols = self.config['data_processing']['numerical_columns']
-
-            logger.info("Applying Label Encoding")
-            label_encoder = LabelEncoder()
-            mappings={}
-            for col in cat_cols:
-                df[col] = label_encoder.fit_transform(df[col])
-                mappings[col] = {label:code for label,code in zip(label_encoder.classes_, label_encoder.transform(label_encoder.classes_))}
-            logger.info("Label Encoding applied successfully")
-            logger.info("Label Mappings are: ")
-            for col, mapping in mappings.items():
-                logger.info(f"{col}: {mapping}")
-
-            logger.info("Handling Skewness")
             skew_threshold = self.config['data_processing']['skewness_threshold']
 
-            skewness = df[num_cols].apply(lambda x:x.skew())
+            if fit:
+                logger.info("Fitting Label Encoding and Skewness handling")
+                self.transformer.fit(df, cat_cols, num_cols, skew_threshold)
+                # Only built when debug logging is on; the mappings are also saved in preprocessor.json
+                if logger.isEnabledFor(logging.DEBUG):
+                    for col, classes in self.transformer.classes.items():
+                        logger.debug("Label mapping of %s: %s", col, dict(zip(classes, range(len(classes)))))
+
+            logger.info("Applying Label Encoding and Handling Skewness")
+            df = self.transformer.transform(df)
+
+            if fit:
+                # Feature distributions the serving drift monitor compares requests against
+                self.transformer.reference = (ReferenceBuilder(cat_cols)
+                                              .update(self.transformer.transform(reference_rows)).result())
 
-            for colum in skewness[skewness > skew_threshold].index:
-                df[colum] = np.log1p(df[colum])
-            
             return df
             
         except Exception as e:
-            logger.error(f"Error during preprocessing steps: {e}")
+            logger.error("Error during preprocessing steps: %s", e)
             raise CustomException("Data preprocessing failed", e)
 
+    def fit_streaming(self, path, chunk_size):
+        # Pass 1: fit the label encoders and gather skewness moments chunk by chunk.
+        # Duplicates are detected across chunks by row hash, so statistics match drop_duplicates().
+        try:
+            logger.info("Fitting preprocessing statistics on %s in streaming mode", path)
+            cat_cols = self.config['data_processing']['categorical_columns']
+            num_cols = self.config['data_processing']['numerical_columns']
+
+            categories = {col: set() for col in cat_cols}
+            moments = MomentAccumulator(len(num_cols))
+            seen_rows = HashSet()
+
+            for chunk in iter_data_chunks(path, chunk_size):
+                chunk = self._drop_duplicate_rows(chunk, seen_rows)
+                for col in cat_cols:
+                    categories[col].update(chunk[col].unique().tolist())
+                moments.update(chunk[num_cols].to_numpy(dtype=np.float64))
+
+            # LabelEncoder assigns codes in sorted order of the classes
+            mappings = {col: sorted(values) for col, values in categories.items()}
+            skew_threshold = self.config['data_processing']['skewness_threshold']
+            skewness = pd.Series(moments.skewness(), index=num_cols)
+            skewed_cols = skewness[skewness > skew_threshold].index.tolist()
+
+            logger.info("Streaming fit done on %d unique rows, skewed columns: %s", len(seen_rows), skewed_cols)
+            return mappings, skewed_cols
+
+        except Exception as e:
+            logger.error("Error during streaming fit: %s", e)
+            raise CustomException("Streaming preprocessing fit failed", e)
+
+    @staticmethod
+    def _drop_duplicate_rows(chunk, seen_rows):
+        # Keep the first occurrence within the chunk and drop rows already seen in earlier chunks.
+        # seen_rows holds one uint64 hash per distinct row, so it grows by 8 bytes per unique row on
+        # top of the chunk-sized working set.
+        chunk = chunk.drop(columns=['Booking_ID'], errors='ignore')
+        row_hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        return chunk[seen_rows.add_new(row_hashes)]
+
+    @timed("preprocessing.stream_preprocess")
+    def stream_preprocess(self, input_path, output_path, chunk_size, fit=True):
+        # Streaming counterpart of prepreprocess_data: peak memory is one chunk of chunk_size rows plus
+        # the 8-byte hash per unique row kept for deduplication, not the whole file
+        try:
+            if fit:
+                self.transformer.set_classes(*self.fit_streaming(input_path, chunk_size))
+
+            logger.info("Transforming %s into %s in streaming mode", input_path, output_path)
+            seen_rows = HashSet()
+            reference = ReferenceBuilder(self.config['data_processing']['categorical_columns'])
+            with ChunkedDataWriter(output_path) as writer:
+                for chunk in iter_data_chunks(input_path, chunk_size):
+                    if fit:
+                        # Duplicates included, as in prepreprocess_data
+                        reference.update(self.transformer.transform(
+                            chunk.drop(columns=['Booking_ID', TARGET_COLUMN], errors='ignore')))
+                    writer.write(self.transformer.transform(self._drop_duplicate_rows(chunk, seen_rows)))
+            if fit:
+                self.transformer.reference = reference.result()
+
+            logger.info("Streaming preprocessing completed successfully")
+
+        except Exception as e:
+            logger.error("Error during streaming preprocessing: %s", e)
+            raise CustomException("Streaming preprocessing failed", e)
+
+    @timed("preprocessing.balance")
     def balanced_data(self, df):
+        # Only ever applied to the train split; test keeps its real class ratio so its metrics stay honest
         try:
             logger.info("Starting data balancing...")
-            X = df.drop(columns=['booking_status'])
-            y = df['booking_status']
-
-            smote = SMOTE(random_state=42)
-            X_resampled, y_resampled = smote.fit_resample(X, y)
+            balancing_config = self.config['data_processing']['balancing']
+            balanced_df, report = balance(
+                df,
+                strategy=balancing_config['strategy'],
+                k_neighbors=balancing_config['k_neighbors'],
+                chunk_size=balancing_config['chunk_size'],
+            )
 
-            balanced_df = pd.DataFrame(X_resampled, columns=X.columns)
-            balanced_df['booking_status'] = y_resampled
-        
-            logger.info("Data balancing completed successfully")
+            logger.info("Data balancing completed successfully: %s", report)
             return balanced_df
-        
+
         except Exception as e:
-            logger.error(f"Error during data balancing step: {e}")
+            logger.error("Error during data balancing step: %s", e)
             raise CustomException("Data balancing failed", e)
-        
+
+    @timed("preprocessing.select_features")
     def select_features(self, df):
         try:
             logger.info("Starting feature selection...")
             X = df.drop(columns=['booking_status'])
             y = df['booking_status']
 
-            model = RandomForestRegressor(random_state=42)
-            model.fit(X, y)
+            selection_config = self.config['data_processing']['feature_selection']
+            settings = {
+                "backend": selection_config['backend'],
+                "sample_rows": selection_config['sample_rows'],
+                "random_state": 42,
+            }
+            cache = ImportanceCache(FEATURE_IMPORTANCE_CACHE_DIR) if selection_config['cache'] else None
+            cache_key = cache.key(df, settings) if cache is not None else None
+            ranking = cache.get(cache_key) if cache is not None else None
+
+            if ranking is None:
+                start = time.perf_counter()
+                ranking = rank_features(X, y, n_jobs=selection_config['n_jobs'], **settings)
+                logger.info("Ranked features with %s in %.2fs", settings['backend'], time.perf_counter() - start)
+                if cache is not None:
+                    cache.put(cache_key, ranking)
+            else:
+                logger.info("Reusing cached %s feature ranking %s", settings['backend'], cache_key[:12])
 
-            feature_importance = model.feature_importances_
-            feature_importance_df = pd.DataFrame({
-                'Feature': X.columns,
-                'Importance': feature_importance
-                })
-            top_important_features_df = feature_importance_df.sort_values(by='Importance', ascending=False)
             num_features_to_select = self.config['data_processing']['no_of_features']
 
-            top_10_features = top_important_features_df['Feature'].head(num_features_to_select).values
+            top_10_features = ranking.index[:num_features_to_select]
             top_10_df = df[top_10_features.tolist() + ['booking_status']].copy()
+            self.transformer.feature_columns = top_10_features.tolist()
             
             logger.info("Selected top features based on importance")
-            logger.info("Selected features: {selected_features}")
+            logger.info("Selected features: %s", top_10_features.tolist())
             
             return top_10_df
         
         except Exception as e:
-            logger.error(f"Error during feature selection step: {e}")
+            logger.error("Error during feature selection step: %s", e)
             raise CustomException("Feature selection failed", e)
         
     def save_data(self, df, file_path):
         try:
-            logger.info(f"Saving data to: {file_path}")
-            df.to_csv(file_path, index=False)
-            logger.info(f"Data saved successfully at: {file_path}")
+            logger.info("Saving data to: %s", file_path)
+            save_data(df, file_path)
+            logger.info("Data saved successfully at: %s", file_path)
             
         except Exception as e:
-            logger.error(f"Error saving data: {e}")
+            logger.error("Error saving data: %s", e)
             raise CustomException("Failed to save data", e)
-        
+
+    # File-to-file steps of process(), so the pipeline can schedule them as separate DAG nodes.
+    # The fitted transformer is handed from one step to the next through JSON files.
+    def preprocess_split(self, input_path, output_path, transformer_path, fit=True):
+        try:
+            if not fit:
+                self.transformer = PreprocessingTransformer.load(transformer_path)
+
+            streaming_config = self.config['data_processing']['streaming']
+            if streaming_config['enabled']:
+                self.stream_preprocess(input_path, output_path, streaming_config['chunk_size'], fit=fit)
+            else:
+                df = self.prepreprocess_data(load_data(input_path), fit=fit)
+                self.save_data(df, output_path)
+
+            if fit:
+                self.transformer.save(transformer_path)
+
+        except Exception as e:
+            logger.error("Error preprocessing %s: %s", input_path, e)
+            raise CustomException("Preprocessing step failed", e)
+
+    def balance_split(self, input_path, output_path):
+        try:
+            self.save_data(self.balanced_data(load_data(input_path)), output_path)
+
+        except Exception as e:
+            logger.error("Error balancing %s: %s", input_path, e)
+            raise CustomException("Balancing step failed", e)
+
+    def select_features_split(self, input_path, output_path, transformer_path, output_transformer_path):
+        # Fits the feature ranking on input_path and stores the selected columns in the final transformer
+        try:
+            self.transformer = PreprocessingTransformer.load(transformer_path)
+            self.save_data(self.select_features(load_data(input_path)), output_path)
+            self.transformer.save(output_transformer_path)
+
+        except Exception as e:
+            logger.error("Error selecting features on %s: %s", input_path, e)
+            raise CustomException("Feature selection step failed", e)
+
+    def align_split(self, input_path, reference_path, output_path):
+        # Keep the columns (and column order) of the reference file, e.g. test -> processed train
+        try:
+            columns = load_data(reference_path).columns
+            self.save_data(load_data(input_path)[columns], output_path)
+
+        except Exception as e:
+            logger.error("Error aligning %s to %s: %s", input_path, reference_path, e)
+            raise CustomException("Column alignment step failed", e)
+
     def process(self):
         try:
-            logger.info("Loading the dat afrom RAW directory")
-            train_df = load_data(self.train_path)
-            test_df = load_data(self.test_path)
-            logger.info("Data loaded successfully")
+            streaming_config = self.config['data_processing']['streaming']
+            if streaming_config['enabled']:
+                # Encode and transform chunk by chunk, then load only the compact preprocessed frames
+                chunk_size = streaming_config['chunk_size']
+                preprocessed_paths = [
+                    artifact_path(os.path.join(self.processed_dir, f'preprocessed_{split}.csv'), self.artifact_format)
+                    for split in ('train', 'test')
+                ]
+                self.stream_preprocess(self.train_path, preprocessed_paths[0], chunk_size)
+                self.stream_preprocess(self.test_path, preprocessed_paths[1], chunk_size, fit=False)
+                train_df = load_data(preprocessed_paths[0])
+                test_df = load_data(preprocessed_paths[1])
+            else:
+                logger.info("Loading the dat afrom RAW directory")
+                train_df = load_data(self.train_path)
+                test_df = load_data(self.test_path)
+                logger.info("Data loaded successfully")
 
-            train_df = self.prepreprocess_data(train_df)
-            test_df = self.prepreprocess_data(test_df)
+                train_df = self.prepreprocess_data(train_df)
+                test_df = self.prepreprocess_data(test_df, fit=False)
             logger.info("Preprocessing completed successfully")
 
             train_df = self.balanced_data(train_df)
-            test_df = self.balanced_data(test_df)
             logger.info("Data balancing completed successfully")
 
             train_df = self.select_features(train_df)
             test_df = test_df[train_df.columns]
             logger.info("Feature selection completed successfully")
 
-            self.save_data(train_df, os.path.join(self.processed_dir, 'processed_train.csv'))
-            self.save_data(test_df, os.path.join(self.processed_dir, 'processed_test.csv'))
+            self.save_data(train_df, artifact_path(os.path.join(self.processed_dir, 'processed_train.csv'), self.artifact_format))
+            self.save_data(test_df, artifact_path(os.path.join(self.processed_dir, 'processed_test.csv'), self.artifact_format))
+            self.transformer.save(os.path.join(self.processed_dir, os.path.basename(PREPROCESSOR_FILE_PATH)))
             logger.info("Data processing completed successfully")
 
         except Exception as e:
-            logger.error(f"Error during data processing: {e}")
+            logger.error("Error during data processing: %s", e)
             raise CustomException("Data processing failed", e)
 
 if __name__ == "__main__":
+    artifact_format = read_yaml(CONFIG_PATH)['artifacts']['format']
     processor = DataPreprocessor(
-        train_path=TRAIN_FILE_PATH,
-        test_path=TEST_FILE_PATH,
+        train_path=artifact_path(TRAIN_FILE_PATH, artifact_format),
+        test_path=artifact_path(TEST_FILE_PATH, artifact_format),
         processed_dir=PROCESSED_DIR,
         config_path=CONFIG_PATH
     )
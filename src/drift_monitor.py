@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from src.logger import get_logger
+from src.streaming_stats import QuantileSketch
+
+logger = get_logger(__name__)
+
+# Reference numeric features get PSI_BINS equal-frequency bins and their CDF at KS_GRID + 1
+# quantiles; REFERENCE_SKETCH_SIZE keeps the reference quantiles within ~0.05% in rank
+PSI_BINS = 10
+KS_GRID = 100
+REFERENCE_SKETCH_SIZE = 4096
+
+# Floor of the bin proportions in the PSI, so an empty bin does not make it infinite
+PSI_EPSILON = 1e-4
+
+
+class ReferenceBuilder:
+
+    # Reference statistics of the model features, fitted by DataPreprocessor on the encoded and
+    # log1p-transformed train split before deduplication and balancing, so they describe real
+    # bookings in the same space as the serving feature matrix. DataFrames are added chunk by chunk, which lets the
+    # streaming preprocessing build them too. Stored in the PreprocessingTransformer JSON, so
+    # they travel with each registered model version.
+    def __init__(self, categorical_columns):
+        self.categorical_columns = set(categorical_columns)
+        self.rows = 0
+        self._counts = {}
+        self._sketches = {}
+
+    def update(self, df):
+        self.rows += len(df)
+        for col in df.columns:
+            values = df[col].to_numpy(dtype=np.float64)
+            if col in self.categorical_columns:
+                codes = values[values >= 0].astype(np.int64)
+                counts = np.bincount(codes, minlength=len(self._counts.get(col, [])))
+                previous = self._counts.get(col, np.zeros(0, dtype=np.int64))
+                counts[:len(previous)] += previous
+                self._counts[col] = counts
+            else:
+                self._sketches.setdefault(col, QuantileSketch(REFERENCE_SKETCH_SIZE)).update(values)
+        return self
+
+    def result(self):
+        features = {}
+        for col, counts in self._counts.items():
+            features[col] = {"type": "categorical", "proportions": (counts / max(counts.sum(), 1)).tolist()}
+        for col, sketch in self._sketches.items():
+            edges = np.unique(sketch.quantiles(np.linspace(0, 1, PSI_BINS + 1)[1:-1]))
+            grid = np.unique(sketch.quantiles(np.linspace(0, 1, KS_GRID + 1)))
+            features[col] = {
+                "type": "numeric",
+                "edges": edges.tolist(),
+                "proportions": np.diff(np.r_[0.0, sketch.cdf(edges), 1.0]).tolist(),
+                "grid": grid.tolist(),
+                "cdf": sketch.cdf(grid).tolist(),
+            }
+        return {"rows": self.rows, "features": features}
+
+
+def psi(expected, actual):
+    # Population stability index between two sets of bin proportions
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class _Window:
+
+    # Constant-memory statistics of the rows seen since the window started, one entry per model
+    # feature: bin counts on the reference edges and a quantile sketch for numeric features,
+    # category counts (plus one bucket for unknown codes) for categorical ones
+    def __init__(self, reference, feature_columns, sketch_size):
+        self.rows = 0
+        self.started_at = time.time()
+        self.features = []
+        for j, col in enumerate(feature_columns):
+            ref = reference["features"].get(col)
+            if ref is None:
+                continue
+            if ref["type"] == "numeric":
+                state = {"bins": np.zeros(len(ref["edges"]) + 1, dtype=np.int64),
+                         "sketch": QuantileSketch(sketch_size)}
+            else:
+                state = {"categories": np.zeros(len(ref["proportions"]) + 1, dtype=np.int64)}
+            self.features.append((j, col, ref, state))
+
+    def update(self, features):
+        self.rows += len(features)
+        for j, _, ref, state in self.features:
+            values = features[:, j]
+            if ref["type"] == "numeric":
+                # Bin i holds edges[i-1] < value <= edges[i], like the reference proportions
+                state["bins"] += np.bincount(np.searchsorted(ref["edges"], values, side='left'),
+                                             minlength=len(state["bins"]))
+                state["sketch"].update(values)
+            else:
+                n_classes = len(ref["proportions"])
+                known = (values >= 0) & (values < n_classes) & (np.mod(values, 1) == 0)
+                state["categories"] += np.bincount(np.where(known, values, n_classes).astype(np.int64),
+                                                   minlength=n_classes + 1)
+
+    def report(self, min_rows, psi_threshold, ks_threshold):
+        features = {}
+        drifted = []
+        for _, col, ref, state in self.features:
+            if ref["type"] == "numeric":
+                live = state["bins"] / max(state["bins"].sum(), 1)
+                ks = float(np.max(np.abs(state["sketch"].cdf(ref["grid"]) - ref["cdf"]))) if self.rows else None
+                median, p95 = (state["sketch"].quantiles([0.5, 0.95]).tolist() if self.rows else (None, None))
+                entry = {"psi": psi(ref["proportions"], live) if self.rows else None, "ks": ks,
+                         "median": median, "p95": p95}
+                drift = self.rows > 0 and (entry["psi"] > psi_threshold or ks > ks_threshold)
+            else:
+                counts = state["categories"]
+                live = counts[:-1] / max(counts.sum(), 1)
+                entry = {"psi": psi(ref["proportions"], live) if self.rows else None,
+                         "unknown_rate": float(counts[-1] / max(counts.sum(), 1))}
+                drift = self.rows > 0 and entry["psi"] > psi_threshold
+            if self.rows >= min_rows:
+                entry["status"] = "drift" if drift else "ok"
+                if drift:
+                    drifted.append(col)
+            features[col] = entry
+
+        status = "insufficient_data" if self.rows < min_rows else ("drift" if drifted else "ok")
+        return {"rows": self.rows, "started_at": self.started_at, "status": status,
+                "drifted_features": drifted, "features": features}
+
+
+class DriftMonitor:
+
+    # Compares the features of served requests with the reference statistics of the model's
+    # transformer (PSI per feature, plus the KS distance for numeric features).
+    # observe() only appends the request's feature matrix to a bounded deque, so the prediction
+    # path pays well under a microsecond and never waits; when the deque is full the matrix is
+    # dropped and counted. A background thread folds the queued matrices into the current
+    # window every flush_interval_s, one vectorized update per batch of requests. After
+    # window_rows rows the window's report is kept as last_window and a new window starts.
+    # A transformer without reference statistics (trained before they existed) is not monitored.
+    def __init__(self, window_rows=100000, min_rows=500, psi_threshold=0.2, ks_threshold=0.1, sketch_size=256,
+                 max_pending=10000, flush_interval_s=1.0):
+        self.window_rows = window_rows
+        self.min_rows = min_rows
+        self.psi_threshold = psi_threshold
+        self.ks_threshold = ks_threshold
+        self.sketch_size = sketch_size
+        self.max_pending = max_pending
+        self.flush_interval_s = flush_interval_s
+
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._transformer = None
+        self._window = None
+        self._last_window = None
+        self.observed_rows = 0
+        self.dropped_batches = 0
+
+        self._worker = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+        self._worker.start()
+        logger.info("Drift monitor started with window_rows=%s", window_rows)
+
+    def observe(self, features, transformer):
+        # Hot path: features is the model input matrix built with transformer; it must not be modified afterwards
+        if transformer is None or getattr(transformer, 'reference', None) is None or not len(features):
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped_batches += 1
+            return
+        self._pending.append((features, transformer))
+
+    def _drain(self):
+        # Consecutive matrices of the same transformer are stacked into one update
+        groups = []
+        while self._pending:
+            features, transformer = self._pending.popleft()
+            if groups and groups[-1][1] is transformer:
+                groups[-1][0].append(features)
+            else:
+                groups.append(([features], transformer))
+        return groups
+
+    def _update(self, features, transformer):
+        # Caller holds self._lock
+        if transformer is not self._transformer:
+            # A new model version brings its own reference; statistics of the old one no longer apply
+            self._transformer = transformer
+            self._window = _Window(transformer.reference, transformer.feature_columns, self.sketch_size)
+            self._last_window = None
+        self._window.update(features)
+        self.observed_rows += len(features)
+        if self._window.rows >= self.window_rows:
+            self._last_window = self._window.report(self.min_rows, self.psi_threshold, self.ks_threshold)
+            if self._last_window["status"] == "drift":
+                logger.warning("Input drift over the last %s rows in features %s",
+                               self._window.rows, self._last_window['drifted_features'])
+            self._window = _Window(transformer.reference, transformer.feature_columns, self.sketch_size)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval_s)
+            try:
+                for matrices, transformer in self._drain():
+                    features = np.vstack(matrices)
+                    with self._lock:
+                        self._update(features, transformer)
+            except Exception as e:
+                logger.error("Error updating drift statistics: %s", e)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "reference_rows": self._transformer.reference["rows"] if self._transformer is not None else None,
+                "window_rows": self.window_rows,
+                "observed_rows": self.observed_rows,
+                "pending_batches": len(self._pending),
+                "dropped_batches": self.dropped_batches,
+                "current_window": (self._window.report(self.min_rows, self.psi_threshold, self.ks_threshold)
+                                   if self._window is not None else None),
+                "last_window": self._last_window,
+            }
@@ -0,0 +1,214 @@
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+# Point estimates and bootstrap intervals are reported for these metrics. precision, recall and
+# f1_score are support-weighted averages over the classes, like sklearn's average='weighted'.
+# roc_auc and pr_auc (average precision) need a binary target and probabilities.
+METRICS = ("accuracy", "precision", "recall", "f1_score", "roc_auc", "pr_auc")
+
+
+def _divide(numerator, denominator):
+    # numerator / denominator with 0 where the denominator is 0 (sklearn's zero_division=0)
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                     where=denominator != 0)
+
+
+def confusion_metrics(confusion):
+    # accuracy and weighted precision / recall / F1 of one (K, K) or a batch (B, K, K) of confusion
+    # matrices (rows are true classes), all from the matrix counts
+    confusion = np.asarray(confusion, dtype=np.float64)
+    true_positives = np.diagonal(confusion, axis1=-2, axis2=-1)
+    support = confusion.sum(axis=-1)
+    predicted = confusion.sum(axis=-2)
+    total = support.sum(axis=-1)
+
+    precision = _divide(true_positives, predicted)
+    recall = _divide(true_positives, support)
+    f1 = _divide(2 * precision * recall, precision + recall)
+    weights = _divide(support, total[..., None])
+    return {
+        "accuracy": _divide(true_positives.sum(axis=-1), total),
+        "precision": (precision * weights).sum(axis=-1),
+        "recall": (recall * weights).sum(axis=-1),
+        "f1_score": (f1 * weights).sum(axis=-1),
+    }
+
+
+def ranking_metrics(positives, negatives):
+    # ROC-AUC and average precision from the positive / negative counts per distinct score,
+    # (G,) or (B, G) with scores in ascending order. Tied scores count half for the AUC.
+    # NaN where undefined (a single class present).
+    positives = np.asarray(positives, dtype=np.float64)
+    negatives = np.asarray(negatives, dtype=np.float64)
+    n_pos = positives.sum(axis=-1)
+    n_neg = negatives.sum(axis=-1)
+
+    negatives_below = np.cumsum(negatives, axis=-1) - negatives
+    auc = _divide((positives * (negatives_below + 0.5 * negatives)).sum(axis=-1), n_pos * n_neg)
+
+    # Thresholds from the highest score down: precision at each one, weighted by the recall it adds
+    true_positives = np.cumsum(positives[..., ::-1], axis=-1)
+    flagged = true_positives + np.cumsum(negatives[..., ::-1], axis=-1)
+    precision = _divide(true_positives, flagged)
+    average_precision = _divide((positives[..., ::-1] * precision).sum(axis=-1), n_pos)
+    return {"roc_auc": np.where(n_pos * n_neg > 0, auc, np.nan),
+            "pr_auc": np.where(n_pos > 0, average_precision, np.nan)}
+
+
+class _Cells:
+
+    # The evaluated rows collapsed to distinct (score, true class, predicted class) cells with
+    # their row counts. A bootstrap resample of the rows is a multinomial draw over the cells,
+    # so resampling never touches the rows themselves. With score_bins, distinct scores are merged
+    # into at most that many equal-frequency bins (tied scores always share a bin), which bounds
+    # the number of cells on millions of rows at the cost of treating scores within a bin as ties.
+    def __init__(self, true_idx, pred_idx, n_classes, score=None, score_bins=None):
+        self.n_classes = n_classes
+        if score is None:
+            score_idx = np.zeros(len(true_idx), dtype=np.int64)
+        else:
+            score_idx = np.unique(score, return_inverse=True)[1].ravel()
+            if score_bins and score_idx.max() >= score_bins:
+                group_counts = np.bincount(score_idx)
+                midpoints = np.cumsum(group_counts) - group_counts / 2
+                score_idx = (midpoints * score_bins // len(score_idx)).astype(np.int64)[score_idx]
+        keys = (score_idx * n_classes + true_idx) * n_classes + pred_idx
+        keys, self.counts = np.unique(keys, return_counts=True)
+
+        self.confusion_cell = keys % (n_classes * n_classes)
+        self.score_group = keys // (n_classes * n_classes)
+        self.has_scores = score is not None and n_classes == 2
+        if self.has_scores:
+            # Cells are sorted by score, so each score group is a contiguous run of cells
+            self.group_starts = np.flatnonzero(np.r_[True, np.diff(self.score_group) != 0])
+            self.is_positive = (self.confusion_cell // n_classes) == 1
+
+    def metrics(self, counts):
+        # Metrics for (B, cells) resampled counts, one value per resample
+        k = self.n_classes
+        confusion = np.zeros((len(counts), k * k))
+        for cell in range(k * k):
+            confusion[:, cell] = counts[:, self.confusion_cell == cell].sum(axis=1)
+        results = confusion_metrics(confusion.reshape(-1, k, k))
+
+        if self.has_scores:
+            positives = np.add.reduceat(np.where(self.is_positive, counts, 0), self.group_starts, axis=1)
+            negatives = np.add.reduceat(np.where(self.is_positive, 0, counts), self.group_starts, axis=1)
+            results.update(ranking_metrics(positives, negatives))
+        return results
+
+
+def _bootstrap_block(cells, n_samples, seed):
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(cells.counts.sum(), cells.counts / cells.counts.sum(), size=n_samples)
+    return cells.metrics(counts)
+
+
+def _number(value):
+    # JSON-friendly float; undefined metrics become None
+    return None if np.isnan(value) else float(value)
+
+
+def evaluate_predictions(y_true, y_pred, classes, proba=None, bootstrap_samples=1000, confidence=0.95,
+                         score_bins=2000, n_jobs=-1, block_size=50, random_state=42):
+    # Exact point estimates of METRICS, plus percentile bootstrap confidence intervals when
+    # bootstrap_samples > 0. The intervals resample cells with scores merged into score_bins bins.
+    # Resamples are drawn in blocks of block_size spread over n_jobs processes; each block has
+    # its own seed, so the intervals do not depend on n_jobs.
+    classes = np.asarray(classes)
+    true_idx = np.searchsorted(classes, y_true)
+    pred_idx = np.searchsorted(classes, y_pred)
+    score = None if proba is None or len(classes) != 2 else np.asarray(proba)[:, 1]
+    cells = _Cells(true_idx, pred_idx, len(classes), score)
+
+    point = cells.metrics(cells.counts[None, :])
+    report = {
+        "rows": int(cells.counts.sum()),
+        "confusion_matrix": np.bincount(cells.confusion_cell, weights=cells.counts, minlength=len(classes) ** 2)
+                              .reshape(len(classes), len(classes)).astype(int).tolist(),
+        "metrics": {name: _number(values[0]) for name, values in point.items()},
+    }
+
+    if bootstrap_samples:
+        blocks = [min(block_size, bootstrap_samples - start) for start in range(0, bootstrap_samples, block_size)]
+        seeds = np.random.SeedSequence(random_state).spawn(len(blocks))
+        binned_cells = _Cells(true_idx, pred_idx, len(classes), score, score_bins)
+        results = Parallel(n_jobs=n_jobs)(delayed(_bootstrap_block)(binned_cells, size, seed)
+                                          for size, seed in zip(blocks, seeds))
+        alpha = (1 - confidence) / 2
+        report["confidence"] = confidence
+        report["bootstrap_samples"] = bootstrap_samples
+        report["intervals"] = {}
+        for name in point:
+            samples = np.concatenate([result[name] for result in results])
+            samples = samples[~np.isnan(samples)]
+            report["intervals"][name] = ([_number(bound) for bound in np.quantile(samples, [alpha, 1 - alpha])]
+                                         if len(samples) else [None, None])
+    return report
+
+
+class ModelEvaluator:
+
+    # Evaluates a classifier on a holdout set: one predict_proba call, the metrics of every row,
+    # and the same metrics per value of each segment column (decoded to the original categories
+    # when a fitted PreprocessingTransformer is given).
+    def __init__(self, segments=(), bootstrap_samples=1000, confidence=0.95, score_bins=2000, n_jobs=-1,
+                 random_state=42, transformer=None):
+        self.segments = list(segments)
+        self.bootstrap_samples = bootstrap_samples
+        self.confidence = confidence
+        self.score_bins = score_bins
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.transformer = transformer
+
+    def _segment_name(self, column, value):
+        if self.transformer is not None and column in self.transformer.classes:
+            return str(self.transformer.decode(column, [value])[0])
+        return str(value)
+
+    def evaluate(self, model, X, y):
+        try:
+            start = time.perf_counter()
+            classes = np.asarray(model.classes_)
+            proba = model.predict_proba(X)
+            y_pred = classes[proba.argmax(axis=1)]
+            y_true = np.asarray(y)
+            settings = {"bootstrap_samples": self.bootstrap_samples, "confidence": self.confidence,
+                        "score_bins": self.score_bins, "n_jobs": self.n_jobs, "random_state": self.random_state}
+
+            report = {"overall": evaluate_predictions(y_true, y_pred, classes, proba, **settings), "segments": {}}
+            for column in self.segments:
+                if column not in X.columns:
+                    logger.warning("Segment column '%s' is not among the model features, skipping it", column)
+                    continue
+                values = np.asarray(X[column])
+                report["segments"][column] = {
+                    self._segment_name(column, value): evaluate_predictions(
+                        y_true[rows], y_pred[rows], classes, proba[rows], **settings)
+                    for value, rows in ((value, values == value) for value in np.unique(values))
+                }
+
+            report["wall_time_s"] = time.perf_counter() - start
+            logger.info("Evaluated %s rows and %s segments in %.2fs",
+                        len(y_true), sum(map(len, report['segments'].values())), report['wall_time_s'])
+            return report
+
+        except Exception as e:
+            logger.error("Error during model evaluation: %s", e)
+            raise CustomException("Failed to evaluate model", e)
+
+
+def flat_metrics(report):
+    # The overall point estimates and interval bounds as one flat dict of floats, for MLflow
+    overall = report["overall"]
+    metrics = dict(overall["metrics"])
+    for name, (low, high) in overall.get("intervals", {}).items():
+        metrics[f"{name}_ci_low"] = low
+        metrics[f"{name}_ci_high"] = high
+    return {name: value for name, value in metrics.items() if value is not None}
@@ -0,0 +1,273 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.model_registry import file_hash
+
+logger = get_logger(__name__)
+
+# MLflow log_batch limits per request
+MAX_BATCH_METRICS = 1000
+MAX_BATCH_PARAMS = 100
+MAX_BATCH_TAGS = 100
+
+_STOP = object()
+
+
+class ExperimentTracker:
+
+    # MLflow logging that never blocks the caller. Every log call is put on a queue and a
+    # background thread sends it: consecutive params, metrics and tags are merged into log_batch
+    # requests, artifacts are uploaded one by one. The run itself is created by the worker.
+    # Datasets are hashed (in the worker) and uploaded only the first time a given content is
+    # seen for this tracking URI; later runs get dataset tags pointing at the run that holds it.
+    # If the tracking store is unavailable, the worker retries with backoff while training goes
+    # on; close() (also registered with atexit) flushes whatever is queued, waiting at most
+    # close_timeout_s, and reports what could not be sent.
+    def __init__(self, tracking_uri=None, experiment_name=None, dataset_index_path=None, enabled=True,
+                 flush_interval_s=1.0, max_retries=5, close_timeout_s=30):
+        self.tracking_uri = tracking_uri
+        self.experiment_name = experiment_name
+        self.dataset_index_path = dataset_index_path
+        self.enabled = enabled
+        self.flush_interval_s = flush_interval_s
+        self.max_retries = max_retries
+        self.close_timeout_s = close_timeout_s
+
+        self.run_id = None
+        self.sent = 0
+        self.dropped = 0
+        self.deduplicated_datasets = 0
+        self._queue = queue.Queue()
+        self._client = None
+        self._thread = None
+        self._closed = False
+
+    # Caller side: only enqueues
+
+    def start(self, tags=None):
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._work, name="mlflow-tracker", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        if tags:
+            self.set_tags(tags)
+        return self
+
+    def _put(self, kind, payload):
+        if self.enabled and not self._closed:
+            self._queue.put((kind, payload))
+
+    def log_params(self, params):
+        self._put("params", {str(k): str(v)[:6000] for k, v in params.items()})
+
+    def log_metrics(self, metrics, step=0):
+        timestamp = int(time.time() * 1000)
+        self._put("metrics", {str(k): (float(v), timestamp, step) for k, v in metrics.items()})
+
+    def set_tags(self, tags):
+        self._put("tags", {str(k): str(v) for k, v in tags.items()})
+
+    def log_artifact(self, path, artifact_path=None):
+        self._put("artifact", (os.path.abspath(path), artifact_path))
+
+    def log_dataset(self, path, name=None):
+        self._put("dataset", (os.path.abspath(path), name or os.path.basename(path)))
+
+    def close(self, status="FINISHED"):
+        if self._thread is None or self._closed:
+            return
+        self._closed = True
+        self._queue.put((_STOP, status))
+        self._thread.join(self.close_timeout_s)
+        if self._thread.is_alive():
+            logger.error("MLflow tracker did not flush within %ss, %s queued log calls are lost",
+                         self.close_timeout_s, self._queue.qsize())
+        elif self.dropped:
+            logger.error("MLflow tracker could not send %s log calls", self.dropped)
+        else:
+            logger.info("MLflow tracker flushed %s log calls to run %s", self.sent, self.run_id)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close("FAILED" if exc_type else "FINISHED")
+
+    # Worker side
+
+    def _ensure_run(self):
+        if self.run_id is not None:
+            return
+        from mlflow.tracking import MlflowClient
+        self._client = MlflowClient(self.tracking_uri)
+        experiment_id = "0"
+        if self.experiment_name:
+            experiment = self._client.get_experiment_by_name(self.experiment_name)
+            experiment_id = (experiment.experiment_id if experiment is not None
+                             else self._client.create_experiment(self.experiment_name))
+        self.run_id = self._client.create_run(experiment_id).info.run_id
+        logger.info("MLflow run %s started in experiment %s", self.run_id, experiment_id)
+
+    def _drain(self, items):
+        # Adds the calls queued right now to items, without waiting for more
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    @staticmethod
+    def _log_batches(params, metrics, tags):
+        # log_batch keyword arguments, each within the MLflow per-request limits
+        from mlflow.entities import Metric, Param, RunTag
+        params = [Param(k, v) for k, v in params.items()]
+        metrics = [Metric(k, value, timestamp, step) for k, (value, timestamp, step) in metrics.items()]
+        tags = [RunTag(k, v) for k, v in tags.items()]
+        batches = []
+        while params or metrics or tags:
+            batches.append({"metrics": metrics[:MAX_BATCH_METRICS], "params": params[:MAX_BATCH_PARAMS],
+                            "tags": tags[:MAX_BATCH_TAGS]})
+            params, metrics, tags = params[MAX_BATCH_PARAMS:], metrics[MAX_BATCH_METRICS:], tags[MAX_BATCH_TAGS:]
+        return batches
+
+    def _send_batch(self, params, metrics, tags):
+        for batch in self._log_batches(params, metrics, tags):
+            self._client.log_batch(self.run_id, **batch)
+
+    def _read_dataset_index(self):
+        if self.dataset_index_path is None or not os.path.exists(self.dataset_index_path):
+            return {}
+        with open(self.dataset_index_path, 'r') as f:
+            return json.load(f)
+
+    def _send_dataset(self, path, name):
+        digest = file_hash([path])
+        index = self._read_dataset_index()
+        known = index.get(self._client.tracking_uri, {})
+        tags = {f"dataset.{name}.hash": digest}
+
+        if digest in known:
+            tags[f"dataset.{name}.run_id"] = known[digest]["run_id"]
+            tags[f"dataset.{name}.uri"] = known[digest]["uri"]
+            self.deduplicated_datasets += 1
+        else:
+            self._client.log_artifact(self.run_id, path, "datasets")
+            uri = f"runs:/{self.run_id}/datasets/{os.path.basename(path)}"
+            tags[f"dataset.{name}.run_id"] = self.run_id
+            tags[f"dataset.{name}.uri"] = uri
+            if self.dataset_index_path is not None:
+                known[digest] = {"run_id": self.run_id, "uri": uri}
+                index[self._client.tracking_uri] = known
+                os.makedirs(os.path.dirname(self.dataset_index_path) or '.', exist_ok=True)
+                tmp_path = self.dataset_index_path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(index, f, indent=2)
+                os.replace(tmp_path, self.dataset_index_path)
+        self._send_batch({}, {}, tags)
+
+    def _requests(self, items):
+        # The MLflow requests that send items, in order: consecutive params / metrics / tags are merged
+        # into log_batch requests, artifacts and datasets are sent one by one between them.
+        # Each request is (kind, payload, calls), calls being the number of log calls it completes.
+        requests = []
+        batch = {"params": {}, "metrics": {}, "tags": {}}
+        merged = 0
+
+        def flush_batch():
+            nonlocal merged
+            if merged:
+                payloads = self._log_batches(batch["params"], batch["metrics"], batch["tags"]) or [None]
+                requests.extend(("batch", payload, 0) for payload in payloads[:-1])
+                requests.append(("batch", payloads[-1], merged))
+                for values in batch.values():
+                    values.clear()
+                merged = 0
+
+        for kind, payload in items:
+            if kind in batch:
+                batch[kind].update(payload)
+                merged += 1
+            else:
+                flush_batch()
+                requests.append((kind, payload, 1))
+        flush_batch()
+        return requests
+
+    def _send_request(self, kind, payload):
+        if kind == "batch":
+            if payload is not None:
+                self._client.log_batch(self.run_id, **payload)
+        elif kind == "artifact":
+            self._client.log_artifact(self.run_id, *payload)
+        elif kind == "dataset":
+            self._send_dataset(*payload)
+
+    def _send_with_retries(self, items):
+        # A retry resumes at the first request that failed, so params, metrics and artifacts that
+        # already went through are not logged twice
+        pending = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._ensure_run()
+                if pending is None:
+                    pending = deque(self._requests(items))
+                while pending:
+                    kind, payload, calls = pending[0]
+                    self._send_request(kind, payload)
+                    pending.popleft()
+                    self.sent += calls
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    unsent = len(items) if pending is None else sum(calls for _, _, calls in pending)
+                    logger.error("Giving up on %s MLflow log calls: %s", unsent, e)
+                    self.dropped += unsent
+                    return
+                delay = min(30, self.flush_interval_s * 2 ** attempt)
+                logger.warning("MLflow tracking unavailable (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+
+    def _work(self):
+        status = None
+        while status is None:
+            items = [self._queue.get()]
+            # Give closely spaced calls a moment to arrive so they share one request
+            if items[0][0] is not _STOP:
+                time.sleep(self.flush_interval_s)
+            items = self._drain(items)
+
+            stops = [payload for kind, payload in items if kind is _STOP]
+            status = stops[0] if stops else None
+            items = [item for item in items if item[0] is not _STOP]
+            if items:
+                self._send_with_retries(items)
+
+        try:
+            if self.run_id is not None:
+                self._client.set_terminated(self.run_id, status)
+        except Exception as e:
+            logger.error("Error ending MLflow run %s: %s", self.run_id, e)
+
+
+def tracker_from_config(tracking_config, dataset_index_path=None):
+    # ExperimentTracker for config.yaml tracking settings
+    try:
+        return ExperimentTracker(
+            tracking_uri=tracking_config['tracking_uri'],
+            experiment_name=tracking_config['experiment_name'],
+            dataset_index_path=dataset_index_path,
+            enabled=tracking_config['enabled'],
+            flush_interval_s=tracking_config['flush_interval_s'],
+            max_retries=tracking_config['max_retries'],
+            close_timeout_s=tracking_config['close_timeout_s'],
+        )
+
+    except Exception as e:
+        logger.error("Error creating experiment tracker: %s", e)
+        raise CustomException("Failed to create experiment tracker", e)
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+# Feature ranking backends used by DataPreprocessor.select_features. Each one takes the
+# feature frame, the target, n_jobs and a seed and returns one importance per column.
+
+
+def _random_forest(X, y, n_jobs, random_state):
+    # The original estimator: impurity importance of a default 100-tree forest
+    from sklearn.ensemble import RandomForestRegressor
+    model = RandomForestRegressor(random_state=random_state, n_jobs=n_jobs)
+    model.fit(X, y)
+    return model.feature_importances_
+
+
+def _lightgbm_gain(X, y, n_jobs, random_state):
+    # Histogram-based boosting, ranked on total split gain
+    from lightgbm import LGBMClassifier
+    model = LGBMClassifier(importance_type='gain', random_state=random_state, n_jobs=n_jobs, verbose=-1)
+    model.fit(X, y)
+    return model.feature_importances_
+
+
+def _mutual_info(X, y, n_jobs, random_state):
+    # Model-free estimate of the dependency between each feature and the target
+    from sklearn.feature_selection import mutual_info_classif
+    return mutual_info_classif(X, y, random_state=random_state, n_jobs=n_jobs)
+
+
+IMPORTANCE_BACKENDS = {
+    "random_forest": _random_forest,
+    "lightgbm_gain": _lightgbm_gain,
+    "mutual_info": _mutual_info,
+}
+
+
+def rank_features(X, y, backend="random_forest", sample_rows=None, n_jobs=1, random_state=42):
+    # Importances as a Series sorted from most to least important.
+    # sample_rows fits the backend on a random subset of rows instead of the whole frame.
+    try:
+        if backend not in IMPORTANCE_BACKENDS:
+            raise ValueError(f"Unknown feature importance backend '{backend}', expected one of {sorted(IMPORTANCE_BACKENDS)}")
+        if sample_rows and sample_rows < len(X):
+            X = X.sample(n=sample_rows, random_state=random_state)
+            y = y.loc[X.index]
+
+        importance = IMPORTANCE_BACKENDS[backend](X, y, n_jobs, random_state)
+        return pd.Series(importance, index=X.columns).sort_values(ascending=False)
+
+    except Exception as e:
+        logger.error("Error ranking features with %s: %s", backend, e)
+        raise CustomException("Feature ranking failed", e)
+
+
+class ImportanceCache:
+
+    # Rankings keyed on a hash of the training frame and the backend settings, so re-running
+    # preprocessing on unchanged data (e.g. to try another no_of_features) skips the fit.
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(df, settings):
+        data_hash = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+        state = {"data": data_hash, "columns": list(map(str, df.columns)), "settings": settings}
+        return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            state = json.load(f)
+        return pd.Series(state["importances"], index=state["features"])
+
+    def put(self, key, ranking):
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"features": ranking.index.tolist(), "importances": ranking.tolist()}, f, indent=2)
+        os.replace(tmp_path, self._path(key))
@@ -0,0 +1,260 @@
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import lightgbm as lgb
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score, log_loss
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+from sklearn.utils.class_weight import compute_sample_weight
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+# Validation scores computed from positive-class probabilities; higher is better
+SCORERS = {
+    "accuracy": lambda y, proba: accuracy_score(y, proba >= 0.5),
+    "f1": lambda y, proba: f1_score(y, proba >= 0.5),
+    "roc_auc": roc_auc_score,
+    "neg_log_loss": lambda y, proba: -log_loss(y, proba),
+}
+
+MATRIX_FILE = "train_matrix.npy"
+DATASET_FILE = "train_dataset.bin"
+
+
+def save_shared_matrix(X, shared_dir):
+    # Writes the raw feature matrix once and returns a read-only memory map of it. Search workers
+    # (and joblib, which passes memmaps by file name) then share the page cache instead of copying X.
+    os.makedirs(shared_dir, exist_ok=True)
+    matrix_path = os.path.join(shared_dir, MATRIX_FILE)
+    np.save(matrix_path, np.ascontiguousarray(X, dtype=np.float64))
+    return np.load(matrix_path, mmap_mode='r')
+
+
+def save_binned_dataset(X, y, shared_dir, feature_names=None, weight=None):
+    # Bins the features once and saves the LightGBM binary Dataset that every search worker loads
+    dataset_path = os.path.join(shared_dir, DATASET_FILE)
+    if os.path.exists(dataset_path):
+        os.remove(dataset_path)
+    lgb.Dataset(X, y, weight=weight, feature_name=feature_names or 'auto', params={"verbose": -1},
+                free_raw_data=True).save_binary(dataset_path)
+    return dataset_path
+
+
+def _upper_bound(distribution):
+    # Largest value a scipy distribution or a list of choices can produce
+    if hasattr(distribution, 'support'):
+        return int(distribution.support()[1])
+    return max(distribution)
+
+
+class _SearchData:
+
+    # The binned Dataset, the raw matrix used for validation predictions and the fold subsets
+    # built from them. Lives in the searching process, or once per pool worker.
+    def __init__(self, X, dataset, folds):
+        self.X = X
+        self.dataset = dataset
+        self.y = np.asarray(dataset.get_label())
+        self.folds = [{"train_idx": train_idx, "valid_idx": valid_idx,
+                       "valid_set": dataset.subset(valid_idx.tolist()), "train_sets": {}}
+                      for train_idx, valid_idx in folds]
+
+    def train_set(self, fold, n_rows):
+        # Fold training rows (shuffled once, so smaller row budgets are random samples), cached per size
+        if n_rows not in fold["train_sets"]:
+            fold["train_sets"][n_rows] = self.dataset.subset(np.sort(fold["train_idx"][:n_rows]).tolist())
+        return fold["train_sets"][n_rows]
+
+    def evaluate(self, params, budget, resource, early_stopping_rounds, scoring, random_state, num_threads):
+        # Mean validation score over the folds and the mean number of rounds actually used
+        train_params = {k: v for k, v in params.items() if k != 'n_estimators'}
+        train_params.update(objective="binary", seed=random_state, verbose=-1, num_threads=num_threads)
+        rounds = min(budget, params['n_estimators']) if resource == "rounds" else params['n_estimators']
+        can_stop_early = early_stopping_rounds and params.get('boosting_type', 'gbdt') != 'dart'
+
+        scores, iterations = [], []
+        for fold in self.folds:
+            n_rows = budget if resource == "rows" else len(fold["train_idx"])
+            booster = lgb.train(
+                train_params,
+                self.train_set(fold, n_rows),
+                num_boost_round=rounds,
+                valid_sets=[fold["valid_set"]],
+                callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)] if can_stop_early else None,
+            )
+            best_iteration = booster.best_iteration or booster.current_iteration()
+            proba = booster.predict(self.X[fold["valid_idx"]], num_iteration=best_iteration)
+            scores.append(SCORERS[scoring](self.y[fold["valid_idx"]], proba))
+            iterations.append(best_iteration)
+        return float(np.mean(scores)), int(round(np.mean(iterations)))
+
+
+# Per-process state of a search worker
+_worker_data = None
+
+
+def _init_worker(matrix_path, dataset_path, folds):
+    global _worker_data
+    dataset = lgb.Dataset(dataset_path, params={"verbose": -1}).construct()
+    _worker_data = _SearchData(np.load(matrix_path, mmap_mode='r'), dataset, folds)
+
+
+def _evaluate_in_worker(params, budget, settings):
+    return _worker_data.evaluate(params, budget, **settings)
+
+
+class HalvingSearch:
+
+    # Successive halving (or Hyperband, i.e. several halving brackets with different starting
+    # budgets) over LightGBM candidates sampled from param_distributions. The budget of a rung is
+    # either boosting rounds ("rounds") or training rows per fold ("rows"); each rung keeps the
+    # best 1/eta candidates and gives them eta times more budget. Fits stop early on the fold's
+    # validation set (except dart, which LightGBM cannot early-stop).
+    # The binned Dataset is built once and every fold / row budget is a subset of it, so
+    # candidates never re-bin the features. With n_jobs != 1 the candidates of a rung are spread
+    # over worker processes that load the saved binary Dataset and memory-map the raw matrix from
+    # shared_dir (a temporary directory if not given) instead of receiving copies.
+    # Exposes best_params_, best_score_ and best_estimator_ like the sklearn searches, with
+    # best_estimator_ refit on all rows.
+    def __init__(self, param_distributions, backend="halving", n_candidates=27, resource="rounds",
+                 min_resource=10, max_resource=None, eta=3, early_stopping_rounds=10, cv=3,
+                 scoring="accuracy", class_weight=None, random_state=42, n_jobs=1, shared_dir=None):
+        self.param_distributions = param_distributions
+        self.backend = backend
+        self.n_candidates = n_candidates
+        self.resource = resource
+        self.min_resource = min_resource
+        self.max_resource = max_resource
+        self.eta = eta
+        self.early_stopping_rounds = early_stopping_rounds
+        self.cv = cv
+        self.scoring = scoring
+        self.class_weight = class_weight
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.shared_dir = shared_dir
+
+    def _prepare(self, X, y, shared_dir):
+        y = np.asarray(y)
+        weight = compute_sample_weight(self.class_weight, y) if self.class_weight else None
+
+        # Same folds as RandomizedSearchCV with an integer cv on a classifier
+        rng = np.random.default_rng(self.random_state)
+        folds = [(rng.permutation(train_idx), valid_idx)
+                 for train_idx, valid_idx in StratifiedKFold(n_splits=self.cv).split(np.zeros(len(y)), y)]
+
+        if self.resource == "rows":
+            self._max_resource = self.max_resource or min(len(train_idx) for train_idx, _ in folds)
+        else:
+            self._max_resource = self.max_resource or _upper_bound(self.param_distributions['n_estimators'])
+
+        workers = os.cpu_count() if self.n_jobs in (None, -1) else self.n_jobs
+        self._settings = {
+            "resource": self.resource,
+            "early_stopping_rounds": self.early_stopping_rounds,
+            "scoring": self.scoring,
+            "random_state": self.random_state,
+            # Split the cores between workers so they do not oversubscribe the machine
+            "num_threads": max(1, os.cpu_count() // workers),
+        }
+
+        matrix = save_shared_matrix(X, shared_dir)
+        dataset_path = save_binned_dataset(matrix, y, shared_dir, list(map(str, X.columns)), weight)
+        if workers == 1:
+            self._executor = None
+            self._data = _SearchData(matrix, lgb.Dataset(dataset_path, params={"verbose": -1}).construct(), folds)
+        else:
+            # forkserver: never fork a process whose OpenMP runtime LightGBM has already started
+            self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                 initargs=(matrix.filename, dataset_path, folds),
+                                                 mp_context=multiprocessing.get_context('forkserver'))
+        logger.info("Search data ready in %s: %s rows, %s folds, %s worker(s)",
+                    shared_dir, len(y), len(folds), workers)
+
+    def _evaluate(self, candidates, budget):
+        if self._executor is None:
+            return [self._data.evaluate(params, budget, **self._settings) for params in candidates]
+        return list(self._executor.map(_evaluate_in_worker, candidates, repeat(budget), repeat(self._settings)))
+
+    def _successive_halving(self, candidates, min_budget, bracket):
+        budget = min_budget
+        while True:
+            results = []
+            for params, (score, n_rounds) in zip(candidates, self._evaluate(candidates, budget)):
+                results.append((score, n_rounds, params))
+                self.history_.append({"bracket": bracket, "budget": budget, "score": score,
+                                      "rounds": n_rounds, "params": params})
+            results.sort(key=lambda result: result[0], reverse=True)
+            logger.info("Bracket %s: %s candidates at budget %s %s, best score %.5f",
+                        bracket, len(candidates), budget, self.resource, results[0][0])
+
+            if budget >= self._max_resource or len(candidates) == 1:
+                return results[0]
+            candidates = [params for _, _, params in results[:max(1, len(candidates) // self.eta)]]
+            budget = min(budget * self.eta, self._max_resource)
+
+    def _brackets(self):
+        # (number of candidates, starting budget) per halving bracket
+        if self.backend == "halving":
+            return [(self.n_candidates, self.min_resource)]
+        s_max = int(math.log(self._max_resource / self.min_resource, self.eta) + 1e-9)
+        return [(int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s)),
+                 max(self.min_resource, int(self._max_resource / self.eta ** s)))
+                for s in range(s_max, -1, -1)]
+
+    def _search(self, X, y, shared_dir):
+        self._prepare(X, y, shared_dir)
+        try:
+            brackets = self._brackets()
+            sampled = iter(ParameterSampler(self.param_distributions, sum(n for n, _ in brackets),
+                                            random_state=self.random_state))
+            best = None
+            for bracket, (n_candidates, min_budget) in enumerate(brackets):
+                candidates = [next(sampled) for _ in range(n_candidates)]
+                result = self._successive_halving(candidates, min_budget, bracket)
+                if best is None or result[0] > best[0]:
+                    best = result
+            self.n_candidates_evaluated_ = sum(n for n, _ in brackets)
+            return best
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._data = None
+
+    def fit(self, X, y):
+        try:
+            if self.backend not in ("halving", "hyperband"):
+                raise ValueError(f"Unknown halving backend '{self.backend}'")
+            if self.scoring not in SCORERS:
+                raise ValueError(f"Unsupported scoring '{self.scoring}', expected one of {sorted(SCORERS)}")
+            if self.resource not in ("rounds", "rows"):
+                raise ValueError(f"Unknown resource '{self.resource}', expected 'rounds' or 'rows'")
+
+            start = time.perf_counter()
+            self.history_ = []
+            if self.shared_dir is not None:
+                best = self._search(X, y, self.shared_dir)
+            else:
+                with tempfile.TemporaryDirectory() as shared_dir:
+                    best = self._search(X, y, shared_dir)
+
+            self.best_score_, n_rounds, params = best
+            # n_estimators becomes the number of rounds the winner used (after early stopping)
+            self.best_params_ = dict(params, n_estimators=max(1, n_rounds))
+            self.best_estimator_ = lgb.LGBMClassifier(random_state=self.random_state, class_weight=self.class_weight,
+                                                      verbose=-1, **self.best_params_).fit(X, y)
+
+            logger.info("%s search evaluated %s candidates (%s fits x %s folds) in %.1fs, best CV %s %.5f",
+                        self.backend, self.n_candidates_evaluated_, len(self.history_), self.cv,
+                        time.perf_counter() - start, self.scoring, self.best_score_)
+            return self
+
+        except Exception as e:
+            logger.error("Error during %s hyperparameter search: %s", self.backend, e)
+            raise CustomException("Hyperparameter search failed", e)
@@ -0,0 +1,109 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.model_loader import load_model
+
+logger = get_logger(__name__)
+
+# Per-process state of a pool worker: the one model it holds and the file it came from
+_worker_model = None
+_worker_model_path = None
+
+
+def _init_worker(model_format, model_path):
+    global _worker_model, _worker_model_path
+    _worker_model = load_model(model_format, model_path)
+    _worker_model_path = model_path
+    logger.info("Inference worker %s loaded model from %s", os.getpid(), model_path)
+
+
+def _score(model_format, model_path, features):
+    # Runs inside a worker; reloads only when the serving model file has changed
+    if model_path != _worker_model_path:
+        _init_worker(model_format, model_path)
+
+    probabilities = _worker_model.predict_proba(features)
+    predictions = _worker_model.classes_[probabilities.argmax(axis=1)]
+    return predictions, probabilities
+
+
+class InferencePool:
+
+    # Process pool for CPU-bound inference behind an async server. Each worker keeps one loaded model.
+    # At most max_pending requests may be queued or running; beyond that callers are rejected
+    # immediately so the server sheds load instead of building an unbounded backlog.
+    # Callers pass the model file to score with, so it always matches the transformer they used.
+    def __init__(self, model_format, model_path, workers=None, max_pending=None):
+        self.model_format = model_format
+        self.model_path = model_path
+        self.workers = workers or os.cpu_count()
+        self.max_pending = max_pending or self.workers * 4
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(model_format, model_path),
+        )
+        self._pending = 0
+        self.rejected = 0
+        self.completed = 0
+        logger.info("Inference pool started with %s workers and max_pending=%s", self.workers, self.max_pending)
+
+    @property
+    def saturated(self):
+        return self._pending >= self.max_pending
+
+    def reserve(self):
+        # Takes a pending slot for a request that scores several chunks one after another, so
+        # saturation is reported before a streaming response starts. Pair with release().
+        try:
+            if self.saturated:
+                self.rejected += 1
+                raise OverflowError(f"Inference pool saturated ({self._pending} pending requests)")
+            self._pending += 1
+
+        except Exception as e:
+            logger.error("Error reserving pooled inference: %s", e)
+            raise CustomException("Pooled inference rejected", e)
+
+    def release(self):
+        self._pending -= 1
+
+    async def predict(self, features, model_path=None, reserved=False):
+        # Only called from the event loop thread, so the counters need no lock.
+        # With reserved=True the caller already holds a slot from reserve().
+        # Workers load model_path (default: the pool's initial model) on their next task if it changed.
+        try:
+            if not reserved:
+                if self.saturated:
+                    self.rejected += 1
+                    raise OverflowError(f"Inference pool saturated ({self._pending} pending requests)")
+                self._pending += 1
+
+            try:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self._executor, _score, self.model_format, model_path or self.model_path, features)
+            finally:
+                if not reserved:
+                    self._pending -= 1
+            self.completed += 1
+            return result
+
+        except Exception as e:
+            logger.error("Error during pooled inference: %s", e)
+            raise CustomException("Pooled inference failed", e)
+
+    def metrics(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,152 @@
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def peak_rss_bytes():
+    # High-water mark of this process's resident memory
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+class StageMetrics:
+
+    # Per-stage call counts, durations, row counts and the process memory high-water mark seen at
+    # the end of each call. Recording takes one lock and a getrusage call, so it is cheap enough
+    # for the prediction path.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage, duration_s, rows=None):
+        rss = peak_rss_bytes()
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {"count": 0, "total_s": 0.0, "max_s": 0.0, "last_s": 0.0,
+                                               "rows": 0, "peak_rss_bytes": 0}
+            entry["count"] += 1
+            entry["total_s"] += duration_s
+            entry["max_s"] = max(entry["max_s"], duration_s)
+            entry["last_s"] = duration_s
+            if rows is not None:
+                entry["rows"] += rows
+            entry["peak_rss_bytes"] = max(entry["peak_rss_bytes"], rss)
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: dict(entry) for stage, entry in self._stages.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+def merge_snapshots(snapshots):
+    # One snapshot from several (e.g. one per pipeline node); last_s comes from the last snapshot
+    merged = {}
+    for snapshot in snapshots:
+        for stage, entry in snapshot.items():
+            if stage not in merged:
+                merged[stage] = dict(entry)
+                continue
+            total = merged[stage]
+            for key in ("count", "total_s", "rows"):
+                total[key] += entry[key]
+            for key in ("max_s", "peak_rss_bytes"):
+                total[key] = max(total[key], entry[key])
+            total["last_s"] = entry["last_s"]
+    return merged
+
+
+# Metrics of this process; pipeline workers return theirs to the DAG runner
+METRICS = StageMetrics()
+
+
+class timed:
+
+    # Times a block or a function into METRICS under the stage name:
+    #   with timed("serving.index", rows=1): ...
+    #   with timed("preprocessing.balance") as timing: ...; timing.rows = len(df)
+    #   @timed("training.train_lgbm")
+    # Without rows, a decorated function that returns a DataFrame or an array records its number of rows.
+    def __init__(self, stage, rows=None, metrics=None):
+        self.stage = stage
+        self.rows = rows
+        self.metrics = metrics or METRICS
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.stage, time.perf_counter() - self._start, self.rows)
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Recorded in finally, like the context manager, so a stage that raises still shows up
+            start = time.perf_counter()
+            result = None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            finally:
+                rows = self.rows
+                if rows is None:
+                    shape = getattr(result, "shape", None)
+                    rows = shape[0] if shape else None
+                self.metrics.record(self.stage, time.perf_counter() - start, rows)
+        return wrapper
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_prometheus(stages, labels=None):
+    # Prometheus text exposition of a snapshot; labels are added to every sample
+    extra = "".join(f',{key}="{_label(value)}"' for key, value in (labels or {}).items())
+    series = [
+        ("stage_calls_total", "counter", "Completed calls of the stage", "count"),
+        ("stage_duration_seconds_total", "counter", "Total wall time spent in the stage", "total_s"),
+        ("stage_duration_seconds_max", "gauge", "Longest single call of the stage", "max_s"),
+        ("stage_duration_seconds_last", "gauge", "Wall time of the latest call of the stage", "last_s"),
+        ("stage_rows_total", "counter", "Rows processed by the stage", "rows"),
+        ("stage_peak_rss_bytes", "gauge", "Process memory high-water mark at the end of the stage", "peak_rss_bytes"),
+    ]
+    lines = []
+    for name, kind, help_text, key in series:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for stage, entry in sorted(stages.items()):
+            lines.append(f'{name}{{stage="{_label(stage)}"{extra}}} {entry[key]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(stages, path):
+    # JSON snapshot, or Prometheus text when the file ends in .prom (node_exporter textfile collector)
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            if path.endswith(".prom"):
+                f.write(render_prometheus(stages))
+            else:
+                json.dump(stages, f, indent=2)
+        os.replace(tmp_path, path)
+        logger.info("Stage metrics written to %s", path)
+
+    except Exception as e:
+        logger.error("Error writing stage metrics: %s", e)
+        raise CustomException("Failed to write stage metrics", e)
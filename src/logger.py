@@ -1,5 +1,10 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import multiprocessing.util
 import os
+import queue
 from datetime import datetime
 
 LOGS_DIR = "logs" # Directory where logs will be stored
@@ -8,14 +13,64 @@ os.makedirs(LOGS_DIR, exist_ok=True)
 # To create a file like this log_2025-06-01
 LOG_FILE = os.path.join(LOGS_DIR, f"log_{datetime.now().strftime('%Y-%m-%d')}")
 
+# LOG_LEVEL=WARNING (or set_log_level) turns INFO logging off, e.g. on the serving hot path;
+# LOG_FORMAT=text writes the old "time - level - message" lines instead of JSON
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+
+
+class JsonFormatter(logging.Formatter):
+
+    # One JSON object per line
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# Callers only put records on an in-memory queue; a background thread formats them and writes the file
+_file_handler = logging.FileHandler(LOG_FILE)
+_file_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json"
+                           else logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+_queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+_queue_handler.setFormatter(logging.Formatter("%(message)s")) # The writer applies the real format
+_listener = None
+
+def _start_writer():
+    # Also runs in every forked child, which inherits the queue but not the writer thread
+    global _listener
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, _file_handler)
+    _listener.start()
+
+def _stop_writer():
+    # Writes whatever is still queued; runs at interpreter exit and at multiprocessing worker exit
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+_start_writer()
+os.register_at_fork(after_in_child=_start_writer)
+atexit.register(_stop_writer)
+multiprocessing.util.Finalize(None, _stop_writer, exitpriority=0)
+
 logging.basicConfig(
-    filename=LOG_FILE,
-    format="%(asctime)s - %(levelname)s - %(message)s", # Format of the log message
-    level=logging.INFO, # Only levels INFO and above will be logged (warning, error, critical)
+    handlers=[_queue_handler],
+    level=LOG_LEVEL, # Only levels INFO and above will be logged (warning, error, critical)
 )
 
+def set_log_level(level):
+    # Loggers inherit the root level, so this changes every logger at once
+    logging.getLogger().setLevel(level)
+
 # Function to get a logger instance (this func is to initialize logger in different files)
 def get_logger(name):
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)  # Set the logging level for this logger
-    return logger
\ No newline at end of file
+    return logging.getLogger(name)
@@ -0,0 +1,92 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+class MicroBatcher:
+
+    # Coalesces single-row predictions coming from concurrent requests into one vectorized
+    # predict_fn(model, rows) call. A batch is flushed after max_wait_ms or once max_batch_size rows
+    # are queued. Each row is scored by the model its request resolved, so during a hot reload a
+    # batch is split per model instead of scoring old-version features with the new model.
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=5):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._max_realized_batch = 0
+        self._last_batch_size = 0
+
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+        logger.info("Micro-batcher started with max_batch_size=%s and max_wait_ms=%s", max_batch_size, max_wait_ms)
+
+    def submit(self, row, model):
+        # Returns a Future that resolves to the prediction of model for this single row
+        future = Future()
+        self._queue.put((np.asarray(row, dtype=np.float64).ravel(), model, future))
+        return future
+
+    def predict(self, row, model, timeout=None):
+        return self.submit(row, model).result(timeout=timeout)
+
+    def _collect_batch(self):
+        # Block for the first row, then keep draining until the batch is full or the wait expires
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            groups = {}
+            for row, model, future in batch:
+                groups.setdefault(id(model), (model, [], []))
+                groups[id(model)][1].append(row)
+                groups[id(model)][2].append(future)
+
+            for model, rows, futures in groups.values():
+                try:
+                    predictions = self.predict_fn(model, np.vstack(rows))
+                    for future, prediction in zip(futures, predictions):
+                        future.set_result(prediction)
+                except Exception as e:
+                    logger.error("Error while scoring micro-batch of %d rows: %s", len(rows), e)
+                    for future in futures:
+                        future.set_exception(CustomException("Micro-batch prediction failed", e))
+
+            with self._lock:
+                self._batches += 1
+                self._rows += len(batch)
+                self._last_batch_size = len(batch)
+                self._max_realized_batch = max(self._max_realized_batch, len(batch))
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "rows": self._rows,
+                "last_batch_size": self._last_batch_size,
+                "max_batch_size_realized": self._max_realized_batch,
+                "mean_batch_size": self._rows / self._batches if self._batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.model_registry import file_hash
+
+logger = get_logger(__name__)
+
+
+def load_transformer(transformer_path):
+    # Fitted preprocessing shared with training; models trained before it existed have none
+    if transformer_path is None or not os.path.exists(transformer_path):
+        return None
+    from src.preprocessing_transformer import PreprocessingTransformer
+    return PreprocessingTransformer.load(transformer_path)
+
+
+def load_model(model_format, model_path):
+    # Heavy imports happen here, not at module import time
+    if model_format == 'compiled':
+        from src.tree_predictor import CompiledTreeModel
+        return CompiledTreeModel.load(model_path)
+
+    import joblib
+    return joblib.load(model_path)
+
+
+def load_feature_columns(model_format, model_path):
+    # Feature order of a model file, for processes that build feature matrices without scoring
+    if model_format == 'compiled':
+        from src.tree_predictor import CompiledTreeModel
+        return CompiledTreeModel.read_feature_names(model_path)
+
+    from src.batch_prediction import model_feature_columns
+    return model_feature_columns(load_model(model_format, model_path))
+
+
+class ModelLoader:
+
+    # Loads the model on a background thread and warms it up, so the web server can
+    # answer health checks while the model is still being unpickled.
+    # With a ModelRegistry it also hot-swaps to the latest registered version and keeps
+    # up to max_resident_versions models in memory (LRU) for pinned or shadow requests.
+    # Until the registry has its first version, the model at model_path is served.
+    def __init__(self, model_format, model_path, warmup_rows=0, registry=None, max_resident_versions=2,
+                 transformer_path=None):
+        if max_resident_versions < 1:
+            raise ValueError(f"max_resident_versions must be at least 1, got {max_resident_versions}")
+        self.model_format = model_format
+        self.model_path = model_path
+        self.transformer_path = transformer_path
+        self.warmup_rows = warmup_rows
+        self.registry = registry
+        self.max_resident_versions = max_resident_versions
+
+        # version -> (model, transformer), so a version's model and preprocessing are evicted together
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._current_version = None
+        self._error = None
+        self._ready = threading.Event()
+        self._started_at = time.perf_counter()
+        self._manifest_mtime = None
+        self.load_time = None
+        self.warmup_latency = None
+        self.reloads = 0
+
+    def start(self, background=True):
+        if background:
+            threading.Thread(target=self._load, name="model-loader", daemon=True).start()
+        else:
+            self._load()
+        return self
+
+    def _load(self):
+        try:
+            self.reload()
+
+        except Exception as e:
+            logger.error("Error loading model: %s", e)
+            self._error = str(e)
+
+        finally:
+            self._ready.set()
+
+    def _resolve(self, version=None):
+        # Returns (version, model path, transformer path) for a registry version, or for the configured
+        # files when there is no registry or it has no version yet
+        if self.registry is not None:
+            version = version or self.registry.latest_version()
+        if version is None:
+            return file_hash([self.model_path]), self.model_path, self.transformer_path
+        if self.registry is None:
+            raise KeyError(f"Unknown model version {version}")
+
+        transformer_path = None
+        if 'transformer' in self.registry.list_versions()[version]['files']:
+            transformer_path = self.registry.path_for(version, 'transformer')
+        return version, self.registry.path_for(version, self.model_format), transformer_path
+
+    def _load_version(self, version, path, transformer_path):
+        start = time.perf_counter()
+        model = load_model(self.model_format, path)
+        transformer = load_transformer(transformer_path)
+        self.load_time = time.perf_counter() - start
+        logger.info("Model version %s loaded from %s in %.3fs", version, path, self.load_time)
+
+        if self.warmup_rows:
+            self.warmup_latency = self.warm_up(model)
+            logger.info("Model warm-up on %s rows took %.3fs", self.warmup_rows, self.warmup_latency)
+        return model, transformer
+
+    def _remember(self, version, loaded):
+        # Caller holds self._lock
+        self._models[version] = loaded
+        self._models.move_to_end(version)
+        while len(self._models) > self.max_resident_versions:
+            evicted, evicted_loaded = self._models.popitem(last=False)
+            if evicted == self._current_version:
+                # Never evict the serving model; put it back as most recent
+                self._models[evicted] = evicted_loaded
+                continue
+            logger.info("Evicted model version %s from memory", evicted)
+
+    def reload(self):
+        # Loads the latest version (outside the lock) and swaps it in atomically.
+        # In-flight requests keep the model object they already hold.
+        with self._reload_lock:
+            if self.registry is not None:
+                self._manifest_mtime = self.registry.manifest_mtime()
+            version, path, transformer_path = self._resolve()
+            if version == self._current_version:
+                return False
+
+            with self._lock:
+                loaded = self._models.get(version)
+            if loaded is None:
+                loaded = self._load_version(version, path, transformer_path)
+
+            with self._lock:
+                previous = self._current_version
+                self._current_version = version
+                self._remember(version, loaded)
+                self._error = None
+
+            if previous is not None:
+                self.reloads += 1
+                logger.info("Swapped serving model from version %s to %s", previous, version)
+            return True
+
+    def watch(self, poll_interval_s):
+        # Polls the registry manifest and hot-swaps when a new version is registered
+        def loop():
+            while True:
+                time.sleep(poll_interval_s)
+                try:
+                    if self.registry.manifest_mtime() != self._manifest_mtime:
+                        self.reload()
+                except Exception as e:
+                    logger.error("Error while reloading model from registry: %s", e)
+
+        if self.registry is not None:
+            threading.Thread(target=loop, name="model-registry-watcher", daemon=True).start()
+            logger.info("Watching model registry %s every %ss", self.registry.registry_dir, poll_interval_s)
+        return self
+
+    def warm_up(self, model):
+        # Push one batch through the model so first-request costs are paid before traffic arrives
+        import numpy as np
+        features = np.zeros((self.warmup_rows, model.n_features_in_), dtype=np.float64)
+        start = time.perf_counter()
+        model.predict_proba(features)
+        return time.perf_counter() - start
+
+    def get_versioned(self, timeout=None, version=None):
+        # Returns (version, model, transformer) of one resident version, taken under a single lock
+        # so a concurrent reload or eviction cannot pair them with another version
+        try:
+            if not self._ready.wait(timeout):
+                raise TimeoutError(f"Model not ready after {timeout}s")
+
+            with self._lock:
+                version = version or self._current_version
+                if version is None:
+                    raise RuntimeError(f"Model failed to load: {self._error}")
+                loaded = self._models.get(version)
+                if loaded is not None:
+                    self._models.move_to_end(version)
+                    return (version,) + loaded
+
+            # Pinned version that is not resident: load it from the registry
+            _, path, transformer_path = self._resolve(version)
+            loaded = self._load_version(version, path, transformer_path)
+            with self._lock:
+                self._remember(version, loaded)
+            return (version,) + loaded
+
+        except Exception as e:
+            logger.error("Model is not available: %s", e)
+            raise CustomException("Model is not available", e)
+
+    def knows_version(self, version):
+        # Resident versions and, with a registry, every registered one
+        with self._lock:
+            if version in self._models:
+                return True
+        return self.registry is not None and version in self.registry.list_versions()
+
+    def get_model(self, timeout=None, version=None):
+        return self.get_versioned(timeout, version)[1]
+
+    @property
+    def current_version(self):
+        return self._current_version
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set() and self._current_version is not None
+
+    def status(self):
+        with self._lock:
+            resident_versions = list(self._models)
+        return {
+            "ready": self.is_ready,
+            "error": self._error,
+            "model_format": self.model_format,
+            "model_version": self._current_version,
+            "resident_versions": resident_versions,
+            "reloads": self.reloads,
+            "load_time_s": self.load_time,
+            "warmup_rows": self.warmup_rows,
+            "warmup_latency_s": self.warmup_latency,
+            "uptime_s": time.perf_counter() - self._started_at,
+        }
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = "registry.json"
+
+
+def file_hash(paths, chunk_size=1 << 20):
+    # Content hash over one or more files, used as the model version
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class ModelRegistry:
+
+    # Local registry of model versions keyed by content hash:
+    #   <registry_dir>/<version>/<artifact files>
+    #   <registry_dir>/registry.json  -> {"latest": version, "versions": {version: {...}}}
+    # Version directories and the manifest are written to a temp location and renamed into place,
+    # so a watcher never sees a half-written model.
+    def __init__(self, registry_dir):
+        self.registry_dir = registry_dir
+        self.manifest_path = os.path.join(registry_dir, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        os.makedirs(self.registry_dir, exist_ok=True)
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {"latest": None, "versions": {}}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        fd, tmp_path = tempfile.mkstemp(dir=self.registry_dir, suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def register(self, artifacts, metadata=None):
+        # artifacts maps a model format ("joblib", "compiled") to the file that holds it
+        try:
+            version = file_hash(sorted(artifacts.values()))
+            version_dir = os.path.join(self.registry_dir, version)
+
+            with self._lock:
+                manifest = self._read_manifest()
+
+                if not os.path.exists(version_dir):
+                    staging_dir = tempfile.mkdtemp(dir=self.registry_dir, prefix=".staging-")
+                    for path in artifacts.values():
+                        shutil.copy2(path, staging_dir)
+                    os.replace(staging_dir, version_dir)
+
+                manifest["versions"][version] = {
+                    "created_at": datetime.now().isoformat(),
+                    "files": {fmt: os.path.basename(path) for fmt, path in artifacts.items()},
+                    "metadata": metadata or {},
+                }
+                manifest["latest"] = version
+                self._write_manifest(manifest)
+
+            logger.info("Registered model version %s in %s", version, self.registry_dir)
+            return version
+
+        except Exception as e:
+            logger.error("Error registering model: %s", e)
+            raise CustomException("Failed to register model", e)
+
+    def latest_version(self):
+        return self._read_manifest()["latest"]
+
+    def list_versions(self):
+        return self._read_manifest()["versions"]
+
+    def path_for(self, version, model_format):
+        try:
+            entry = self._read_manifest()["versions"][version]
+            return os.path.join(self.registry_dir, version, entry["files"][model_format])
+
+        except Exception as e:
+            logger.error("Model version %s with format %s not found in registry: %s", version, model_format, e)
+            raise CustomException("Model version not found in registry", e)
+
+    def manifest_mtime(self):
+        # Cheap change detection for the watcher
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
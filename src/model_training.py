@@ -1,33 +1,64 @@
 import os
+import json
+import time
 import pandas as pd
 import joblib
 from src.logger import get_logger
 from src.custom_exception import CustomException
 from config.paths_config import *
 from config.model_params import *
-from utils.common_functions import read_yaml, load_data
+from utils.common_functions import read_yaml, load_data, artifact_path
+from src.tree_predictor import export_lgbm_model, CompiledTreeModel
+from src.model_registry import ModelRegistry
+from src.preprocessing_transformer import PreprocessingTransformer
+from src.balancing import class_weight_for
+from src.hyperparameter_search import HalvingSearch, save_shared_matrix
+from src.evaluation import ModelEvaluator, flat_metrics
+from src.experiment_tracker import ExperimentTracker, tracker_from_config
+from src.instrumentation import timed
+import numpy as np
+from sklearn.base import clone
 from sklearn.model_selection import RandomizedSearchCV
 import lightgbm as lgb
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-from scipy.stats import randint, uniform
 
-import mlflow # To keep track of all the model we train. Withuot this, 
-# we cannot track the model and everytime we train, model will overide the previous one.
-import mlflow.sklearn
+# MLflow keeps track of all the models we train; without it every training run would override the
+# previous one. Logging goes through ExperimentTracker so that it never blocks training.
 
 
 logger = get_logger(__name__)
 
 class ModelTrainer:
 
-    def __init__(self, train_path, test_path, model_output_path):
+    def __init__(self, train_path, test_path, model_output_path, compiled_model_output_path=COMPILED_MODEL_FILE_PATH,
+                 registry_dir=MODEL_REGISTRY_DIR, preprocessor_path=PREPROCESSOR_FILE_PATH, class_weight=None,
+                 search_config=None, shared_data_dir=TRAINING_DATA_DIR, incremental_config=None,
+                 train_rows_path=TRAIN_ROWS_FILE_PATH, evaluation_config=None,
+                 evaluation_report_path=EVALUATION_REPORT_PATH, tracking_config=None):
         self.train_path = train_path
         self.test_path = test_path
         self.model_output_path = model_output_path
+        self.compiled_model_output_path = compiled_model_output_path
+        self.registry_dir = registry_dir
+        self.preprocessor_path = preprocessor_path
+        # 'balanced' when the train split was not resampled (balancing strategy "class_weight")
+        self.class_weight = class_weight
+        # config.yaml training.search; None keeps the RandomizedSearchCV backend
+        self.search_config = search_config or {"backend": "random"}
+        # Where the read-only train matrix (and the binned dataset) shared by search workers is written
+        self.shared_data_dir = shared_data_dir
+        # config.yaml training.incremental; None always trains from scratch
+        self.incremental_config = incremental_config or {"enabled": False}
+        self.train_rows_path = train_rows_path
+        # config.yaml training.evaluation; None reports point estimates of the whole test split only
+        self.evaluation_config = evaluation_config or {"segments": [], "bootstrap_samples": 0}
+        self.evaluation_report_path = evaluation_report_path
+        # config.yaml tracking; None logs to the default MLflow tracking URI with the default settings
+        self.tracking_config = tracking_config
 
         self.params_dist = LIGHTGBM_PARAMS
         self.random_search_params = RANDOM_SEARCH_PARAMS
 
+    @timed("training.load")
     def load_and_split_data(self):
         try:
             logger.info("Loading training data...")
@@ -40,119 +71,328 @@ class ModelTrainer:
             y_train = train_df['booking_status']
             X_test = test_df.drop(columns=['booking_status'])
             y_test = test_df['booking_status']
-            logger.info(f"Training data splitted successfully for training")
+            logger.info("Training data splitted successfully for training")
 
             return X_train, y_train, X_test, y_test
 
         except Exception as e:
-            logger.error(f"Error in loading or splitting data: {e}")
+            logger.error("Error in loading or splitting data: %s", e)
             raise CustomException("Failed to load or split data", e)
 
+    @timed("training.search")
     def train_lgbm(self, X_train, y_train,):
         try:
-            logger.info("Initializing LightGBM model...")
-
-            lgbm_model = lgb.LGBMClassifier(random_state=self.random_search_params['random_state'],
-                                            force_col_wise=True)
-
-            logger.info("Hyperparamater Tuning...")
-            random_search = RandomizedSearchCV(
-                estimator=lgbm_model,
-                param_distributions=self.params_dist,
-                n_iter=self.random_search_params['n_iter'],
-                cv=self.random_search_params['cv'],
-                n_jobs=self.random_search_params['n_jobs'],
-                verbose=self.random_search_params['verbose'],
-                random_state=self.random_search_params['random_state'],
-                scoring=self.random_search_params['scoring']
-            )
+            backend = self.search_config['backend']
+            if backend == 'random':
+                logger.info("Initializing LightGBM model...")
+
+                lgbm_model = lgb.LGBMClassifier(random_state=self.random_search_params['random_state'],
+                                                class_weight=self.class_weight,
+                                                force_col_wise=True)
+
+                logger.info("Hyperparamater Tuning...")
+                # CV fits read a memory-mapped copy of X_train, which joblib hands to its workers by
+                # file name instead of pickling a copy per worker; only the final refit uses the frame
+                search = RandomizedSearchCV(
+                    estimator=lgbm_model,
+                    param_distributions=self.params_dist,
+                    n_iter=self.random_search_params['n_iter'],
+                    cv=self.random_search_params['cv'],
+                    n_jobs=self.random_search_params['n_jobs'],
+                    verbose=self.random_search_params['verbose'],
+                    random_state=self.random_search_params['random_state'],
+                    scoring=self.random_search_params['scoring'],
+                    refit=False
+                )
+                search_X, search_y = save_shared_matrix(X_train, self.shared_data_dir), y_train.to_numpy()
+            else:
+                search = HalvingSearch(
+                    self.params_dist,
+                    backend=backend,
+                    n_candidates=self.search_config['n_candidates'],
+                    resource=self.search_config['resource'],
+                    min_resource=self.search_config['min_resource'],
+                    max_resource=self.search_config['max_resource'],
+                    eta=self.search_config['eta'],
+                    early_stopping_rounds=self.search_config['early_stopping_rounds'],
+                    cv=self.random_search_params['cv'],
+                    scoring=self.random_search_params['scoring'],
+                    class_weight=self.class_weight,
+                    random_state=self.random_search_params['random_state'],
+                    n_jobs=self.random_search_params['n_jobs'],
+                    shared_dir=self.shared_data_dir,
+                )
+                search_X, search_y = X_train, y_train
 
-            logger.info("Starting Hyperparamater Tuning...")
-            random_search.fit(X_train, y_train)
-            logger.info("Hyperparameter tuning completed successfully.")
+            logger.info("Starting Hyperparamater Tuning (%s search)...", backend)
+            start = time.perf_counter()
+            search.fit(search_X, search_y)
+            logger.info("Hyperparameter tuning completed successfully in %.1fs.", time.perf_counter() - start)
 
-            best_lgbm_model = random_search.best_estimator_
-            best_params = random_search.best_params_
-            logger.info(f"Best parameters are: {best_params}")
+            best_params = search.best_params_
+            if backend == 'random':
+                best_lgbm_model = clone(lgbm_model).set_params(**best_params).fit(X_train, y_train)
+            else:
+                best_lgbm_model = search.best_estimator_
+            logger.info("Best parameters are: %s", best_params)
 
             return best_lgbm_model
         
         except Exception as e:
-            logger.error(f"Error during model training: {e}")
+            logger.error("Error during model training: %s", e)
             raise CustomException("Failed to train model", e)
 
+    @timed("training.evaluate")
     def evaluate_model(self, model, X_test, y_test):
+        # Full report: overall and per-segment metrics with bootstrap intervals (see src/evaluation.py)
         try:
             logger.info("Evaluating model on test data...")
-            y_pred = model.predict(X_test)
+            transformer = (PreprocessingTransformer.load(self.preprocessor_path)
+                           if os.path.exists(self.preprocessor_path) else None)
+            evaluator = ModelEvaluator(transformer=transformer, **self.evaluation_config)
+            report = evaluator.evaluate(model, X_test, y_test)
 
-            accuracy = accuracy_score(y_test, y_pred)
-            precision = precision_score(y_test, y_pred, average='weighted')
-            recall = recall_score(y_test, y_pred, average='weighted')
-            f1 = f1_score(y_test, y_pred, average='weighted')
+            logger.info("Model evaluation metrics: %s", report['overall']['metrics'])
+            return report
 
-            logger.info(f"Model evaluation metrics - Accuracy: {accuracy}, Precision: {precision}, Recall: {recall}, F1 Score: {f1}")
-            
-            return {
-                "accuracy": accuracy,
-                "precision": precision,
-                "recall": recall,
-                "f1_score": f1,
-            }
-        
         except Exception as e:
-            logger.error(f"Error during model evaluation: {e}")
+            logger.error("Error during model evaluation: %s", e)
             raise CustomException("Failed to evaluate model", e)
-        
-    def save_model(self, model):
+
+    def save_evaluation_report(self, report):
+        try:
+            os.makedirs(os.path.dirname(self.evaluation_report_path), exist_ok=True)
+            with open(self.evaluation_report_path, 'w') as f:
+                json.dump(report, f, indent=2)
+            logger.info("Evaluation report saved to %s", self.evaluation_report_path)
+
+        except Exception as e:
+            logger.error("Error saving evaluation report: %s", e)
+            raise CustomException("Failed to save evaluation report", e)
+
+    def save_model(self, model, model_path=None):
+        model_path = model_path or self.model_output_path
         try:
-            logger.info(f"Saving model to {self.model_output_path}...")
-            os.makedirs(os.path.dirname(self.model_output_path), exist_ok=True)
+            logger.info("Saving model to %s...", model_path)
+            os.makedirs(os.path.dirname(model_path), exist_ok=True)
             
             # Save the model using joblib
-            joblib.dump(model, self.model_output_path)
-            logger.info(f"Model saved successfully at {self.model_output_path}")
+            joblib.dump(model, model_path)
+            logger.info("Model saved successfully at %s", model_path)
         
         except Exception as e:
-            logger.error(f"Error saving model: {e}")
+            logger.error("Error saving model: %s", e)
             raise CustomException("Failed to save model", e)
         
+    @timed("training.export_compiled")
+    def export_compiled_model(self, model, X_test, tolerance=1e-6, compiled_model_path=None):
+        compiled_model_path = compiled_model_path or self.compiled_model_output_path
+        try:
+            logger.info("Exporting compiled model to %s...", compiled_model_path)
+            export_lgbm_model(model, compiled_model_path)
+
+            # Parity check against the original model on the processed test set
+            compiled_model = CompiledTreeModel.load(compiled_model_path)
+            X = np.asarray(X_test, dtype=np.float64)
+            max_diff = np.abs(model.predict_proba(X) - compiled_model.predict_proba(X)).max()
+            if max_diff > tolerance:
+                raise ValueError(f"Compiled model deviates from the original model by {max_diff} (tolerance {tolerance})")
+
+            logger.info("Compiled model matches the original model (max probability difference: %s)", max_diff)
+
+        except Exception as e:
+            logger.error("Error exporting compiled model: %s", e)
+            raise CustomException("Failed to export compiled model", e)
+
+    def publish_models(self, model, X_test):
+        # Both serving formats are written and parity-checked under staging names first and only then
+        # moved over the live files, so a failed export never leaves a new model.pkl next to a stale
+        # compiled model. The staging name keeps the .npz suffix np.savez insists on.
+        staged = {path: os.path.join(os.path.dirname(path), ".staging-" + os.path.basename(path))
+                  for path in (self.model_output_path, self.compiled_model_output_path)}
+        try:
+            self.save_model(model, staged[self.model_output_path])
+            self.export_compiled_model(model, X_test, compiled_model_path=staged[self.compiled_model_output_path])
+            for path, staging_path in staged.items():
+                os.replace(staging_path, path)
+
+        finally:
+            for staging_path in staged.values():
+                if os.path.exists(staging_path):
+                    os.remove(staging_path)
+
+    @timed("training.register")
+    def register_model(self, evaluation_metrics):
+        try:
+            logger.info("Registering model in %s...", self.registry_dir)
+            registry = ModelRegistry(self.registry_dir)
+            artifacts = {"joblib": self.model_output_path, "compiled": self.compiled_model_output_path}
+            # Intervals and segment breakdowns stay comparable across retrains
+            if os.path.exists(self.evaluation_report_path):
+                artifacts["evaluation"] = self.evaluation_report_path
+            # Lets a later incremental run find the rows this model has not seen yet
+            if os.path.exists(self.train_rows_path):
+                artifacts["train_rows"] = self.train_rows_path
+            # The fitted preprocessing travels with the model so serving applies the same encoding
+            if os.path.exists(self.preprocessor_path):
+                artifacts["transformer"] = self.preprocessor_path
+            version = registry.register(
+                artifacts,
+                metadata={"metrics": {name: float(value) for name, value in evaluation_metrics.items()}},
+            )
+            logger.info("Model registered as version %s", version)
+            return version
+
+        except Exception as e:
+            logger.error("Error registering model: %s", e)
+            raise CustomException("Failed to register model", e)
+
+    @staticmethod
+    def row_hashes(X, y):
+        # One hash per training row (features and label), to tell which rows a model has already seen.
+        # Compared as rounded floats so dtype changes and CSV round-trip noise do not make a row look new.
+        rows = X.astype(np.float64).round(6).assign(booking_status=y.to_numpy())
+        return pd.util.hash_pandas_object(rows, index=False).to_numpy()
+
+    def load_base_model(self, X_train):
+        # Latest registered model and the hashes of its training rows, if it can be continued on
+        # data encoded like X_train; None (with the reason logged) otherwise
+        try:
+            registry = ModelRegistry(self.registry_dir)
+            version = registry.latest_version()
+            if version is None:
+                logger.info("No registered model to continue from, training from scratch")
+                return None
+            files = registry.list_versions()[version]['files']
+            if 'train_rows' not in files:
+                logger.info("Model version %s has no training row hashes, training from scratch", version)
+                return None
+
+            base_model = joblib.load(registry.path_for(version, 'joblib'))
+            if list(base_model.booster_.feature_name()) != list(X_train.columns):
+                logger.info("Selected features changed since model version %s, training from scratch", version)
+                return None
+            if 'transformer' in files and os.path.exists(self.preprocessor_path):
+                base_encoding = PreprocessingTransformer.load(registry.path_for(version, 'transformer')).to_dict()
+                encoding = PreprocessingTransformer.load(self.preprocessor_path).to_dict()
+                if base_encoding['fingerprint'] != encoding['fingerprint']:
+                    logger.info("Preprocessing changed since model version %s, training from scratch", version)
+                    return None
+
+            return version, base_model, np.load(registry.path_for(version, 'train_rows'))
+
+        except Exception as e:
+            logger.error("Error loading the base model for incremental training: %s", e)
+            raise CustomException("Failed to load base model", e)
+
+    @timed("training.incremental")
+    def train_incremental(self, base_model, X_new, y_new):
+        # Adds extra_rounds trees fitted on the new rows on top of the base model's trees
+        try:
+            logger.info("Continuing the base model for %s rounds on %s new rows...",
+                        self.incremental_config['extra_rounds'], len(X_new))
+            params = dict(base_model.get_params(), n_estimators=self.incremental_config['extra_rounds'])
+            return lgb.LGBMClassifier(**params).fit(X_new, y_new, init_model=base_model.booster_)
+
+        except Exception as e:
+            logger.error("Error during incremental training: %s", e)
+            raise CustomException("Failed to continue training the base model", e)
+
+    def fit_model(self, X_train, y_train, X_test, y_test, tracker):
+        # Returns (model, evaluation report, training row hashes, tags), or None when the current model stays in place
+        row_hashes = self.row_hashes(X_train, y_train)
+        base = self.load_base_model(X_train) if self.incremental_config['enabled'] else None
+
+        if base is None:
+            model = self.train_lgbm(X_train, y_train)
+            return model, self.evaluate_model(model, X_test, y_test), row_hashes, {"training_mode": "full"}
+
+        base_version, base_model, base_rows = base
+        is_new = ~np.isin(row_hashes, base_rows)
+        tags = {"training_mode": "incremental", "base_version": base_version, "new_rows": int(is_new.sum())}
+        if is_new.sum() < self.incremental_config['min_new_rows']:
+            logger.info("Only %s new rows since model version %s, keeping it", is_new.sum(), base_version)
+            tracker.set_tags(dict(tags, promoted=False))
+            return None
+
+        model = self.train_incremental(base_model, X_train[is_new], y_train[is_new])
+        report = self.evaluate_model(model, X_test, y_test)
+        metrics = flat_metrics(report)
+        base_metrics = flat_metrics(self.evaluate_model(base_model, X_test, y_test))
+        tracker.log_metrics({f"base_{name}": value for name, value in base_metrics.items()})
+
+        # Promote only if the holdout metric did not regress
+        metric, tolerance = self.incremental_config['metric'], self.incremental_config['tolerance']
+        if metrics[metric] < base_metrics[metric] - tolerance:
+            logger.info("Incremental model %s %.5f regressed from %.5f (version %s), not promoting it",
+                        metric, metrics[metric], base_metrics[metric], base_version)
+            tracker.log_metrics(metrics)
+            tracker.set_tags(dict(tags, promoted=False))
+            return None
+
+        logger.info("Incremental model %s %.5f vs %.5f for version %s, promoting it",
+                    metric, metrics[metric], base_metrics[metric], base_version)
+        return model, report, np.union1d(base_rows, row_hashes), tags
+
+    def create_tracker(self):
+        if self.tracking_config is None:
+            return ExperimentTracker(dataset_index_path=MLFLOW_DATASET_INDEX_PATH)
+        return tracker_from_config(self.tracking_config, MLFLOW_DATASET_INDEX_PATH)
+
     def run(self):
         try:
-            with mlflow.start_run():
+            with self.create_tracker() as tracker:
                 logger.info("MLflow run started for model training.")
-                logger.info("Logging the training ans testing data to MLflow...")
-                mlflow.log_artifact(self.train_path, artifact_path="datasets")
-                mlflow.log_artifact(self.test_path, artifact_path="datasets")
+                # Uploaded only when their content was never logged before, otherwise referenced by hash
+                tracker.log_dataset(self.train_path, name="train")
+                tracker.log_dataset(self.test_path, name="test")
 
                 logger.info("Starting model training process...")
                 X_train, y_train, X_test, y_test = self.load_and_split_data()
-                best_lgbm_model = self.train_lgbm(X_train, y_train)
-                evaluation_metrics = self.evaluate_model(best_lgbm_model, X_test, y_test)
-                self.save_model(best_lgbm_model)
+                fitted = self.fit_model(X_train, y_train, X_test, y_test, tracker)
+                if fitted is None:
+                    logger.info("Model training process completed without a new model.")
+                    return None
+                best_lgbm_model, evaluation_report, row_hashes, tags = fitted
+                evaluation_metrics = flat_metrics(evaluation_report)
+
+                self.publish_models(best_lgbm_model, X_test)
+                self.save_evaluation_report(evaluation_report)
+                np.save(self.train_rows_path, row_hashes)
+                model_version = self.register_model(evaluation_metrics)
 
                 logger.info("Logging the model and evaluation metrics to MLflow...")
-                mlflow.log_artifact(self.model_output_path)
-                mlflow.log_params(best_lgbm_model.get_params())
-                mlflow.log_metrics(evaluation_metrics)
+                tracker.log_artifact(self.model_output_path)
+                tracker.log_artifact(self.compiled_model_output_path)
+                tracker.log_artifact(self.evaluation_report_path)
+                tracker.log_params(best_lgbm_model.get_params())
+                tracker.log_metrics(evaluation_metrics)
+                tracker.set_tags(dict(tags, model_version=model_version, promoted=True))
 
                 logger.info("Model training process completed successfully.")
             
         
         except Exception as e:
-            logger.error(f"Error in model training process: {e}")
+            logger.error("Error in model training process: %s", e)
             raise CustomException("Model training process failed", e)
         
 if __name__ == "__main__":
     try:
         logger.info("Starting the model training script...")
+        config = read_yaml(CONFIG_PATH)
+        artifact_format = config['artifacts']['format']
         trainer = ModelTrainer(
-            train_path=PROCESSED_TRAIN_DATA_PATH,
-            test_path=PROCESSED_TEST_DATA_PATH,
-            model_output_path=MODEL_FILE_PATH
+            train_path=artifact_path(PROCESSED_TRAIN_DATA_PATH, artifact_format),
+            test_path=artifact_path(PROCESSED_TEST_DATA_PATH, artifact_format),
+            model_output_path=MODEL_FILE_PATH,
+            class_weight=class_weight_for(config['data_processing']['balancing']['strategy']),
+            search_config=config['training']['search'],
+            incremental_config=config['training']['incremental'],
+            evaluation_config=config['training']['evaluation'],
+            tracking_config=config['tracking']
         )
         evaluation_results = trainer.run()
-        logger.info(f"Model evaluation results: {evaluation_results}")
+        logger.info("Model evaluation results: %s", evaluation_results)
     except Exception as e:
-        logger.error(f"An error occurred during model training: {e}")
+        logger.error("An error occurred during model training: %s", e)
         raise CustomException("Model training script failed", e)
\ No newline at end of file
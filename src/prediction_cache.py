@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+class PredictionCache:
+
+    # Bounded LRU cache with TTL in front of model.predict, keyed on the canonical feature tuple.
+    # Entries belong to one model version; seeing a different version drops the whole cache.
+    def __init__(self, capacity=10000, ttl_s=None):
+        self.capacity = capacity
+        self.ttl_s = ttl_s
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(features):
+        # Form values arrive as ints or floats; 3 and 3.0 (and -0.0 and 0.0) must hit the same entry
+        return tuple(float(value) + 0.0 for value in features)
+
+    def _check_version(self, version):
+        # Caller holds self._lock
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                logger.info("Model version changed from %s to %s, clearing prediction cache", self._version, version)
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, key):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version, key, value):
+        with self._lock:
+            self._check_version(version)
+            expires_at = time.monotonic() + self.ttl_s if self.ttl_s else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "ttl_s": self.ttl_s,
+                "model_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import numpy as np
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+# Bump when the serialized layout changes
+FORMAT_VERSION = 1
+
+TARGET_COLUMN = 'booking_status'
+
+
+class PreprocessingTransformer:
+
+    # Fitted preprocessing state shared by training and serving: label-encoder classes per
+    # categorical column, the log1p column set, the selected feature list and the reference
+    # feature statistics of the train split (src/drift_monitor.py).
+    # Serialized as JSON so the serving app can load it without pandas or sklearn.
+    def __init__(self, classes=None, log1p_columns=None, feature_columns=None, reference=None):
+        self.classes = classes or {}
+        self.log1p_columns = log1p_columns or []
+        self.feature_columns = feature_columns or []
+        # None for transformers saved before reference statistics existed
+        self.reference = reference
+        self._build_lookups()
+
+    def _build_lookups(self):
+        # Sorted class arrays for np.searchsorted; numeric classes are looked up as floats
+        self._lookups = {}
+        for col, classes in self.classes.items():
+            numeric = all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in classes)
+            values = np.asarray(classes, dtype=np.float64 if numeric else str)
+            order = np.argsort(values, kind='stable')
+            self._lookups[col] = (values[order], order, numeric)
+
+    def fit(self, df, cat_cols, num_cols, skew_threshold):
+        # LabelEncoder semantics: codes follow the sorted order of the classes
+        self.classes = {col: np.unique(df[col].to_numpy()).tolist() for col in cat_cols}
+        skewness = df[num_cols].apply(lambda x: x.skew())
+        self.log1p_columns = skewness[skewness > skew_threshold].index.tolist()
+        self._build_lookups()
+        return self
+
+    def set_classes(self, classes, log1p_columns):
+        # State fitted elsewhere, e.g. by the streaming pass of DataPreprocessor
+        self.classes = {col: list(values) for col, values in classes.items()}
+        self.log1p_columns = list(log1p_columns)
+        self._build_lookups()
+        return self
+
+    def encode(self, col, values):
+        # Vectorized label encoding; unknown categories become -1
+        sorted_values, order, numeric = self._lookups[col]
+        values = np.asarray(values, dtype=np.float64 if numeric else str)
+        positions = np.searchsorted(sorted_values, values)
+        positions = np.minimum(positions, len(sorted_values) - 1)
+        found = sorted_values[positions] == values
+        return np.where(found, order[positions], -1)
+
+    def decode(self, col, codes):
+        return np.asarray(self.classes[col], dtype=object)[np.asarray(codes, dtype=np.int64)]
+
+    def transform(self, df):
+        # Training-time transform of a DataFrame that holds raw values
+        for col in self.classes:
+            if col in df.columns:
+                codes = self.encode(col, df[col].to_numpy())
+                unknown = int((codes < 0).sum())
+                if unknown:
+                    logger.warning("%s rows have categories in '%s' that were not seen during fit", unknown, col)
+                df[col] = codes
+        for col in self.log1p_columns:
+            if col in df.columns:
+                df[col] = np.log1p(df[col])
+        return df
+
+    def transform_columns(self, columns):
+        # Serving-time transform: columns maps each feature to a 1D array of raw values.
+        # Categorical values may be raw strings ("Online") or integer codes from the HTML form.
+        # Returns the float matrix in feature_columns order and a per-row error message (or None).
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        features = np.empty((n_rows, len(self.feature_columns)), dtype=np.float64)
+        errors = np.full(n_rows, None, dtype=object)
+
+        for j, col in enumerate(self.feature_columns):
+            raw = np.asarray(columns[col], dtype=object)
+            as_number = _to_float(raw)
+
+            if col in self._lookups:
+                n_classes = len(self.classes[col])
+                if self._lookups[col][2]:
+                    codes = self.encode(col, as_number).astype(np.float64)
+                else:
+                    # Numbers are taken as codes, strings are looked up among the fitted classes
+                    is_code = ~np.isnan(as_number)
+                    codes = np.where(is_code & (as_number >= 0) & (as_number < n_classes)
+                                     & (np.mod(as_number, 1) == 0), as_number, -1.0)
+                    if (~is_code).any():
+                        codes[~is_code] = self.encode(col, raw[~is_code].astype(str))
+                _flag(errors, codes < 0, f"unknown category for '{col}'")
+                features[:, j] = codes
+            else:
+                _flag(errors, np.isnan(as_number), f"'{col}' must be a number")
+                features[:, j] = np.log1p(as_number) if col in self.log1p_columns else as_number
+
+        return features, errors
+
+    def to_dict(self):
+        # The fingerprint identifies the encoding only. The reference statistics are stored next to it,
+        # so new training data alone does not make the incremental trainer see different preprocessing.
+        state = {
+            "format_version": FORMAT_VERSION,
+            "classes": self.classes,
+            "log1p_columns": self.log1p_columns,
+            "feature_columns": self.feature_columns,
+        }
+        state["fingerprint"] = hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()[:12]
+        if self.reference is not None:
+            state["reference"] = self.reference
+        return state
+
+    def save(self, file_path):
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            state = self.to_dict()
+            with open(file_path, 'w') as f:
+                json.dump(state, f, indent=2)
+            logger.info("Preprocessing transformer %s saved to %s", state['fingerprint'], file_path)
+
+        except Exception as e:
+            logger.error("Error saving preprocessing transformer: %s", e)
+            raise CustomException("Failed to save preprocessing transformer", e)
+
+    @classmethod
+    def load(cls, file_path):
+        try:
+            with open(file_path, 'r') as f:
+                state = json.load(f)
+            if state["format_version"] != FORMAT_VERSION:
+                raise ValueError(f"Unsupported transformer format version {state['format_version']}")
+            logger.info("Preprocessing transformer %s loaded from %s", state['fingerprint'], file_path)
+            return cls(state["classes"], state["log1p_columns"], state["feature_columns"], state.get("reference"))
+
+        except Exception as e:
+            logger.error("Error loading preprocessing transformer: %s", e)
+            raise CustomException("Failed to load preprocessing transformer", e)
+
+
+def _flag(errors, bad, message):
+    # Keep the first error found for each row
+    errors[bad & np.equal(errors, None)] = message
+
+
+def _to_float(values):
+    # Float conversion of raw request values; anything non-numeric becomes NaN.
+    # The whole column converts in one call unless it holds strings or missing values.
+    try:
+        return values.astype(np.float64)
+    except (TypeError, ValueError):
+        pass
+    result = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            result[i] = float(value)
+        except (TypeError, ValueError):
+            pass
+    return result
@@ -0,0 +1,189 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+# generation changes whenever the object is rewritten; md5 is the base64 MD5 digest GCS reports
+# (None for composite objects, which are then compared by generation only)
+ObjectInfo = namedtuple("ObjectInfo", ["size", "generation", "md5"])
+
+
+def md5_base64(path, chunk_size=1 << 20):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return base64.b64encode(digest.digest()).decode()
+
+
+class GCSStorage:
+
+    # Objects of one Google Cloud Storage bucket. Ranged reads pin the generation seen by stat(),
+    # so a download never mixes chunks of two versions of the object.
+    def __init__(self, bucket_name, client=None):
+        from google.cloud import storage
+        self.bucket_name = bucket_name
+        self._bucket = (client or storage.Client()).bucket(bucket_name)
+
+    def stat(self, name):
+        blob = self._bucket.get_blob(name)
+        if blob is None:
+            raise FileNotFoundError(f"{name} not found in bucket {self.bucket_name}")
+        return ObjectInfo(blob.size, str(blob.generation), blob.md5_hash)
+
+    def read_range(self, name, start, end, generation=None):
+        # Bytes [start, end) of the object
+        return self._bucket.blob(name).download_as_bytes(
+            start=start, end=end - 1, checksum=None, if_generation_match=int(generation) if generation else None)
+
+
+class LocalStorage:
+
+    # Files under a local directory, with the same interface as GCSStorage. Serves as the
+    # backend for running ingestion without a bucket and as the fake bucket in tests.
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def stat(self, name):
+        path = self._path(name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{name} not found in {self.root}")
+        stat = os.stat(path)
+        return ObjectInfo(stat.st_size, str(stat.st_mtime_ns), md5_base64(path))
+
+    def read_range(self, name, start, end, generation=None):
+        path = self._path(name)
+        if generation is not None and str(os.stat(path).st_mtime_ns) != generation:
+            raise RuntimeError(f"{name} changed during the download")
+        with open(path, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start)
+
+
+def storage_from_config(ingestion_config):
+    # Backend selected by config.yaml data_ingestion.storage
+    backend = ingestion_config["storage"]["backend"]
+    if backend == "gcs":
+        return GCSStorage(ingestion_config["bucket_name"])
+    if backend == "local":
+        return LocalStorage(ingestion_config["storage"]["local_dir"])
+    raise ValueError(f"Unknown storage backend '{backend}', expected 'gcs' or 'local'")
+
+
+class ChunkedDownloader:
+
+    # Copies an object to a local file as parallel ranged reads of chunk_size bytes.
+    #   - A sidecar <file>.meta.json records the generation and MD5 of the local copy; when they
+    #     match the object the download is skipped. A copy without the sidecar is accepted if its
+    #     MD5 matches.
+    #   - Chunks are written into <file>.part and the finished ones are recorded in
+    #     <file>.part.json, so an interrupted download resumes with the missing chunks only, as
+    #     long as the object's generation did not change.
+    #   - The complete file is checked against the object's MD5 before it replaces the old copy,
+    #     so a failed or corrupt transfer never leaves stale or partial data in its place.
+    def __init__(self, storage, chunk_size=64 * 2 ** 20, workers=8):
+        self.storage = storage
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    @staticmethod
+    def _read_json(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path, data):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _is_current(self, info, local_path, meta_path):
+        if not os.path.exists(local_path) or os.path.getsize(local_path) != info.size:
+            return False
+        meta = self._read_json(meta_path)
+        if meta is not None and meta["generation"] == info.generation and meta["md5"] == info.md5:
+            return True
+        return info.md5 is not None and md5_base64(local_path) == info.md5
+
+    def download(self, name, local_path):
+        try:
+            start = time.perf_counter()
+            info = self.storage.stat(name)
+            meta_path = local_path + ".meta.json"
+            report = {"object": name, "size_bytes": info.size, "generation": info.generation}
+
+            if self._is_current(info, local_path, meta_path):
+                self._write_json(meta_path, {"generation": info.generation, "md5": info.md5})
+                logger.info("%s already matches %s (generation %s), download skipped",
+                            local_path, name, info.generation)
+                return dict(report, status="cached", downloaded_bytes=0, wall_time_s=time.perf_counter() - start)
+
+            part_path = local_path + ".part"
+            state_path = part_path + ".json"
+            n_chunks = max(1, -(-info.size // self.chunk_size))
+            state = self._read_json(state_path)
+            resumable = (state is not None and os.path.exists(part_path)
+                         and (state["generation"], state["size"], state["chunk_size"])
+                         == (info.generation, info.size, self.chunk_size))
+            done = set(state["done"]) if resumable else set()
+            if not resumable:
+                os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+                with open(part_path, 'wb') as f:
+                    f.truncate(info.size)
+            missing = [index for index in range(n_chunks) if index not in done]
+            if done:
+                logger.info("Resuming %s: %s/%s chunks already downloaded", name, len(done), n_chunks)
+
+            lock = threading.Lock()
+            fd = os.open(part_path, os.O_WRONLY)
+            try:
+                def fetch(index):
+                    chunk_start = index * self.chunk_size
+                    chunk_end = min(chunk_start + self.chunk_size, info.size)
+                    data = self.storage.read_range(name, chunk_start, chunk_end, info.generation)
+                    if len(data) != chunk_end - chunk_start:
+                        raise IOError(f"Chunk {index} of {name} is {len(data)} bytes, expected {chunk_end - chunk_start}")
+                    os.pwrite(fd, data, chunk_start)
+                    with lock:
+                        done.add(index)
+                        self._write_json(state_path, {"generation": info.generation, "size": info.size,
+                                                      "chunk_size": self.chunk_size, "done": sorted(done)})
+                    return len(data)
+
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    downloaded = sum(executor.map(fetch, missing))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            if info.md5 is not None and md5_base64(part_path) != info.md5:
+                os.remove(state_path)
+                raise IOError(f"Checksum mismatch for {name}, the partial download was discarded")
+            os.replace(part_path, local_path)
+            self._write_json(meta_path, {"generation": info.generation, "md5": info.md5})
+            os.remove(state_path)
+
+            elapsed = time.perf_counter() - start
+            report.update(status="resumed" if len(missing) < n_chunks else "downloaded", downloaded_bytes=downloaded,
+                          chunks=n_chunks, wall_time_s=elapsed, throughput_mb_s=downloaded / 2 ** 20 / elapsed)
+            logger.info("Downloaded %.1f MB of %s in %.2fs (%.1f MB/s, %s chunks, %s workers)",
+                        downloaded / 2 ** 20, name, elapsed, report['throughput_mb_s'], len(missing), self.workers)
+            return report
+
+        except Exception as e:
+            logger.error("Error downloading %s: %s", name, e)
+            raise CustomException(f"Failed to download {name}", e)
@@ -0,0 +1,135 @@
+import numpy as np
+
+
+class MomentAccumulator:
+
+    # Running count, mean and 2nd/3rd central moment sums per column.
+    # Chunks are folded in with the pairwise update of Chan et al. / Pebay, so results
+    # do not depend on how the data was split and two accumulators can be merged.
+    def __init__(self, n_columns):
+        self.n = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.m3 = np.zeros(n_columns)
+
+    def update(self, values):
+        # values: 2D array (rows x columns); NaNs are skipped like pandas does
+        values = np.asarray(values, dtype=np.float64)
+        present = ~np.isnan(values)
+        n = present.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, np.nansum(values, axis=0) / n, 0.0)
+        deviation = np.where(present, values - mean, 0.0)
+        self._merge(n, mean, (deviation ** 2).sum(axis=0), (deviation ** 3).sum(axis=0))
+        return self
+
+    def merge(self, other):
+        self._merge(other.n, other.mean, other.m2, other.m3)
+        return self
+
+    def _merge(self, n_b, mean_b, m2_b, m3_b):
+        n_a, mean_a, m2_a, m3_a = self.n, self.mean, self.m2, self.m3
+        n = n_a + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean_b - mean_a
+            share_b = np.where(n > 0, n_b / n, 0.0)
+            self.mean = mean_a + delta * share_b
+            self.m3 = np.where(n > 0, m3_a + m3_b
+                               + delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2
+                               + 3.0 * delta * (n_a * m2_b - n_b * m2_a) / n, 0.0)
+            self.m2 = np.where(n > 0, m2_a + m2_b + delta ** 2 * n_a * n_b / n, 0.0)
+        self.n = n
+
+    def variance(self):
+        # Sample variance (ddof=1), as pandas computes it
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.n > 1, self.m2 / (self.n - 1), np.nan)
+
+    def skewness(self):
+        # Bias-corrected sample skewness, matching pandas.Series.skew
+        n, m2, m3 = self.n, self.m2, self.m3
+        with np.errstate(invalid='ignore', divide='ignore'):
+            g1 = np.sqrt(n) * m3 / m2 ** 1.5
+            skew = g1 * np.sqrt(n * (n - 1)) / (n - 2)
+        skew = np.where(m2 == 0, 0.0, skew)
+        return np.where(n < 3, np.nan, skew)
+
+
+class QuantileSketch:
+
+    # Streaming quantiles in bounded memory (a simplified KLL sketch). Level h holds items that
+    # each stand for 2**h values; when a level grows past k items it is sorted and every other
+    # item, from a random offset, moves up one level. Memory is at most k items per level, about
+    # log2(n / k) levels, and ranks are off by a small fraction of n that shrinks as k grows.
+    # Values are added in arrays, so the per-value cost is a few vectorized NumPy operations.
+    def __init__(self, k=256, seed=0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+
+        level = 0
+        while level < len(self.levels) and len(self.levels[level]) > self.k:
+            items = np.sort(self.levels[level])
+            # An odd item out stays on its level, so the total weight is preserved exactly
+            self.levels[level] = items[len(items) - len(items) % 2:]
+            promoted = items[self._rng.integers(2):len(items) - len(items) % 2:2]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+        return self
+
+    def _weighted(self):
+        # Items in ascending order with the cumulative weight up to each one
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def cdf(self, points):
+        # Fraction of the values <= each point
+        if self.count == 0:
+            return np.full(len(np.atleast_1d(points)), np.nan)
+        items, cumulative = self._weighted()
+        positions = np.searchsorted(items, points, side='right')
+        return np.where(positions > 0, cumulative[np.maximum(positions - 1, 0)], 0.0) / cumulative[-1]
+
+    def quantiles(self, qs):
+        if self.count == 0:
+            return np.full(len(np.atleast_1d(qs)), np.nan)
+        items, cumulative = self._weighted()
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side='left')
+        return items[np.minimum(positions, len(items) - 1)]
+
+
+class HashSet:
+
+    # Exact set of uint64 row hashes as one sorted NumPy array, 8 bytes per distinct row (a Python
+    # set of ints needs around 70). Membership is a vectorized searchsorted over the whole chunk and
+    # new hashes are merged in with one np.insert, so no per-row Python code runs.
+    def __init__(self):
+        self.values = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.values)
+
+    def contains(self, hashes):
+        positions = np.minimum(np.searchsorted(self.values, hashes), max(len(self.values) - 1, 0))
+        return (self.values[positions] == hashes) if len(self.values) else np.zeros(len(hashes), dtype=bool)
+
+    def add_new(self, hashes):
+        # Returns a mask of the hashes seen for the first time, counting repeats within hashes
+        _, first = np.unique(hashes, return_index=True)
+        new = np.zeros(len(hashes), dtype=bool)
+        new[first] = True
+        new &= ~self.contains(hashes)
+        added = np.sort(hashes[new])
+        self.values = np.insert(self.values, np.searchsorted(self.values, added), added)
+        return new
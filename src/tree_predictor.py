@@ -0,0 +1,218 @@
+import json
+import os
+import numpy as np
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+# Encoding of LightGBM's missing_type per split node
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_MISSING_TYPES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+
+# LightGBM treats |x| <= kZeroThreshold as zero
+_ZERO_THRESHOLD = 1e-35
+
+# Rows walked together; keeps the (rows x trees) working set cache friendly
+_CHUNK_ROWS = 1024
+
+
+def _flatten_trees(tree_info):
+    # Flattens every tree into shared node arrays. Leaves are nodes that point back to
+    # themselves, so every row can walk a fixed number of levels without masking.
+    # Categorical splits point into cat_member (one row of category flags per split) through cat_index.
+    feature, threshold, left, right, default_left, missing_type, value = [], [], [], [], [], [], []
+    cat_index, categories = [], []
+    roots = []
+    max_depth = 0
+
+    def visit(node, depth):
+        nonlocal max_depth
+        index = len(feature)
+        feature.append(0)
+        threshold.append(np.inf)
+        default_left.append(True)
+        missing_type.append(MISSING_NONE)
+        left.append(index)
+        right.append(index)
+        value.append(0.0)
+        cat_index.append(-1)
+
+        if 'leaf_value' in node:
+            value[index] = node['leaf_value']
+            max_depth = max(max_depth, depth)
+            return index
+
+        if node['decision_type'] == '==':
+            # Categories that go left, e.g. threshold '1||3||7'
+            cat_index[index] = len(categories)
+            categories.append([int(category) for category in str(node['threshold']).split('||')])
+        elif node['decision_type'] == '<=':
+            threshold[index] = node['threshold']
+        else:
+            raise ValueError(f"Unsupported split type '{node['decision_type']}'")
+
+        feature[index] = node['split_feature']
+        default_left[index] = node['default_left']
+        missing_type[index] = _MISSING_TYPES[node['missing_type']]
+        left[index] = visit(node['left_child'], depth + 1)
+        right[index] = visit(node['right_child'], depth + 1)
+        return index
+
+    for tree in tree_info:
+        roots.append(visit(tree['tree_structure'], 0))
+
+    cat_member = np.zeros((len(categories), max((max(c) + 1 for c in categories), default=0)), dtype=bool)
+    for row, members in enumerate(categories):
+        cat_member[row, members] = True
+
+    return {
+        'feature': np.asarray(feature, dtype=np.int32),
+        'threshold': np.asarray(threshold, dtype=np.float64),
+        'left': np.asarray(left, dtype=np.int32),
+        'right': np.asarray(right, dtype=np.int32),
+        'default_left': np.asarray(default_left, dtype=bool),
+        'missing_type': np.asarray(missing_type, dtype=np.int8),
+        'value': np.asarray(value, dtype=np.float64),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'max_depth': np.asarray(max_depth, dtype=np.int32),
+        'cat_index': np.asarray(cat_index, dtype=np.int32),
+        'cat_member': cat_member,
+    }
+
+
+def export_lgbm_model(model, file_path):
+    # Turns a fitted LGBMClassifier into flat NumPy arrays that CompiledTreeModel can score
+    try:
+        logger.info("Exporting compiled tree model to %s...", file_path)
+        dump = model.booster_.dump_model()
+
+        arrays = _flatten_trees(dump['tree_info'])
+        metadata = {
+            'objective': dump['objective'],
+            'num_tree_per_iteration': dump['num_tree_per_iteration'],
+            'feature_names': dump['feature_names'],
+            'classes': np.asarray(model.classes_).tolist(),
+        }
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        np.savez(file_path, metadata=np.asarray(json.dumps(metadata)), **arrays)
+        logger.info("Compiled model exported with %s trees and %s nodes", len(arrays['roots']), len(arrays['feature']))
+
+    except Exception as e:
+        logger.error("Error exporting compiled model: %s", e)
+        raise CustomException("Failed to export compiled model", e)
+
+
+class CompiledTreeModel:
+
+    # Pure NumPy predictor over the arrays written by export_lgbm_model.
+    # Exposes predict / predict_proba / classes_ so it can stand in for the LGBMClassifier.
+    def __init__(self, arrays, metadata):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.default_left = arrays['default_left']
+        self.missing_type = arrays['missing_type']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.max_depth = int(arrays['max_depth'])
+        self.has_missing_splits = bool((self.missing_type != MISSING_NONE).any())
+        # Files exported before categorical splits were supported have neither array
+        self.cat_index = arrays.get('cat_index', np.full(len(self.feature), -1, dtype=np.int32))
+        self.cat_member = arrays.get('cat_member', np.zeros((0, 0), dtype=bool))
+        self.has_categorical_splits = bool((self.cat_index >= 0).any())
+
+        self.objective = metadata['objective']
+        self.num_tree_per_iteration = metadata['num_tree_per_iteration']
+        self.feature_names_in_ = np.asarray(metadata['feature_names'])
+        self.n_features_in_ = len(metadata['feature_names'])
+        self.classes_ = np.asarray(metadata['classes'])
+
+    @classmethod
+    def load(cls, file_path):
+        try:
+            with np.load(file_path) as data:
+                arrays = {key: data[key] for key in data.files if key != 'metadata'}
+                metadata = json.loads(str(data['metadata']))
+            logger.info("Compiled model loaded from %s", file_path)
+            return cls(arrays, metadata)
+
+        except Exception as e:
+            logger.error("Error loading compiled model: %s", e)
+            raise CustomException("Failed to load compiled model", e)
+
+    @staticmethod
+    def read_feature_names(file_path):
+        # Feature order from the metadata only, without loading the tree arrays
+        try:
+            with np.load(file_path) as data:
+                return json.loads(str(data['metadata']))['feature_names']
+
+        except Exception as e:
+            logger.error("Error reading compiled model metadata: %s", e)
+            raise CustomException("Failed to read compiled model metadata", e)
+
+    def _leaf_indices(self, X):
+        # Walks all trees for all rows at once, one tree level per iteration
+        n_rows = X.shape[0]
+        nodes = np.tile(self.roots, n_rows)
+        # Index into the flattened matrix so each step is a single gather
+        row_offset = np.repeat(np.arange(n_rows) * X.shape[1], len(self.roots))
+        flat_X = X.ravel()
+
+        for _ in range(self.max_depth):
+            values = flat_X[row_offset + self.feature[nodes]]
+            go_left = values <= self.threshold[nodes]
+
+            is_nan = np.isnan(values)
+            if is_nan.any() or self.has_missing_splits:
+                missing_type = self.missing_type[nodes]
+                # Without a NaN-aware split, LightGBM scores NaN as zero
+                go_left = np.where(is_nan & (missing_type != MISSING_NAN), 0.0 <= self.threshold[nodes], go_left)
+                is_missing = np.where(missing_type == MISSING_NAN, is_nan,
+                                      (missing_type == MISSING_ZERO) & ((np.abs(values) <= _ZERO_THRESHOLD) | is_nan))
+                go_left = np.where(is_missing, self.default_left[nodes], go_left)
+
+            if self.has_categorical_splits:
+                cat_index = self.cat_index[nodes]
+                is_categorical = cat_index >= 0
+                # Like LightGBM: the value is truncated to an int; NaN, negative and unlisted categories go right
+                codes = np.trunc(values)
+                listed = is_categorical & (codes >= 0) & (codes < self.cat_member.shape[1])
+                in_set = np.zeros(len(nodes), dtype=bool)
+                in_set[listed] = self.cat_member[cat_index[listed], codes[listed].astype(np.int64)]
+                go_left = np.where(is_categorical, in_set, go_left)
+
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return nodes.reshape(n_rows, -1)
+
+    def predict_raw(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        k = self.num_tree_per_iteration
+        raw = np.empty((X.shape[0], k), dtype=np.float64)
+        for start in range(0, X.shape[0], _CHUNK_ROWS):
+            leaf_values = self.value[self._leaf_indices(X[start:start + _CHUNK_ROWS])]
+            # Trees are interleaved per class within each boosting iteration
+            raw[start:start + _CHUNK_ROWS] = leaf_values.reshape(leaf_values.shape[0], -1, k).sum(axis=1)
+        return raw
+
+    def predict_proba(self, X):
+        raw = self.predict_raw(X)
+        if self.num_tree_per_iteration == 1:
+            sigmoid = 1.0
+            for token in self.objective.split():
+                if token.startswith('sigmoid:'):
+                    sigmoid = float(token.split(':')[1])
+            positive = 1.0 / (1.0 + np.exp(-sigmoid * raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+
+        exp = np.exp(raw - raw.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -0,0 +1,92 @@
+import pytest
+from src.experiment_tracker import ExperimentTracker
+
+# ExperimentTracker against a local file-based MLflow store
+
+mlflow = pytest.importorskip("mlflow")
+from mlflow.tracking import MlflowClient
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Recent MLflow releases refuse the file store unless it is explicitly allowed
+    monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+    return (tmp_path / "mlruns").as_uri()
+
+
+def _tracker(store, tmp_path, **kwargs):
+    return ExperimentTracker(tracking_uri=store, experiment_name="tests",
+                             dataset_index_path=str(tmp_path / "dataset_index.json"),
+                             flush_interval_s=0.2, **kwargs)
+
+
+def _spy(monkeypatch, name, fail_first=False):
+    # Counts the MlflowClient calls of one method, optionally failing the first one
+    calls = []
+    original = getattr(MlflowClient, name)
+
+    def spy(self, *args, **kwargs):
+        calls.append(args)
+        if fail_first and len(calls) == 1:
+            raise ConnectionError("tracking server unavailable")
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(MlflowClient, name, spy)
+    return calls
+
+
+def test_params_and_metrics_are_sent_in_one_batch(store, tmp_path, monkeypatch):
+    batches = _spy(monkeypatch, "log_batch")
+    with _tracker(store, tmp_path) as tracker:
+        tracker.log_params({"num_leaves": 31, "learning_rate": 0.1})
+        tracker.log_metrics({"accuracy": 0.9})
+        tracker.log_metrics({"f1": 0.8})
+        tracker.set_tags({"stage": "test"})
+
+    run = MlflowClient(store).get_run(tracker.run_id)
+    assert run.data.params == {"num_leaves": "31", "learning_rate": "0.1"}
+    assert run.data.metrics == {"accuracy": 0.9, "f1": 0.8}
+    assert run.data.tags["stage"] == "test"
+    assert len(batches) == 1
+    assert tracker.sent == 4 and tracker.dropped == 0
+
+
+def test_known_dataset_is_referenced_instead_of_uploaded(store, tmp_path, monkeypatch):
+    dataset = tmp_path / "train.csv"
+    dataset.write_text("a,b\n1,2\n")
+    uploads = _spy(monkeypatch, "log_artifact")
+
+    with _tracker(store, tmp_path) as first:
+        first.log_dataset(str(dataset), name="train")
+    with _tracker(store, tmp_path) as second:
+        second.log_dataset(str(dataset), name="train")
+
+    client = MlflowClient(store)
+    assert len(uploads) == 1
+    assert [f.path for f in client.list_artifacts(first.run_id, "datasets")] == ["datasets/train.csv"]
+    assert client.list_artifacts(second.run_id) == []
+    tags = client.get_run(second.run_id).data.tags
+    assert tags["dataset.train.run_id"] == first.run_id
+    assert tags["dataset.train.hash"] == client.get_run(first.run_id).data.tags["dataset.train.hash"]
+    assert second.deduplicated_datasets == 1
+
+
+def test_queued_calls_flush_on_close_after_a_failed_call(store, tmp_path, monkeypatch):
+    artifact = tmp_path / "model.pkl"
+    artifact.write_bytes(b"model")
+    batches = _spy(monkeypatch, "log_batch")
+    uploads = _spy(monkeypatch, "log_artifact", fail_first=True)
+
+    tracker = _tracker(store, tmp_path, max_retries=3).start()
+    tracker.log_params({"num_leaves": 31})
+    tracker.log_artifact(str(artifact))
+    tracker.log_metrics({"accuracy": 0.9})
+    tracker.close()
+
+    run = MlflowClient(store).get_run(tracker.run_id)
+    assert run.data.params == {"num_leaves": "31"}
+    assert run.data.metrics == {"accuracy": 0.9}
+    assert [f.path for f in MlflowClient(store).list_artifacts(tracker.run_id)] == ["model.pkl"]
+    # The retry resumes at the failed upload: the params batch before it is not sent again
+    assert len(uploads) == 2 and len(batches) == 2
+    assert tracker.sent == 3 and tracker.dropped == 0
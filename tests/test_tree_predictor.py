@@ -0,0 +1,68 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from lightgbm import LGBMClassifier
+from config.paths_config import MODEL_FILE_PATH, COMPILED_MODEL_FILE_PATH, PROCESSED_TEST_DATA_PATH
+from src.tree_predictor import export_lgbm_model, CompiledTreeModel
+
+# CompiledTreeModel must reproduce LightGBM's own scores, including NaN routing and categorical splits
+
+
+def _random_rows(rng, n_rows, n_features, nan_rate=0.1):
+    X = rng.normal(size=(n_rows, n_features))
+    X[rng.random(X.shape) < nan_rate] = np.nan
+    return X
+
+
+def _compile(model, tmp_path):
+    file_path = str(tmp_path / "model_compiled.npz")
+    export_lgbm_model(model, file_path)
+    return CompiledTreeModel.load(file_path)
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+def test_matches_booster_with_missing_values(tmp_path, n_classes):
+    rng = np.random.default_rng(0)
+    X = _random_rows(rng, 2000, 6)
+    y = (np.nan_to_num(X[:, 0]) + np.nan_to_num(X[:, 1]) > 0).astype(int) + (n_classes == 3) * (np.isnan(X[:, 2]))
+    model = LGBMClassifier(n_estimators=30, num_leaves=15, verbose=-1).fit(X, y)
+    compiled = _compile(model, tmp_path)
+
+    X_new = _random_rows(rng, 500, 6, nan_rate=0.2)
+    expected = model.booster_.predict(X_new)
+    if n_classes == 2:
+        expected = np.column_stack([1.0 - expected, expected])
+    np.testing.assert_allclose(compiled.predict_proba(X_new), expected, rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(compiled.predict(X_new), model.predict(X_new))
+
+
+def test_matches_booster_with_categorical_splits(tmp_path):
+    rng = np.random.default_rng(1)
+    n_rows = 3000
+    X = _random_rows(rng, n_rows, 4)
+    X[:, 0] = rng.integers(0, 12, n_rows)
+    X[rng.random(n_rows) < 0.05, 0] = np.nan
+    y = (np.isin(X[:, 0], [1, 4, 5, 9]) ^ (np.nan_to_num(X[:, 1]) > 0.5)).astype(int)
+    model = LGBMClassifier(n_estimators=30, num_leaves=15, min_data_per_group=5, cat_smooth=1,
+                           verbose=-1).fit(X, y, categorical_feature=[0])
+    compiled = _compile(model, tmp_path)
+    assert compiled.has_categorical_splits
+
+    # Unseen, negative and fractional categories as well as NaN
+    X_new = _random_rows(rng, 1000, 4, nan_rate=0.2)
+    X_new[:, 0] = rng.choice([-1, 0, 1, 2.7, 4, 5, 9, 11, 15, np.nan], 1000)
+    np.testing.assert_allclose(compiled.predict_proba(X_new)[:, 1], model.booster_.predict(X_new), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("source", ["exported", "tracked"])
+def test_matches_trained_model_on_processed_test_set(tmp_path, source):
+    # Every row of the processed test split, against the tracked model.pkl; "tracked" also checks
+    # that the committed model_compiled.npz was exported from that model
+    model = joblib.load(MODEL_FILE_PATH)
+    compiled = _compile(model, tmp_path) if source == "exported" else CompiledTreeModel.load(COMPILED_MODEL_FILE_PATH)
+    X_test = pd.read_csv(PROCESSED_TEST_DATA_PATH).drop(columns=['booking_status'])[model.feature_name_]
+    X_test = X_test.to_numpy(dtype=np.float64)
+
+    np.testing.assert_allclose(compiled.predict_proba(X_test), model.predict_proba(X_test), rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(compiled.predict(X_test), model.predict(X_test))
@@ -1,5 +1,4 @@
 import os
-import pandas as pd
 from src.logger import get_logger
 from src.custom_exception import CustomException
 import yaml
@@ -13,21 +12,150 @@ def read_yaml(file_path):
         
         with open(file_path, 'r') as yaml_file:
             config =  yaml.safe_load(yaml_file)
-            logger.info(f"Successfully read the YAML file from: {file_path}")
+            logger.info("Successfully read the YAML file from: %s", file_path)
             return config
         
     except Exception as e:
-        logger.error(f"Error reading YAML file: {e}")
+        logger.error("Error reading YAML file: %s", e)
         raise CustomException("Failed to read YAML file", e)
     
+# File extension used for each supported artifact format
+ARTIFACT_EXTENSIONS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'arrow': '.arrow',  # Arrow IPC (Feather v2)
+}
+
+def artifact_path(path, artifact_format):
+    # Same artifact, with the extension of the configured format (e.g. train.csv -> train.parquet)
+    if artifact_format not in ARTIFACT_EXTENSIONS:
+        raise ValueError(f"Unsupported artifact format: {artifact_format}")
+    root, _ = os.path.splitext(path)
+    return root + ARTIFACT_EXTENSIONS[artifact_format]
+
+def compact_dtypes(df):
+    # Smallest integer type that fits each integer column (int8/int16 for the small-cardinality ones)
+    # and float32 for prices and other float columns
+    import pandas as pd
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype('float32')
+    return df
+
 def load_data(path):
     try:
-        logger.info(f"Loading data from: {path}")
+        logger.info("Loading data from: %s", path)
         if not os.path.exists(path):
             raise FileNotFoundError(f"Data file not found at: {path}")
-        data = pd.read_csv(path)
-        logger.info(f"Data loaded successfully with shape: {data.shape}")
+        # pandas is imported here so that read_yaml stays cheap for the serving app
+        import pandas as pd
+        if path.endswith(ARTIFACT_EXTENSIONS['parquet']):
+            data = pd.read_parquet(path)
+        elif path.endswith(ARTIFACT_EXTENSIONS['arrow']):
+            data = pd.read_feather(path)
+        else:
+            data = pd.read_csv(path)
+        logger.info("Data loaded successfully with shape: %s", data.shape)
         return data
     except Exception as e:
-        logger.error(f"Error loading data: {e}")
-        raise CustomException("Failed to load data", e)
\ No newline at end of file
+        logger.error("Error loading data: %s", e)
+        raise CustomException("Failed to load data", e)
+
+def save_data(df, path):
+    # Format follows the file extension. Columnar formats keep explicit compact dtypes, CSV is written as is.
+    try:
+        logger.info("Saving data to: %s", path)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if path.endswith(ARTIFACT_EXTENSIONS['parquet']):
+            compact_dtypes(df).to_parquet(path, index=False)
+        elif path.endswith(ARTIFACT_EXTENSIONS['arrow']):
+            compact_dtypes(df).reset_index(drop=True).to_feather(path)
+        else:
+            df.to_csv(path, index=False)
+        logger.info("Data saved successfully with shape: %s", df.shape)
+    except Exception as e:
+        logger.error("Error saving data: %s", e)
+        raise CustomException("Failed to save data", e)
+
+
+def iter_data_chunks(path, chunk_size):
+    # Yields DataFrames of at most chunk_size rows without loading the whole file
+    try:
+        logger.info("Streaming data from: %s in chunks of %s rows", path, chunk_size)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Data file not found at: {path}")
+        import pandas as pd
+        if path.endswith(ARTIFACT_EXTENSIONS['parquet']):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif path.endswith(ARTIFACT_EXTENSIONS['arrow']):
+            import pyarrow as pa
+            # Record batches are memory-mapped, so only the rows being converted are materialised
+            with pa.memory_map(path) as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i)
+                    for start in range(0, batch.num_rows, chunk_size):
+                        yield batch.slice(start, chunk_size).to_pandas()
+        else:
+            yield from pd.read_csv(path, chunksize=chunk_size)
+    except Exception as e:
+        logger.error("Error streaming data: %s", e)
+        raise CustomException("Failed to stream data", e)
+
+class ChunkedDataWriter:
+
+    # Appends DataFrame chunks to one CSV, Parquet or Arrow IPC file.
+    # Columnar formats use int32/float32 for every chunk so that all chunks share one schema.
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._writer = None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def _to_table(self, df):
+        import pyarrow as pa
+        import pandas as pd
+        df = df.copy()
+        for col in df.columns:
+            if pd.api.types.is_integer_dtype(df[col]):
+                df[col] = df[col].astype('int32')
+            elif pd.api.types.is_float_dtype(df[col]):
+                df[col] = df[col].astype('float32')
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+    def write(self, df):
+        try:
+            if self.path.endswith(ARTIFACT_EXTENSIONS['parquet']):
+                import pyarrow.parquet as pq
+                table = self._to_table(df)
+                if self._writer is None:
+                    self._writer = pq.ParquetWriter(self.path, table.schema)
+                self._writer.write_table(table)
+            elif self.path.endswith(ARTIFACT_EXTENSIONS['arrow']):
+                import pyarrow as pa
+                table = self._to_table(df)
+                if self._writer is None:
+                    self._writer = pa.ipc.new_file(self.path, table.schema)
+                self._writer.write_table(table)
+            else:
+                df.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+            self.rows += len(df)
+        except Exception as e:
+            logger.error("Error writing data chunk: %s", e)
+            raise CustomException("Failed to write data chunk", e)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        logger.info("Wrote %s rows to: %s", self.rows, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()